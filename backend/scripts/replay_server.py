@@ -0,0 +1,168 @@
+"""
+本地回放服务器
+按录制的fixture（FERRET_HTTP_RECORD录制）回放上游响应，可注入延迟、抖动和429限流，
+用于离线测试爬虫的并发和限速改动。
+
+用法:
+    # 1. 录制：正常运行一次采集，把响应保存到fixture目录
+    FERRET_HTTP_RECORD=data/fixtures/http python backend/src/main.py
+
+    # 2. 启动回放服务器（每个请求50ms±20ms延迟，5%的请求返回429，超过20次/秒时返回429）
+    python backend/scripts/replay_server.py --fixtures data/fixtures/http --latency 50 --jitter 20 \\
+        --error-rate 0.05 --max-rps 20
+
+    # 3. 回放：爬虫的所有请求改发到回放服务器
+    FERRET_HTTP_REPLAY=http://127.0.0.1:8765 python backend/src/main.py
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加backend/src到路径
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
+sys.path.insert(0, str(BACKEND_SRC))
+
+from utils.http_replay import DEFAULT_FIXTURE_DIR, load_fixture, original_url
+
+
+class ReplayStats:
+    """回放统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = defaultdict(int)
+
+    def count(self, field: str):
+        with self._lock:
+            self.counts[field] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            return ", ".join(f"{name}={value}" for name, value in sorted(self.counts.items()))
+
+
+class RateWindow:
+    """按上游host统计最近1秒内的请求数，用于模拟上游的速率限制"""
+
+    def __init__(self, max_rps: float):
+        self.max_rps = max_rps
+        self._lock = threading.Lock()
+        self._requests = defaultdict(list)
+
+    def allow(self, host: str) -> bool:
+        if not self.max_rps:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            recent = [t for t in self._requests[host] if now - t < 1.0]
+            allowed = len(recent) < self.max_rps
+            if allowed:
+                recent.append(now)
+            self._requests[host] = recent
+            return allowed
+
+
+def make_handler(args, stats: ReplayStats, window: RateWindow):
+    """根据命令行参数创建请求处理类"""
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1：支持keep-alive，与真实上游的连接复用行为一致
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status: int, body: bytes, headers=None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _replay(self, method: str):
+            # 读掉请求体，保持连接可复用
+            length = int(self.headers.get('Content-Length') or 0)
+            if length:
+                self.rfile.read(length)
+
+            url = original_url(self.path)
+            if url is None:
+                stats.count('bad_request')
+                self._send(400, b'expected /<scheme>/<host>/<path>')
+                return
+
+            delay = max(0.0, args.latency + random.uniform(-args.jitter, args.jitter)) / 1000
+            if delay:
+                time.sleep(delay)
+
+            host = url.split('/')[2]
+            if random.random() < args.error_rate or not window.allow(host):
+                stats.count('throttled')
+                self._send(429, b'Too Many Requests', {'Retry-After': str(args.retry_after),
+                                                        'Content-Type': 'text/plain'})
+                return
+
+            fixture = load_fixture(args.fixtures, method, url, self.headers)
+            if fixture is None:
+                stats.count('missing')
+                if args.verbose:
+                    print(f"没有录制: {method} {url}")
+                self._send(404, b'fixture not found', {'Content-Type': 'text/plain'})
+                return
+
+            stats.count('served')
+            self._send(fixture['status'], fixture['content'], fixture.get('headers'))
+
+        def do_GET(self):
+            self._replay('GET')
+
+        def do_POST(self):
+            self._replay('POST')
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+    return ReplayHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='回放录制的HTTP响应')
+    parser.add_argument('--fixtures', default=str(DEFAULT_FIXTURE_DIR), help='fixture目录')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0, help='每个请求的平均延迟（毫秒）')
+    parser.add_argument('--jitter', type=float, default=0, help='延迟的随机抖动范围（毫秒）')
+    parser.add_argument('--error-rate', type=float, default=0, help='随机返回429的比例（0~1）')
+    parser.add_argument('--max-rps', type=float, default=0,
+                        help='每个上游host每秒最多处理的请求数，超出返回429（0表示不限制）')
+    parser.add_argument('--retry-after', type=int, default=1, help='429响应的Retry-After（秒）')
+    parser.add_argument('--seed', type=int, default=None, help='随机种子（用于可重复的测试）')
+    parser.add_argument('--verbose', action='store_true', help='打印每个请求')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    stats = ReplayStats()
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(args, stats, RateWindow(args.max_rps)))
+    server.daemon_threads = True
+    print(f"回放服务器: http://{args.host}:{args.port}  fixture目录: {args.fixtures}")
+    print(f"设置 FERRET_HTTP_REPLAY=http://{args.host}:{args.port} 后运行爬虫即可回放")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"回放统计: {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
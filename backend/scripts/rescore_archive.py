@@ -0,0 +1,67 @@
+"""
+重新评分历史数据
+分批读取data/raw/app_store下的所有采集结果文件（或数据库raw_apps表），向量化评分，
+通过阈值的机会边评分边写入CSV，内存中只保留Top K，内存占用与历史数据总量无关。
+数据按文件（或id范围）分区，由多个进程在所有CPU核心上并行评分。
+
+用法:
+    # 重新评分所有采集结果文件，结果写入 data/processed/rescored_opportunities.csv
+    python backend/scripts/rescore_archive.py
+
+    # 从数据库raw_apps表读取，每批10万条，保留Top 50
+    python backend/scripts/rescore_archive.py --source db --chunk-size 100000 --top-k 50
+
+    # 16个worker进程，每个worker约1GB内存
+    python backend/scripts/rescore_archive.py --workers 16 --memory-per-worker 1024
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加backend/src到路径
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
+sys.path.insert(0, str(BACKEND_SRC))
+
+from analyzers.opportunity_analyzer import OpportunityAnalyzer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='分批重新评分历史App数据')
+    parser.add_argument('--source', choices=['files', 'db'], default='files',
+                        help='数据来源：files（data/raw/app_store下的文件）或db（raw_apps表）')
+    parser.add_argument('--files', nargs='*', default=None,
+                        help='只评分这些文件（data/raw/app_store下的文件名），默认所有文件')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker进程数，默认使用config.yaml中的 rescoring.workers（0表示所有CPU核心）')
+    parser.add_argument('--memory-per-worker', type=int, default=None,
+                        help='每个worker的内存预算（MB），决定每批记录数，默认使用config.yaml中的配置')
+    parser.add_argument('--chunk-size', type=int, default=None, help='每批评分的记录数（指定时忽略--memory-per-worker）')
+    parser.add_argument('--top-k', type=int, default=20, help='输出的最高分App数量')
+    parser.add_argument('--output', default='rescored_opportunities.csv',
+                        help='通过阈值的机会写入data/processed下的该文件')
+    args = parser.parse_args()
+
+    analyzer = OpportunityAnalyzer()
+
+    def on_partition(stats):
+        print(f"  分区 {stats['partition']} 完成: {stats['apps']} 个App，{stats['matched']} 个通过阈值，"
+              f"{stats['elapsed']} 秒")
+
+    stats = analyzer.score_archive_parallel(
+        source=args.source, files=args.files, max_workers=args.workers,
+        memory_per_worker_mb=args.memory_per_worker, chunk_size=args.chunk_size,
+        top_k=args.top_k, output_file=args.output, on_partition=on_partition
+    )
+
+    print(f"\nTop {len(stats['top'])} 机会:")
+    for idx, row in stats['top'].iterrows():
+        print(f"{idx+1}. {row['name']} | 机会分数: {row['opportunity_score']:.3f} | "
+              f"评分: {row['rating']:.2f} | 评论数: {row['review_count']:,}")
+    if stats['output']:
+        print(f"\n通过阈值的机会（按app_id去重后 {stats['output_rows']} 个）已保存到: {stats['output']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,28 @@
 分析采集的数据，识别潜在机会
 """
 
+import csv
 import json
+import math
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, Iterator, List, Dict, Optional
+import numpy as np
 import pandas as pd
 import yaml
 
+# 添加backend/src到路径，以便直接运行本脚本时也能导入utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.data_manager import DataManager
+from utils.record_store import is_ndjson_file, iter_ndjson
+
 
 # 获取项目根目录（backend/src的父目录的父目录）
 # __file__ = backend/src/analyzers/opportunity_analyzer.py
@@ -18,6 +34,47 @@ import yaml
 # parent.parent.parent.parent = 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 
+# 向量化评分使用的分档（与逐个App评分的 _calculate_* 方法一致）
+# 市场规模：评论数 > 10、> 100、> 1000、> 10000
+MARKET_SIZE_BINS = [10, 100, 1000, 10000]
+MARKET_SIZE_SCORES = [0.1, 0.3, 0.5, 0.7, 1.0]
+# 增长趋势：距最近一次更新的天数 <= 30、<= 90、<= 180
+UPDATE_AGE_BINS = [30, 90, 180]
+UPDATE_AGE_SCORES = [1.0, 0.7, 0.5, 0.3]
+
+# 评分需要的App字段：列名 -> App数据中的字段名
+APP_FIELDS = {
+    'app_id': 'trackId',
+    'name': 'trackName',
+    'category': 'primaryGenreName',
+    'rating': 'averageUserRating',
+    'review_count': 'userRatingCount',
+    'current_version_reviews': 'userRatingCountForCurrentVersion',
+    'price': 'price',
+    'release_date': 'currentVersionReleaseDate',
+    'url': 'trackViewUrl',
+}
+
+# 评分维度及默认权重
+SCORE_COMPONENTS = {
+    'market_size': 0.3,
+    'competition': 0.25,
+    'user_satisfaction': 0.2,
+    'growth_trend': 0.15,
+    'monetization': 0.1,
+}
+
+# 各维度分数随机会一起保存，修改权重后可以直接在数据库中重新计算机会分数
+OPPORTUNITY_COLUMNS = ['app_id', 'name', 'category', 'rating',
+                       'review_count', 'price', 'opportunity_score', 'url'] + list(SCORE_COMPONENTS)
+
+# 并行重新评分的默认配置（config.yaml中的 rescoring）：workers为0时使用所有CPU核心
+DEFAULT_RESCORING_CONFIG = {'workers': 0, 'memory_per_worker_mb': 512}
+# 估算的每条App记录评分时占用的内存（原始字典 + 列式数据），用于按内存上限计算每批记录数
+APPROX_RECORD_BYTES = 8192
+# 批量试算权重时每次计算的分数矩阵大小上限（App数 × 权重组数），控制内存占用
+WHAT_IF_BLOCK_ELEMENTS = 4_000_000
+
 
 class OpportunityAnalyzer:
     """机会分析器"""
@@ -32,19 +89,56 @@ class OpportunityAnalyzer:
         with open(config_path, 'r', encoding='utf-8') as f:
             self.config = yaml.safe_load(f)
         
+        self.config_path = config_path
         self.scoring_config = self.config.get('scoring', {})
         self.data_dir = PROJECT_ROOT / "data" / "processed"
         self.data_dir.mkdir(parents=True, exist_ok=True)
     
     def load_apps(self, data_file: str) -> List[Dict]:
-        """加载App数据"""
+        """加载App数据（支持JSON和NDJSON，NDJSON可为gzip/zstd压缩）"""
+        return list(self.iter_apps(data_file))
+    
+    def iter_apps(self, data_file: str) -> Iterator[Dict]:
+        """
+        逐条读取App数据
+        
+        NDJSON文件边读边产出，内存占用与文件大小无关；
+        旧的JSON列表文件只能整体加载后再逐条产出。
+        
+        Args:
+            data_file: data/raw/app_store下的文件名
+        """
         filepath = PROJECT_ROOT / "data" / "raw" / "app_store" / data_file
         if not filepath.exists():
             print(f"文件不存在: {filepath}")
-            return []
+            return
+        
+        if is_ndjson_file(filepath):
+            yield from iter_ndjson(filepath)
+            return
         
         with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
+            yield from json.load(f)
+    
+    def list_archive_files(self) -> List[str]:
+        """data/raw/app_store下所有采集结果文件（JSON和NDJSON，按文件名排序）"""
+        raw_dir = PROJECT_ROOT / "data" / "raw" / "app_store"
+        if not raw_dir.exists():
+            return []
+        return sorted(
+            path.name for path in raw_dir.iterdir()
+            if path.is_file() and (path.suffix == '.json' or is_ndjson_file(path))
+        )
+    
+    def iter_archive(self, files: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        依次逐条读取多个采集结果文件
+        
+        Args:
+            files: data/raw/app_store下的文件名列表，默认读取所有文件
+        """
+        for data_file in (files if files is not None else self.list_archive_files()):
+            yield from self.iter_apps(data_file)
     
     def calculate_opportunity_score(self, app: Dict) -> float:
         """
@@ -140,7 +234,6 @@ class OpportunityAnalyzer:
             # 检查最近更新日期
             current_version_date = app.get('currentVersionReleaseDate', '')
             if current_version_date:
-                from datetime import datetime
                 release_date = datetime.fromisoformat(current_version_date.replace('Z', '+00:00'))
                 days_since_update = (datetime.now(release_date.tzinfo) - release_date).days
                 
@@ -181,59 +274,588 @@ class OpportunityAnalyzer:
         else:
             return 0.5  # 免费App也可能有内购
     
-    def analyze_opportunities(self, apps: List[Dict]) -> pd.DataFrame:
+    def build_app_frame(self, apps: Iterable[Dict]) -> pd.DataFrame:
         """
-        分析机会
+        App数据 -> 评分用的列式DataFrame（一次遍历，只保留评分需要的字段）
         
         Args:
-            apps: App列表
-            
+            apps: App数据（列表或迭代器，如iter_apps的结果，不需要全部加载到内存）
+        
         Returns:
-            包含机会分数的DataFrame
+            列为APP_FIELDS的DataFrame，数值列已转换为数值类型（缺失或无效值为0）
         """
-        opportunities = []
-        
+        columns = {column: [] for column in APP_FIELDS}
+        appenders = [(columns[column].append, field) for column, field in APP_FIELDS.items()]
         for app in apps:
-            score = self.calculate_opportunity_score(app)
-            
-            opportunity = {
-                'app_id': app.get('trackId', ''),
-                'name': app.get('trackName', ''),
-                'category': app.get('primaryGenreName', ''),
-                'rating': app.get('averageUserRating', 0),
-                'review_count': app.get('userRatingCount', 0),
-                'price': app.get('price', 0),
-                'opportunity_score': score,
-                'url': app.get('trackViewUrl', ''),
-            }
-            
-            opportunities.append(opportunity)
+            for append, field in appenders:
+                append(app.get(field))
         
-        # 如果没有数据，返回空DataFrame
-        if not opportunities:
-            return pd.DataFrame(columns=['app_id', 'name', 'category', 'rating', 
-                                        'review_count', 'price', 'opportunity_score', 'url'])
+        # trackId逐个转为字符串：缺失值会让整列变成float，保存为 "1234567890.0" 这样的ID
+        columns['app_id'] = ['' if app_id is None else str(app_id) for app_id in columns['app_id']]
+        frame = pd.DataFrame(columns)
+        for column in ('name', 'category', 'url'):
+            frame[column] = frame[column].fillna('')
+        for column in ('rating', 'price'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0.0).astype(float)
+        for column in ('review_count', 'current_version_reviews'):
+            frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(0).astype('int64')
+        return frame
+    
+    def score_frame(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """
+        向量化计算所有App的各维度分数和机会分数
         
-        df = pd.DataFrame(opportunities)
+        与calculate_opportunity_score逐个计算的结果一致
+        
+        Args:
+            frame: build_app_frame返回的DataFrame
+        
+        Returns:
+            与frame同索引的DataFrame，列为各维度分数（SCORE_COMPONENTS）和opportunity_score
+        """
+        rating = frame['rating'].to_numpy(dtype=float)
+        review_count = frame['review_count'].to_numpy(dtype=float)
+        
+        scores = pd.DataFrame(index=frame.index)
+        
+        # 1. 市场规模 - 评论数分档
+        scores['market_size'] = np.take(MARKET_SIZE_SCORES,
+                                        np.searchsorted(MARKET_SIZE_BINS, review_count, side='left'))
+        
+        # 2. 竞争程度 - 评分中等 = 竞争不激烈
+        moderate = (rating >= 4.0) & (rating <= 4.5)
+        scores['competition'] = np.select([moderate, (rating > 4.5) & (rating <= 4.8)], [1.0, 0.6], 0.3)
+        
+        # 3. 用户满意度 - 评分在4.0-4.5之间 = 有改进空间
+        scores['user_satisfaction'] = np.select([moderate, (rating > 4.5) & (rating <= 4.7)], [1.0, 0.7], 0.3)
         
-        # 按分数排序
-        df = df.sort_values('opportunity_score', ascending=False)
+        # 4. 增长趋势 - 有更新日期时按距今天数分档，否则按当前版本评论占比
+        scores['growth_trend'] = self._growth_trend_vector(frame)
+        
+        # 5. 变现潜力 - 付费App
+        scores['monetization'] = np.where(frame['price'].to_numpy(dtype=float) > 0, 0.8, 0.5)
+        
+        # 加权计算总分（累加顺序与calculate_opportunity_score相同）
+        weights = self.scoring_config.get('weights', {})
+        total = np.zeros(len(frame))
+        for component, default_weight in SCORE_COMPONENTS.items():
+            total = total + scores[component].to_numpy() * weights.get(component, default_weight)
+        scores['opportunity_score'] = np.round(total, 3)
+        
+        return scores
+    
+    @staticmethod
+    def _growth_trend_vector(frame: pd.DataFrame) -> np.ndarray:
+        """增长趋势分数（_calculate_growth_trend的向量化版本）"""
+        raw_dates = frame['release_date']
+        has_date = raw_dates.notna() & (raw_dates.astype(str) != '')
+        released = pd.to_datetime(raw_dates.where(has_date), utc=True, errors='coerce', format='ISO8601')
+        days = (pd.Timestamp.now(tz='UTC') - released).dt.days.fillna(0).to_numpy()
+        age_score = np.take(UPDATE_AGE_SCORES, np.searchsorted(UPDATE_AGE_BINS, days, side='left'))
+        
+        current = frame['current_version_reviews'].to_numpy(dtype=float)
+        total = frame['review_count'].to_numpy(dtype=float)
+        ratio = np.divide(current, total, out=np.zeros(len(frame)), where=total > 0)
+        ratio_score = np.select([(total > 0) & (ratio > 0.3), (total > 0) & (ratio > 0.1)], [0.8, 0.6], 0.5)
+        
+        # 日期无法解析时与逐个计算一致，使用默认值0.5
+        return np.where(released.notna().to_numpy(), age_score,
+                        np.where(has_date.to_numpy(), 0.5, ratio_score))
+    
+    def analyze_opportunities(self, apps: Iterable[Dict]) -> pd.DataFrame:
+        """
+        分析机会（向量化评分）
+        
+        Args:
+            apps: App列表（也可以是迭代器）
+        
+        Returns:
+            满足阈值的机会及其分数、各维度分数的DataFrame（按分数降序，按app_id去重）
+        """
+        df = self.score_apps(apps)
         
         # 应用阈值过滤
+        return df.loc[df['meets_thresholds'].astype(bool), OPPORTUNITY_COLUMNS]
+    
+    def score_apps(self, apps: Iterable[Dict]) -> pd.DataFrame:
+        """
+        为所有App评分（不按阈值过滤），用于保存到数据库
+        
+        不满足阈值的App也会保存，修改权重或阈值时可以直接在数据库中重新计算
+        （DataManager.recompute_opportunity_scores），结果与重新分析一致
+        
+        Args:
+            apps: App列表（也可以是迭代器）
+            
+        Returns:
+            包含机会分数、各维度分数和meets_thresholds的DataFrame（按分数降序，按app_id去重）
+        """
+        frame = self.build_app_frame(apps)
+        
+        # 如果没有数据，返回空DataFrame
+        if frame.empty:
+            return pd.DataFrame(columns=OPPORTUNITY_COLUMNS + ['meets_thresholds'])
+        
+        frame = frame.join(self.score_frame(frame))
+        
+        # 标记是否满足阈值
         thresholds = self.scoring_config.get('thresholds', {})
         min_score = thresholds.get('min_score', 0.6)
         min_reviews = thresholds.get('min_reviews', 10)
+        frame['meets_thresholds'] = (
+            (frame['opportunity_score'] >= min_score) &
+            (frame['review_count'] >= min_reviews)
+        )
+        df = frame[OPPORTUNITY_COLUMNS + ['meets_thresholds']]
         
-        df = df[
-            (df['opportunity_score'] >= min_score) &
-            (df['review_count'] >= min_reviews)
-        ]
-        
-        # 去重（基于app_id）
+        # 按分数排序后去重（基于app_id，保留分数最高的一条）
+        df = df.sort_values('opportunity_score', ascending=False, kind='stable')
         df = df.drop_duplicates(subset=['app_id'], keep='first')
         
         return df
     
+    def analyze_file(self, data_file: str) -> pd.DataFrame:
+        """
+        分析一个采集结果文件（逐条读取，不需要把所有App数据加载到内存）
+        
+        Args:
+            data_file: data/raw/app_store下的文件名
+        """
+        return self.analyze_opportunities(self.iter_apps(data_file))
+    
+    def score_archive(self, apps: Iterable[Dict], chunk_size: int = 50000, top_k: int = 100,
+                      output_file: Optional[str] = None, dedupe_output: bool = True,
+                      on_chunk: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        分批评分（内存占用与数据总量无关）
+        
+        每次从apps中取chunk_size条记录向量化评分，通过阈值的机会立即追加写入output_file，
+        只在内存中保留分数最高的top_k个App（按app_id去重）。
+        适合重新评分全部历史数据（iter_archive或DataManager.iter_raw_data）。
+        
+        Args:
+            apps: App数据迭代器
+            chunk_size: 每批评分的记录数
+            top_k: 保留的最高分App数量
+            output_file: 通过阈值的机会写入data/processed下的该CSV文件
+            dedupe_output: 写完后按app_id对output_file去重（见_merge_part_files）；
+                           为False时只在每批内去重（由调用方合并去重）
+            on_chunk: 每批完成后的回调，参数为当前统计
+        
+        Returns:
+            {'apps', 'chunks', 'matched', 'top'(DataFrame), 'output', 'output_rows', 'elapsed'}
+            （matched为每批内去重后的数量之和，output_rows为输出文件去重后的行数）
+        """
+        thresholds = self.scoring_config.get('thresholds', {})
+        min_score = thresholds.get('min_score', 0.6)
+        min_reviews = thresholds.get('min_reviews', 10)
+        
+        stats = {'apps': 0, 'chunks': 0, 'matched': 0, 'output': None, 'elapsed': 0.0}
+        top = pd.DataFrame(columns=OPPORTUNITY_COLUMNS)
+        start = time.monotonic()
+        
+        output = None
+        output_path = self.data_dir / output_file if output_file else None
+        if output_path:
+            stats['output'] = str(output_path)
+            # 需要去重时先写入临时文件，完成后去重写入output_file
+            write_path = output_path.with_name(f"{output_path.stem}.part.csv") if dedupe_output else output_path
+            output = open(write_path, 'w', encoding='utf-8-sig', newline='')
+        
+        iterator = iter(apps)
+        try:
+            while True:
+                chunk = list(islice(iterator, chunk_size))
+                if not chunk:
+                    break
+                frame = self.build_app_frame(chunk)
+                del chunk
+                frame = frame.join(self.score_frame(frame))
+                
+                matched = frame.loc[
+                    (frame['opportunity_score'] >= min_score) &
+                    (frame['review_count'] >= min_reviews),
+                    OPPORTUNITY_COLUMNS
+                ]
+                matched = matched.sort_values('opportunity_score', ascending=False, kind='stable')
+                matched = matched.drop_duplicates(subset=['app_id'], keep='first')
+                
+                if output is not None and not matched.empty:
+                    matched.to_csv(output, header=stats['matched'] == 0, index=False)
+                
+                # 合并后只保留前top_k个（已保留的在前，分数相同时保留先出现的）
+                if top_k > 0 and not matched.empty:
+                    top = pd.concat([top, matched.head(top_k)], ignore_index=True) if not top.empty else matched.head(top_k)
+                    top = top.sort_values('opportunity_score', ascending=False, kind='stable')
+                    top = top.drop_duplicates(subset=['app_id'], keep='first').head(top_k)
+                
+                stats['apps'] += len(frame)
+                stats['chunks'] += 1
+                stats['matched'] += len(matched)
+                if on_chunk:
+                    on_chunk(dict(stats, elapsed=round(time.monotonic() - start, 3)))
+        finally:
+            if output is not None:
+                output.close()
+        
+        if output_path:
+            if dedupe_output:
+                stats['output_rows'] = self._merge_part_files(output_path, [str(write_path)])
+            else:
+                stats['output_rows'] = stats['matched']
+        stats['top'] = top.reset_index(drop=True)
+        stats['elapsed'] = round(time.monotonic() - start, 3)
+        print(f"分批评分完成: {stats['apps']} 个App，{stats['chunks']} 批，"
+              f"{stats['matched']} 个通过阈值，耗时 {stats['elapsed']} 秒")
+        return stats
+    
+    def plan_partitions(self, source: str = 'files', files: Optional[List[str]] = None,
+                        partitions: int = 1, data_manager: Optional[DataManager] = None) -> List[Dict]:
+        """
+        把历史数据划分为可以独立评分的分区
+        
+        Args:
+            source: 'files'（每个采集结果文件一个分区）或 'db'（raw_apps表按id范围划分）
+            files: source为files时的文件列表，默认所有文件
+            partitions: source为db时划分的分区数
+            data_manager: source为db时使用的DataManager
+        
+        Returns:
+            分区列表，按原始数据顺序排列
+        """
+        if source == 'db':
+            data_manager = data_manager or DataManager()
+            min_id, max_id, count = data_manager.get_raw_id_range('app_store')
+            if not count:
+                return []
+            partitions = max(1, min(partitions, count))
+            step = (max_id - min_id + partitions) // partitions
+            return [
+                {'kind': 'db', 'db_path': str(data_manager.db_path),
+                 'start_id': start, 'end_id': min(start + step, max_id + 1)}
+                for start in range(min_id, max_id + 1, step)
+            ]
+        if source != 'files':
+            raise ValueError(f"不支持的数据来源: {source}")
+        return [{'kind': 'file', 'file': data_file}
+                for data_file in (files if files is not None else self.list_archive_files())]
+    
+    def score_archive_parallel(self, source: str = 'files', files: Optional[List[str]] = None,
+                               max_workers: Optional[int] = None, memory_per_worker_mb: Optional[int] = None,
+                               chunk_size: Optional[int] = None, top_k: int = 100,
+                               output_file: Optional[str] = None, data_manager: Optional[DataManager] = None,
+                               on_partition: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        多进程分区评分
+        
+        历史数据按文件或id范围划分为分区，由进程池在所有CPU核心上并行评分（每个worker内部仍是
+        score_archive的分批向量化评分），最后按分区顺序合并：
+        Top K按分数排序、分数相同时按原始数据顺序，再按app_id去重，结果与并行度无关；
+        各分区通过阈值的机会写入临时文件，完成后按app_id去重合并为output_file（见_merge_part_files）。
+        
+        Args:
+            source: 'files' 或 'db'（见plan_partitions）
+            files: source为files时的文件列表
+            max_workers: worker进程数，默认使用config.yaml中的 rescoring.workers（0表示CPU核心数）
+            memory_per_worker_mb: 每个worker的内存预算（MB），用于计算每批记录数，
+                                  默认使用config.yaml中的 rescoring.memory_per_worker_mb
+            chunk_size: 每批记录数（指定时忽略memory_per_worker_mb）
+            top_k: 保留的最高分App数量
+            output_file: 通过阈值的机会写入data/processed下的该CSV文件
+            data_manager: source为db时使用的DataManager
+            on_partition: 每个分区完成后的回调，参数为该分区的统计
+        
+        Returns:
+            {'apps', 'chunks', 'matched', 'partitions', 'workers', 'chunk_size', 'top'(DataFrame),
+             'output', 'output_rows', 'elapsed'}
+        """
+        config = dict(DEFAULT_RESCORING_CONFIG, **(self.config.get('rescoring') or {}))
+        workers = int(max_workers or config['workers'] or os.cpu_count() or 1)
+        memory_mb = memory_per_worker_mb or config['memory_per_worker_mb']
+        chunk_size = chunk_size or max(1000, int(memory_mb * 1024 * 1024 // APPROX_RECORD_BYTES))
+        start = time.monotonic()
+        
+        # db分区多于worker数，各worker的负载更均衡
+        tasks = self.plan_partitions(source, files, partitions=workers * 4, data_manager=data_manager)
+        output_path = self.data_dir / output_file if output_file else None
+        for index, task in enumerate(tasks):
+            task.update({
+                'index': index,
+                'config_path': str(self.config_path),
+                # 传入当前评分配置（可能已在内存中修改），worker不重新读取config.yaml中的scoring
+                'scoring_config': self.scoring_config,
+                'chunk_size': chunk_size,
+                'top_k': top_k,
+                'output_file': f"{output_path.stem}.part{index:04d}.csv" if output_path else None,
+            })
+        
+        results: List[Optional[Dict]] = [None] * len(tasks)
+        workers = max(1, min(workers, len(tasks)))
+        if workers == 1:
+            # 只有一个worker时直接在当前进程评分，省去进程启动和结果传输
+            for task in tasks:
+                results[task['index']] = _score_partition(task)
+                if on_partition:
+                    on_partition(results[task['index']])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_score_partition, task) for task in tasks]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result['partition']] = result
+                    if on_partition:
+                        on_partition(result)
+        
+        stats = {'apps': 0, 'chunks': 0, 'matched': 0, 'partitions': len(tasks), 'workers': workers,
+                 'chunk_size': chunk_size, 'output': str(output_path) if output_path else None}
+        tops = []
+        for result in results:
+            stats['apps'] += result['apps']
+            stats['chunks'] += result['chunks']
+            stats['matched'] += result['matched']
+            if not result['top'].empty:
+                tops.append(result['top'])
+        
+        # 按分区顺序拼接后稳定排序，分数相同时保留原始数据中先出现的App
+        if tops:
+            top = pd.concat(tops, ignore_index=True).sort_values('opportunity_score', ascending=False, kind='stable')
+            top = top.drop_duplicates(subset=['app_id'], keep='first').head(top_k).reset_index(drop=True)
+        else:
+            top = pd.DataFrame(columns=OPPORTUNITY_COLUMNS)
+        stats['top'] = top
+        
+        if output_path:
+            stats['output_rows'] = self._merge_part_files(output_path, [result['output'] for result in results])
+        
+        stats['elapsed'] = round(time.monotonic() - start, 3)
+        print(f"并行评分完成: {stats['apps']} 个App，{stats['partitions']} 个分区，{workers} 个worker，"
+              f"{stats['matched']} 个通过阈值，耗时 {stats['elapsed']} 秒")
+        return stats
+    
+    @staticmethod
+    def _merge_part_files(output_path: Path, part_paths: List[Optional[str]]) -> int:
+        """
+        把各分区的CSV按app_id去重合并为output_path，然后删除分区文件
+        
+        同一App出现在多个快照（多个批次或分区）中时保留分数最高的一行，分数相同时保留原始数据中
+        先出现的一行；输出按分数降序、app_id升序排列，因此结果与分区方式、并行度和每批记录数无关。
+        去重在磁盘上的临时SQLite数据库中完成，内存占用与通过阈值的机会数量无关。
+        
+        Returns:
+            输出的行数
+        """
+        db_path = output_path.with_name(f"{output_path.stem}.merge.db")
+        db_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute('CREATE TABLE rows (app_id TEXT, score REAL, seq INTEGER, row TEXT)')
+            header = None
+            seq = 0
+            for part_path in part_paths:
+                if not part_path or not Path(part_path).exists():
+                    continue
+                with open(part_path, 'r', encoding='utf-8-sig', newline='') as f:
+                    reader = csv.reader(f)
+                    part_header = next(reader, None)
+                    if not part_header:
+                        continue
+                    header = header or part_header
+                    app_id_index = part_header.index('app_id')
+                    score_index = part_header.index('opportunity_score')
+                    batch = []
+                    for row in reader:
+                        # 各分区文件内的行序与原始数据中同一App的先后顺序一致（每批内已去重）
+                        batch.append((row[app_id_index], float(row[score_index]), seq, json.dumps(row)))
+                        seq += 1
+                        if len(batch) >= 10000:
+                            conn.executemany('INSERT INTO rows VALUES (?, ?, ?, ?)', batch)
+                            batch = []
+                    conn.executemany('INSERT INTO rows VALUES (?, ?, ?, ?)', batch)
+            conn.commit()
+            
+            count = 0
+            with open(output_path, 'w', encoding='utf-8-sig', newline='') as output:
+                if header:
+                    writer = csv.writer(output, lineterminator='\n')
+                    writer.writerow(header)
+                    cursor = conn.execute('''
+                        SELECT row FROM (
+                            SELECT app_id, score, row, ROW_NUMBER() OVER (
+                                PARTITION BY app_id ORDER BY score DESC, seq
+                            ) AS rank FROM rows
+                        ) WHERE rank = 1 ORDER BY score DESC, app_id
+                    ''')
+                    for (row,) in cursor:
+                        writer.writerow(json.loads(row))
+                        count += 1
+        finally:
+            conn.close()
+            db_path.unlink(missing_ok=True)
+        
+        for part_path in part_paths:
+            if part_path:
+                Path(part_path).unlink(missing_ok=True)
+        return count
+    
+    def rescore_saved_opportunities(self, data_manager: Optional[DataManager] = None) -> Dict:
+        """
+        按当前的权重和阈值重新计算数据库中已保存机会的分数（使用保存的各维度分数，不重新分析原始数据）
+        
+        Returns:
+            DataManager.recompute_opportunity_scores的统计，另含elapsed（秒）
+        """
+        data_manager = data_manager or DataManager()
+        weights = self.scoring_config.get('weights', {})
+        thresholds = self.scoring_config.get('thresholds', {})
+        
+        start = time.monotonic()
+        stats = data_manager.recompute_opportunity_scores(
+            {component: weights.get(component, default_weight)
+             for component, default_weight in SCORE_COMPONENTS.items()},
+            min_score=thresholds.get('min_score', 0.6),
+            min_reviews=thresholds.get('min_reviews', 10)
+        )
+        stats['elapsed'] = round(time.monotonic() - start, 3)
+        print(f"已重新计算 {stats['updated']} 个机会的分数，{stats['meets_thresholds']} 个满足阈值，"
+              f"耗时 {stats['elapsed']} 秒")
+        return stats
+    
+    def score_weight_matrix(self, components: pd.DataFrame, weight_sets: List[Dict[str, float]],
+                            top_k: int = 20) -> Dict:
+        """
+        按多组候选权重一次性为所有App评分（分数矩阵 = 维度分数矩阵 × 权重矩阵的转置）
+        
+        components应包含所有评分过的App（而不只是当前权重下通过阈值的机会），
+        否则比较结果会偏向当前配置。与当前配置的权重（基准）比较每组权重的排名变化：
+        - spearman: 所有App的分数排名与基准的Spearman相关系数（分数相同的取平均排名）
+        - jaccard: Top K与基准Top K的Jaccard相似度
+        
+        Args:
+            components: 包含SCORE_COMPONENTS各列的DataFrame（如score_frame的结果或
+                        DataManager.get_opportunity_components），有app_id、name列时一并返回，
+                        有review_count列时按min_reviews阈值筛选Top K和满足阈值的数量
+            weight_sets: 候选权重列表，每组为 维度 -> 权重（非负的有限数值），缺少的维度使用当前配置的权重
+            top_k: 每组权重返回的最高分App数量（分数相同时按components中的顺序）
+        
+        Returns:
+            {'apps', 'thresholds', 'baseline': {'weights', 'top', 'meets_thresholds'},
+             'results': [{'weights', 'top', 'meets_thresholds', 'spearman', 'jaccard'}], 'elapsed'}
+        """
+        start = time.monotonic()
+        configured = self.scoring_config.get('weights', {})
+        baseline_weights = {component: float(configured.get(component, default_weight))
+                            for component, default_weight in SCORE_COMPONENTS.items()}
+        thresholds = self.scoring_config.get('thresholds', {})
+        min_score = thresholds.get('min_score', 0.6)
+        min_reviews = thresholds.get('min_reviews', 10)
+        
+        weight_rows = []
+        for weights in weight_sets:
+            unknown = set(weights) - set(SCORE_COMPONENTS)
+            if unknown:
+                raise ValueError(f"未知的评分维度: {sorted(unknown)}")
+            row = [float(weights.get(component, baseline_weights[component])) for component in SCORE_COMPONENTS]
+            # NaN/Infinity会让整个分数列失去意义，负权重会把该维度的优势变成扣分
+            invalid = [component for component, weight in zip(SCORE_COMPONENTS, row)
+                       if not math.isfinite(weight) or weight < 0]
+            if invalid:
+                raise ValueError(f"权重必须是非负的有限数值: {invalid}")
+            weight_rows.append(row)
+        
+        matrix = components[list(SCORE_COMPONENTS)].to_numpy(dtype=float)
+        app_ids = (components['app_id'] if 'app_id' in components else components.index).tolist()
+        names = components['name'].tolist() if 'name' in components else [''] * len(app_ids)
+        # 评论数不满足阈值的App不进入Top K（与机会列表一致），但参与排名相关系数的计算
+        if 'review_count' in components:
+            eligible = np.flatnonzero(components['review_count'].fillna(0).to_numpy() >= min_reviews)
+        else:
+            eligible = np.arange(len(matrix))
+        
+        def top_indices(scores: np.ndarray) -> np.ndarray:
+            return eligible[self._top_indices(scores[eligible], top_k)]
+        
+        def summary(scores: np.ndarray, top: np.ndarray) -> Dict:
+            return {
+                'top': [{'app_id': app_ids[i], 'name': names[i], 'opportunity_score': float(scores[i])}
+                        for i in top],
+                'meets_thresholds': int((scores[eligible] >= min_score).sum()),
+            }
+        
+        # 基准：当前配置的权重（与score_frame相同，分数保留3位小数）
+        baseline_scores = np.round(matrix @ np.array([baseline_weights[c] for c in SCORE_COMPONENTS]), 3)
+        baseline_top = top_indices(baseline_scores)
+        baseline_rank = self._centered_ranks(baseline_scores[:, None])[:, 0]
+        baseline_norm = np.linalg.norm(baseline_rank)
+        
+        results = []
+        if weight_rows and len(matrix):
+            weights_matrix = np.array(weight_rows)
+            block = max(1, WHAT_IF_BLOCK_ELEMENTS // len(matrix))
+            for offset in range(0, len(weights_matrix), block):
+                scores = np.round(matrix @ weights_matrix[offset:offset + block].T, 3)
+                ranks = self._centered_ranks(scores)
+                norms = np.linalg.norm(ranks, axis=0) * baseline_norm
+                correlations = np.divide(baseline_rank @ ranks, norms,
+                                         out=np.full(ranks.shape[1], np.nan), where=norms > 0)
+                for column in range(scores.shape[1]):
+                    top = top_indices(scores[:, column])
+                    union = len(np.union1d(top, baseline_top))
+                    results.append(dict(
+                        summary(scores[:, column], top),
+                        weights=dict(zip(SCORE_COMPONENTS, weights_matrix[offset + column].tolist())),
+                        spearman=None if np.isnan(correlations[column]) else round(float(correlations[column]), 4),
+                        jaccard=round(len(np.intersect1d(top, baseline_top)) / union, 4) if union else None,
+                    ))
+        elif weight_rows:
+            results = [{'weights': dict(zip(SCORE_COMPONENTS, row)), 'top': [], 'meets_thresholds': 0,
+                        'spearman': None, 'jaccard': None} for row in weight_rows]
+        
+        elapsed = round(time.monotonic() - start, 3)
+        print(f"批量试算完成: {len(matrix)} 个App × {len(weight_rows)} 组权重，耗时 {elapsed} 秒")
+        return {
+            'apps': len(matrix),
+            'thresholds': {'min_score': min_score, 'min_reviews': min_reviews},
+            'baseline': dict(summary(baseline_scores, baseline_top), weights=baseline_weights),
+            'results': results,
+            'elapsed': elapsed,
+        }
+    
+    @staticmethod
+    def _top_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """分数最高的top_k个下标（分数降序，分数相同时下标小的在前）"""
+        count = len(scores)
+        if top_k <= 0 or count == 0:
+            return np.array([], dtype=int)
+        if top_k < count:
+            # 先用partition找出第top_k高的分数，只对不低于它的候选排序
+            kth = np.partition(scores, count - top_k)[count - top_k]
+            candidates = np.flatnonzero(scores >= kth)
+        else:
+            candidates = np.arange(count)
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order][:top_k]
+    
+    @staticmethod
+    def _centered_ranks(scores: np.ndarray) -> np.ndarray:
+        """
+        每列分数的排名（分数相同取平均排名）减去平均排名，用于计算Spearman相关系数
+        
+        分数保留3位小数，取值个数有限：按分数计数后用累计个数得到平均排名，不需要排序
+        """
+        count, columns = scores.shape
+        keys = np.rint(scores * 1000).astype(np.int64)
+        keys -= keys.min(axis=0) if count else 0
+        span = int(keys.max()) + 1 if count else 1
+        if span * columns > WHAT_IF_BLOCK_ELEMENTS:
+            # 权重很大时分数取值范围过大，改为排序计算排名
+            ranks = pd.DataFrame(scores).rank(axis=0, method='average').to_numpy()
+        else:
+            counts = np.bincount((keys + np.arange(columns) * span).ravel(),
+                                 minlength=span * columns).reshape(columns, span)
+            average_rank = np.cumsum(counts, axis=1) - counts + (counts + 1) / 2.0
+            ranks = average_rank[np.arange(columns), keys]
+        return ranks - (count + 1) / 2.0
+    
     def save_opportunities(self, df: pd.DataFrame, filename: str = "opportunities.csv"):
         """保存机会分析结果"""
         filepath = self.data_dir / filename
@@ -242,6 +864,21 @@ class OpportunityAnalyzer:
         return filepath
 
 
+def _score_partition(task: Dict) -> Dict:
+    """在worker进程中评分一个分区（模块级函数，才能被进程池序列化）"""
+    analyzer = OpportunityAnalyzer(task['config_path'])
+    analyzer.scoring_config = task['scoring_config']
+    if task['kind'] == 'db':
+        apps = DataManager(task['db_path']).iter_raw_data('app_store', start_id=task['start_id'],
+                                                          end_id=task['end_id'])
+    else:
+        apps = analyzer.iter_apps(task['file'])
+    stats = analyzer.score_archive(apps, chunk_size=task['chunk_size'], top_k=task['top_k'],
+                                   output_file=task['output_file'], dedupe_output=False)
+    stats['partition'] = task['index']
+    return stats
+
+
 def main():
     """测试脚本"""
     analyzer = OpportunityAnalyzer()
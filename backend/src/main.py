@@ -27,21 +27,13 @@ def main():
     # 搜索关键词（可以根据需要修改）
     keywords = ["productivity", "task management", "note taking"]
     
-    all_apps = []
-    seen_app_ids = set()  # 用于去重
+    # 先解析所有关键词的App ID并合并去重，每个App的详情只获取一次
+    plan = scraper.plan_search(keywords, limit=20)
+    for keyword, hits in plan['keyword_hits'].items():
+        print(f"关键词 {keyword}: 找到 {hits} 个App")
+    print(f"去重后共 {len(plan['app_ids'])} 个App需要获取详情")
     
-    for keyword in keywords:
-        print(f"\n搜索关键词: {keyword}")
-        apps = scraper.search_apps(keyword, limit=20)
-        
-        # 去重：基于trackId
-        for app in apps:
-            app_id = app.get('trackId')
-            if app_id and app_id not in seen_app_ids:
-                seen_app_ids.add(app_id)
-                all_apps.append(app)
-        
-        print(f"找到 {len(apps)} 个App，新增 {len([a for a in apps if a.get('trackId') not in seen_app_ids])} 个")
+    all_apps = scraper.fetch_plan(plan)
     
     if not all_apps:
         print("未找到任何App，请检查网络连接或工具安装")
@@ -60,10 +52,9 @@ def main():
     print("\n[3/3] 保存结果...")
     opportunity_file = analyzer.save_opportunities(df)
     
-    # 保存到数据库
+    # 保存到数据库（所有评分结果，修改权重/阈值时可以直接重新计算）
     data_manager = DataManager()
-    for _, row in df.iterrows():
-        data_manager.save_opportunity(row.to_dict())
+    data_manager.save_opportunities(analyzer.score_apps(all_apps).to_dict('records'))
     
     # 4. 输出Top机会
     print("\n" + "=" * 50)
@@ -0,0 +1 @@
+# 采集管道模块
@@ -0,0 +1,139 @@
+"""
+数据源插件注册表
+每个数据源实现一个SourcePlugin：把采集参数拆成工作单元（plan），
+用协程获取（fetch）和解析（parse）每个工作单元；并发、限速、重试和存储由
+pipeline.runtime.CollectionRuntime统一处理
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Type
+
+
+class WorkItem:
+    """一个工作单元"""
+    
+    def __init__(self, kind: str, payload: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            kind: 工作类型，由插件自己定义（如 'search'、'lookup'）
+            payload: 工作参数
+        """
+        self.kind = kind
+        self.payload = payload or {}
+        # 已尝试次数（运行时维护）
+        self.attempts = 0
+    
+    def __repr__(self):
+        return f"WorkItem({self.kind!r}, {self.payload!r})"
+
+
+class SourcePlugin(ABC):
+    """
+    数据源插件基类
+    
+    子类需要设置 name，并实现 plan / fetch / parse：
+    - plan(params)：采集参数 -> 初始工作单元列表
+    - fetch(item)：协程，获取一个工作单元的原始数据（出错时抛异常，由运行时重试）
+    - parse(item, raw)：协程，原始数据 -> 记录列表；列表中的WorkItem会作为后续工作加入队列
+    """
+    
+    # 数据源名称（注册表键，也是保存原始数据时的source）
+    name: str = ''
+    # 数据源说明
+    description: str = ''
+    # 同时处理的工作单元上限（上游客户端非线程安全时设为1）
+    max_concurrency: int = 8
+    # 存储时使用的数据类型：'raw'（raw_apps表）或 'trend'（search_trends表）
+    record_type: str = 'raw'
+    
+    def __init__(self, **options):
+        """
+        Args:
+            **options: 插件选项（如限速间隔），由调用方透传
+        """
+        self.options = options
+    
+    @abstractmethod
+    def plan(self, params: Dict) -> List[WorkItem]:
+        ...
+    
+    @abstractmethod
+    async def fetch(self, item: WorkItem) -> Any:
+        ...
+    
+    @abstractmethod
+    async def parse(self, item: WorkItem, raw: Any) -> List:
+        ...
+    
+    def rate_limit_key(self, item: WorkItem) -> Optional[str]:
+        """
+        运行时在fetch前需要获取的限速器名称
+        
+        插件直接发HTTP请求时返回上游名称，由运行时限速并根据结果调整速率；
+        复用已有爬虫（爬虫内部已经按上游限速）时返回None
+        """
+        return None
+    
+    def rate_limit_interval(self) -> float:
+        """首次创建限速器时的初始请求间隔（秒）"""
+        return float(self.options.get('delay', 1.0))
+
+
+# 已注册的数据源插件
+_sources: Dict[str, Type[SourcePlugin]] = {}
+# 可重入：导入内置插件时持有该锁，导入过程中register_source会再次获取
+_sources_lock = threading.RLock()
+_builtin_loaded = False
+
+
+def register_source(cls: Type[SourcePlugin]) -> Type[SourcePlugin]:
+    """
+    注册数据源插件（类装饰器）
+    
+    Example:
+        @register_source
+        class MySource(SourcePlugin):
+            name = 'my_source'
+    """
+    if not cls.name:
+        raise ValueError(f"数据源插件 {cls.__name__} 没有设置name")
+    with _sources_lock:
+        _sources[cls.name] = cls
+    return cls
+
+
+def _load_builtin_sources():
+    """导入内置数据源插件（导入时自动注册；导入成功后才标记为已加载，失败时下次重试）"""
+    global _builtin_loaded
+    if _builtin_loaded:
+        return
+    with _sources_lock:
+        if not _builtin_loaded:
+            import pipeline.sources  # noqa: F401
+            _builtin_loaded = True
+
+
+def get_source(name: str, **options) -> SourcePlugin:
+    """
+    创建指定数据源的插件实例
+    
+    Raises:
+        KeyError: 数据源未注册
+    """
+    _load_builtin_sources()
+    with _sources_lock:
+        cls = _sources.get(name)
+    if cls is None:
+        raise KeyError(f"未知的数据源: {name}")
+    return cls(**options)
+
+
+def list_sources() -> List[Dict]:
+    """列出已注册的数据源"""
+    _load_builtin_sources()
+    with _sources_lock:
+        return [
+            {'name': name, 'description': cls.description, 'record_type': cls.record_type}
+            for name, cls in sorted(_sources.items())
+        ]
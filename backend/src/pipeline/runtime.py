@@ -0,0 +1,167 @@
+"""
+异步采集运行时
+所有数据源共用的采集循环：工作队列 + 固定数量的协程worker，
+负责并发控制、限速、失败重试和把记录写入存储
+"""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional
+
+from pipeline.registry import SourcePlugin, WorkItem
+from pipeline.sinks import Sink
+from utils.rate_limiter import THROTTLE_STATUS_CODES, get_rate_limiter
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """从异常中取出HTTP状态码（requests.HTTPError、pytrends.ResponseError等带response的异常）"""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    return headers.get('Retry-After')
+
+
+class CollectionRuntime:
+    """
+    异步采集运行时
+    
+    plan出的工作单元放入队列，由 concurrency 个worker并发处理：
+    获取限速许可 -> fetch -> parse -> 记录写入所有sink，parse返回的WorkItem加入队列继续处理。
+    fetch失败时按指数退避重试；4xx错误（限流除外）不重试。
+    """
+    
+    def __init__(self, concurrency: int = 8, max_retries: int = 3, retry_backoff: float = 1.0,
+                 should_stop: Optional[Callable[[], bool]] = None):
+        """
+        Args:
+            concurrency: 同时处理的工作单元数量（不超过插件的max_concurrency）
+            max_retries: 每个工作单元的最大重试次数
+            retry_backoff: 第一次重试前的等待时间（秒），之后每次翻倍
+            should_stop: 返回True时停止处理剩余的工作单元（如任务被用户停止）
+        """
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.should_stop = should_stop
+    
+    def run(self, source: SourcePlugin, params: Dict, sinks: Optional[List[Sink]] = None,
+            on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """
+        同步入口：在当前线程中运行事件循环直到采集完成
+        
+        Args:
+            source: 数据源插件
+            params: 采集参数（传给source.plan）
+            sinks: 记录存储列表
+            on_progress: 每处理完一个工作单元后的回调，参数为当前统计
+        
+        Returns:
+            采集统计：items、completed、failed、retries、records、skipped、elapsed、errors
+        """
+        return asyncio.run(self.run_async(source, params, sinks=sinks, on_progress=on_progress))
+    
+    async def run_async(self, source: SourcePlugin, params: Dict, sinks: Optional[List[Sink]] = None,
+                        on_progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        sinks = sinks or []
+        stats = {
+            'source': source.name,
+            'items': 0,
+            'completed': 0,
+            'failed': 0,
+            'retries': 0,
+            'records': 0,
+            'skipped': 0,
+            'elapsed': 0.0,
+            'errors': [],
+        }
+        start = time.monotonic()
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in await asyncio.to_thread(source.plan, params):
+            queue.put_nowait(item)
+            stats['items'] += 1
+        
+        workers = [
+            asyncio.create_task(self._worker(source, queue, sinks, stats, on_progress))
+            for _ in range(min(self.concurrency, max(1, source.max_concurrency)))
+        ]
+        try:
+            await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            for sink in sinks:
+                await asyncio.to_thread(sink.close)
+        
+        stats['elapsed'] = round(time.monotonic() - start, 3)
+        print(f"[{source.name}] 采集完成: {stats['completed']}/{stats['items']} 个工作单元，"
+              f"{stats['records']} 条记录，失败 {stats['failed']}，重试 {stats['retries']}，"
+              f"耗时 {stats['elapsed']} 秒")
+        return stats
+    
+    async def _worker(self, source: SourcePlugin, queue: asyncio.Queue, sinks: List[Sink],
+                      stats: Dict, on_progress: Optional[Callable[[Dict], None]]):
+        while True:
+            item = await queue.get()
+            try:
+                if self.should_stop and self.should_stop():
+                    stats['skipped'] += 1
+                    continue
+                
+                results = await self._process(source, item, stats)
+                records = []
+                for result in results or []:
+                    if isinstance(result, WorkItem):
+                        queue.put_nowait(result)
+                        stats['items'] += 1
+                    else:
+                        records.append(result)
+                
+                if records:
+                    for sink in sinks:
+                        await asyncio.to_thread(sink.write, records)
+                stats['records'] += len(records)
+                stats['completed'] += 1
+            except Exception as e:
+                stats['failed'] += 1
+                # 只保留最近的错误，避免大量失败时占用过多内存
+                stats['errors'] = (stats['errors'] + [f"{item.kind} {item.payload}: {e}"])[-20:]
+                print(f"[{source.name}] 工作单元失败 {item}: {e}")
+            finally:
+                queue.task_done()
+                if on_progress:
+                    on_progress(stats)
+    
+    async def _process(self, source: SourcePlugin, item: WorkItem, stats: Dict) -> List:
+        """获取并解析一个工作单元（带限速和重试）"""
+        key = source.rate_limit_key(item)
+        limiter = get_rate_limiter(key, source.rate_limit_interval()) if key else None
+        
+        for attempt in range(self.max_retries + 1):
+            item.attempts += 1
+            if limiter:
+                await asyncio.to_thread(limiter.acquire)
+            try:
+                raw = await source.fetch(item)
+            except Exception as e:
+                status = _status_code(e)
+                throttled = False
+                if limiter and status is not None:
+                    throttled = await asyncio.to_thread(limiter.report, status, _retry_after(e))
+                # 客户端错误（如404）重试也不会成功
+                retryable = throttled or status is None or status >= 500 or status in THROTTLE_STATUS_CODES
+                if attempt >= self.max_retries or not retryable:
+                    raise
+                stats['retries'] += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+                continue
+            
+            if limiter:
+                await asyncio.to_thread(limiter.on_success)
+            return await source.parse(item, raw)
+        return []
@@ -0,0 +1,121 @@
+"""
+采集结果存储
+运行时把每个工作单元解析出的记录交给所有存储（sink）；
+数据库存储按批写入，文件存储逐条流式写入
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Union
+
+from utils.record_store import NDJSONWriter
+
+
+class Sink(ABC):
+    """存储基类"""
+    
+    @abstractmethod
+    def write(self, records: List[Dict]):
+        ...
+    
+    def close(self):
+        pass
+
+
+class ListSink(Sink):
+    """保存在内存列表中（结果需要继续分析时使用）"""
+    
+    def __init__(self):
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def write(self, records: List[Dict]):
+        with self._lock:
+            self.records.extend(records)
+
+
+class NDJSONSink(Sink):
+    """逐条写入NDJSON文件（压缩方式由文件后缀决定）"""
+    
+    def __init__(self, path: Union[str, Path], append: bool = False):
+        self.writer = NDJSONWriter(path, append=append)
+    
+    @property
+    def path(self) -> Path:
+        return self.writer.path
+    
+    @property
+    def count(self) -> int:
+        return self.writer.count
+    
+    def write(self, records: List[Dict]):
+        self.writer.write_many(records)
+    
+    def close(self):
+        self.writer.close()
+
+
+class DataManagerSink(Sink):
+    """
+    按批写入数据库
+    
+    record_type为 'raw' 时写入raw_apps（DataManager.save_raw_data），
+    为 'trend' 时写入search_trends（DataManager.save_trend_batch）
+    """
+    
+    def __init__(self, data_manager, source: str, record_type: str = 'raw', batch_size: int = 500):
+        """
+        Args:
+            data_manager: DataManager实例
+            source: 数据来源（raw_apps.source）
+            record_type: 'raw' 或 'trend'
+            batch_size: 攒够多少条记录写入一次
+        """
+        if record_type not in ('raw', 'trend'):
+            raise ValueError(f"不支持的记录类型: {record_type}")
+        self.data_manager = data_manager
+        self.source = source
+        self.record_type = record_type
+        self.batch_size = max(1, batch_size)
+        self.count = 0
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+    
+    def write(self, records: List[Dict]):
+        with self._lock:
+            self._buffer.extend(records)
+            if len(self._buffer) < self.batch_size:
+                return
+            batch, self._buffer = self._buffer, []
+        self._save(batch)
+    
+    def _save(self, batch: List[Dict]):
+        if not batch:
+            return
+        if self.record_type == 'trend':
+            self.data_manager.save_trend_batch(batch)
+        else:
+            self.data_manager.save_raw_data(batch, self.source)
+        with self._lock:
+            self.count += len(batch)
+    
+    def close(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        self._save(batch)
+
+
+class CallbackSink(Sink):
+    """把记录交给回调函数（如更新任务进度）"""
+    
+    def __init__(self, callback: Callable[[List[Dict]], None], on_close: Optional[Callable[[], None]] = None):
+        self.callback = callback
+        self.on_close = on_close
+    
+    def write(self, records: List[Dict]):
+        self.callback(records)
+    
+    def close(self):
+        if self.on_close:
+            self.on_close()
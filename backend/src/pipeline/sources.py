@@ -0,0 +1,191 @@
+"""
+内置数据源插件
+复用已有爬虫的请求逻辑（缓存、共享连接池、按上游自适应限速都在爬虫内部完成），
+阻塞的HTTP请求在线程中执行，由运行时统一调度并发和重试
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from pipeline.registry import SourcePlugin, WorkItem, register_source
+from scrapers.app_store_scraper import AppStoreScraperWrapper, load_configured_countries
+from scrapers.product_hunt_scraper import ProductHuntScraper, load_daily_limit
+from scrapers.trend_scraper import TrendScraper, anchor_scale_factor, plan_anchor_batches
+
+
+@register_source
+class AppStoreSource(SourcePlugin):
+    """
+    App Store：关键词搜索 -> 批量lookup
+    
+    params: {'keywords': [...], 'countries': ['us'], 'limit': 50}
+    每个 (国家, 关键词) 一个search工作单元；搜索结果中没见过的App按批生成lookup工作单元，
+    同一个App在同一个国家只获取一次详情
+    """
+    
+    name = 'app_store'
+    description = 'App Store关键词搜索 + 批量获取App详情'
+    max_concurrency = 8
+    
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.scraper = options.get('scraper') or AppStoreScraperWrapper(
+            delay=options.get('delay', 1.0), use_cache=options.get('use_cache', True))
+        self._seen = set()
+        self._provenance: Dict[tuple, List[Dict]] = {}
+    
+    def plan(self, params: Dict) -> List[WorkItem]:
+        countries = params.get('countries') or load_configured_countries()
+        limit = params.get('limit', 50)
+        return [
+            WorkItem('search', {'keyword': keyword, 'country': country.lower(), 'limit': limit})
+            for country in countries
+            for keyword in params.get('keywords', [])
+        ]
+    
+    async def fetch(self, item: WorkItem) -> Any:
+        payload = item.payload
+        if item.kind == 'search':
+            return await asyncio.to_thread(self.scraper.search_app_ids, payload['keyword'],
+                                           country=payload['country'], limit=payload['limit'])
+        return await asyncio.to_thread(self.scraper.get_apps_details_batch, payload['app_ids'],
+                                       country=payload['country'])
+    
+    async def parse(self, item: WorkItem, raw: Any) -> List:
+        country = item.payload['country']
+        if item.kind == 'search':
+            new_ids = []
+            for rank, app_id in enumerate(raw, start=1):
+                key = (country, str(app_id))
+                self._provenance.setdefault(key, []).append({'keyword': item.payload['keyword'], 'rank': rank})
+                if key not in self._seen:
+                    self._seen.add(key)
+                    new_ids.append(app_id)
+            size = self.scraper.batch_size
+            return [
+                WorkItem('lookup', {'country': country, 'app_ids': new_ids[i:i + size]})
+                for i in range(0, len(new_ids), size)
+            ]
+        
+        for app in raw:
+            app['search_provenance'] = self._provenance.get((country, str(app.get('trackId'))), [])
+        return raw
+
+
+@register_source
+class ProductHuntSource(SourcePlugin):
+    """
+    Product Hunt：今日热门列表 -> 产品详情
+    
+    params: {'limit': 50, 'fetch_details': True}，limit默认使用config.yaml中的daily_limit
+    请求失败时异常交给运行时处理（限流和5xx错误按退避重试，失败计入统计）
+    """
+    
+    name = 'product_hunt'
+    description = 'Product Hunt今日热门产品及详情'
+    max_concurrency = 8
+    
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.scraper = options.get('scraper') or ProductHuntScraper(
+            delay=options.get('delay', 0.5), use_cache=options.get('use_cache', True))
+    
+    def plan(self, params: Dict) -> List[WorkItem]:
+        return [WorkItem('list', {'limit': params.get('limit') or load_daily_limit(),
+                                  'fetch_details': params.get('fetch_details', True)})]
+    
+    async def fetch(self, item: WorkItem) -> Any:
+        if item.kind == 'list':
+            return await asyncio.to_thread(self.scraper.fetch_today_products, limit=item.payload['limit'])
+        return await asyncio.to_thread(self.scraper.fetch_product_details, item.payload['product']['url'])
+    
+    async def parse(self, item: WorkItem, raw: Any) -> List:
+        if item.kind == 'list':
+            if not item.payload['fetch_details']:
+                return raw
+            # 没有详情页地址的产品直接保存列表数据
+            return [WorkItem('detail', {'product': product}) if product.get('url') else product
+                    for product in raw]
+        
+        product = dict(item.payload['product'])
+        for key, value in (raw or {}).items():
+            if value not in (None, '', [], 0) or key not in product:
+                product[key] = value
+        return [product]
+
+
+@register_source
+class GoogleTrendsSource(SourcePlugin):
+    """
+    Google Trends：每个payload最多5个关键词
+    
+    params: {'keywords': [...], 'timeframe': 'today 12-m', 'geo': '', 'anchor': None}
+    每批都带上同一个锚点关键词（默认第一个关键词），所有批次在plan时一起加入队列；
+    第一个成功的批次作为参考批次（参考批次重试后仍失败时由下一个成功的批次接替），
+    其余批次用锚点数值换算到参考批次的尺度。
+    TrendReq在build_payload之间保存状态，不能并发使用，因此max_concurrency为1，批次按顺序处理
+    """
+    
+    name = 'google_trends'
+    description = 'Google Trends搜索热度（每次5个关键词，锚点统一尺度）'
+    max_concurrency = 1
+    record_type = 'trend'
+    
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.scraper = options.get('scraper') or TrendScraper(
+            delay=options.get('delay', 1.0), use_cache=options.get('use_cache', True))
+        self._reference_rows: Optional[List[Dict]] = None
+    
+    def plan(self, params: Dict) -> List[WorkItem]:
+        keywords = params.get('keywords', [])
+        if not keywords:
+            return []
+        anchor = params.get('anchor') or keywords[0]
+        common = {'anchor': anchor, 'timeframe': params.get('timeframe', 'today 12-m'),
+                  'geo': params.get('geo', '')}
+        return [WorkItem('batch', dict(common, keywords=batch)) for batch in plan_anchor_batches(keywords, anchor)]
+    
+    async def fetch(self, item: WorkItem) -> Any:
+        payload = item.payload
+        result = await asyncio.to_thread(self.scraper.get_google_trends, payload['keywords'],
+                                         timeframe=payload['timeframe'], geo=payload['geo'])
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', '未知错误'))
+        return result
+    
+    async def parse(self, item: WorkItem, raw: Any) -> List:
+        payload = item.payload
+        anchor = payload['anchor']
+        rows = raw.get('data', {}).get('interest_over_time', [])
+        keywords = payload['keywords']
+        metadata = {'timeframe': payload['timeframe'], 'geo': payload['geo'], 'anchor': anchor}
+        
+        if self._reference_rows is None:
+            # 第一个成功的批次作为参考批次，锚点只在参考批次中保存一次
+            self._reference_rows = rows
+            factor = 1.0
+            metadata['reference'] = True
+        else:
+            keywords = keywords[1:]
+            factor = anchor_scale_factor(self._reference_rows, rows, anchor)
+            if factor is None:
+                # 锚点在该时间范围内没有数据，保存未换算的值并标记
+                factor = 1.0
+                metadata['unscaled'] = True
+        metadata['scale_factor'] = factor
+        
+        records = []
+        for row in rows:
+            for keyword in keywords:
+                value = row.get(keyword)
+                # 与run_trend_task保持一致：只保存大于0的值
+                if isinstance(value, (int, float)) and value > 0:
+                    records.append({
+                        'keyword': keyword,
+                        'platform': 'google_trends',
+                        'date': str(row.get('date', '')),
+                        'value': round(float(value) * factor, 3),
+                        'metadata': metadata,
+                    })
+        return records
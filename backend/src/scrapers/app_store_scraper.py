@@ -5,11 +5,13 @@ App Store数据采集脚本
 """
 
 import json
-import time
 import sys
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Iterator, List, Dict, Optional
+from urllib.parse import urlparse
 
 try:
     from itunes_app_scraper.scraper import AppStoreScraper
@@ -22,6 +24,110 @@ import requests
 from tqdm import tqdm
 import io
 
+# 添加backend/src到路径，以便直接运行本脚本时也能导入utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.rate_limiter import get_rate_limiter
+from utils.http_client import HTTPClient, get_http_client
+from utils.http_cache import ResponseCache, get_response_cache
+from utils.record_store import NDJSONWriter, ndjson_filename
+from utils.checkpoint import TaskJournal
+
+# 获取项目根目录
+# __file__ = backend/src/scrapers/app_store_scraper.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+CONFIG_PATH = PROJECT_ROOT / "backend" / "config" / "config.yaml"
+
+# App Store搜索接口（与itunes-app-scraper的get_app_ids_for_query相同）
+ITUNES_SEARCH_URL = "https://search.itunes.apple.com/WebObjects/MZStore.woa/wa/search"
+# iTunes lookup接口支持逗号分隔的多个id，单次最多约200个
+ITUNES_LOOKUP_URL = "https://itunes.apple.com/lookup"
+LOOKUP_BATCH_SIZE = 200
+# App Store排行榜RSS（Atom XML），单个榜单最多200个App
+ITUNES_CHART_FEED_URL = "https://itunes.apple.com/{country}/rss/{chart}/limit={limit}/genre={genre_id}/xml"
+CHART_FEED_MAX_LIMIT = 200
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+ITUNES_RSS_NS = "{http://itunes.apple.com/rss}"
+
+# App Store分类名称 -> genre id（config.yaml中使用中文分类名，也支持英文名）
+APP_STORE_GENRES = {
+    '商务': 6000, 'business': 6000,
+    '天气': 6001, 'weather': 6001,
+    '工具': 6002, 'utilities': 6002,
+    '旅游': 6003, 'travel': 6003,
+    '体育': 6004, 'sports': 6004,
+    '社交': 6005, 'social networking': 6005,
+    '参考': 6006, '参考资料': 6006, 'reference': 6006,
+    '效率': 6007, '生产力': 6007, 'productivity': 6007,
+    '摄影与录像': 6008, 'photo & video': 6008,
+    '新闻': 6009, 'news': 6009,
+    '导航': 6010, 'navigation': 6010,
+    '音乐': 6011, 'music': 6011,
+    '生活': 6012, 'lifestyle': 6012,
+    '健康健美': 6013, 'health & fitness': 6013,
+    '游戏': 6014, 'games': 6014,
+    '财务': 6015, 'finance': 6015,
+    '娱乐': 6016, 'entertainment': 6016,
+    '教育': 6017, 'education': 6017,
+    '图书': 6018, 'books': 6018,
+    '医疗': 6020, 'medical': 6020,
+    '美食佳饮': 6023, 'food & drink': 6023,
+    '购物': 6024, 'shopping': 6024,
+    '开发者工具': 6026, 'developer tools': 6026,
+    '图形和设计': 6027, 'graphics & design': 6027,
+}
+
+
+def _load_app_store_config() -> Dict:
+    """读取config.yaml中的 data_sources.app_store 配置"""
+    import yaml
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f) or {}
+    return config.get('data_sources', {}).get('app_store', {}) or {}
+
+
+def load_configured_countries() -> List[str]:
+    """读取config.yaml中配置的App Store国家列表，读取失败时默认只采集us"""
+    try:
+        countries = _load_app_store_config().get('countries')
+        return list(countries) if countries else ["us"]
+    except Exception as e:
+        print(f"读取国家配置失败，默认采集us: {e}")
+        return ["us"]
+
+
+def load_configured_categories() -> List[str]:
+    """读取config.yaml中配置的App Store分类列表"""
+    try:
+        return list(_load_app_store_config().get('categories') or [])
+    except Exception as e:
+        print(f"读取分类配置失败: {e}")
+        return []
+
+
+def get_genre_id(category) -> Optional[int]:
+    """分类名称（中文/英文）或genre id -> genre id"""
+    if isinstance(category, int) or str(category).isdigit():
+        return int(category)
+    return APP_STORE_GENRES.get(str(category).strip().lower())
+
+
+def _flatten_app(app: Dict) -> Dict:
+    """
+    展平lookup返回的App数据
+    
+    与itunes-app-scraper的get_app_details(flatten=True)保持一致：
+    列表用逗号拼接，字典转为 "key star: value" 字符串，保证下游拿到的字段格式相同
+    """
+    for field in app:
+        if isinstance(app[field], list):
+            app[field] = ",".join(str(value) for value in app[field])
+        elif isinstance(app[field], dict):
+            app[field] = ", ".join(["%s star: %s" % (key, value) for key, value in app[field].items()])
+    return app
+
+
 # 修复Windows控制台编码问题（仅在需要时修改，避免在Flask中出错）
 if sys.platform == 'win32':
     try:
@@ -36,21 +142,42 @@ if sys.platform == 'win32':
 class AppStoreScraperWrapper:
     """App Store爬虫包装类"""
     
-    def __init__(self, delay: float = 1.0):
+    def __init__(self, delay: float = 1.0, max_workers: int = 4, bulk_lookup: bool = True,
+                 batch_size: int = LOOKUP_BATCH_SIZE, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True, max_age_hours: Optional[float] = None,
+                 data_manager=None, max_retries: int = 3, http_client: Optional[HTTPClient] = None):
         """
         Args:
-            delay: 请求间隔（秒），避免被封
+            delay: 初始请求间隔（秒）。每个上游host有各自的自适应限速器（所有线程、进程和
+                   国家商店共享），请求成功时逐步加快，被限流（429/403）时成倍放慢
+            max_workers: 并发获取App详情的线程数，1表示顺序获取
+            bulk_lookup: 是否使用批量lookup（一次请求获取多个App详情）
+            batch_size: 批量lookup时每个请求包含的App数量（最多200）
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            use_cache: 是否使用响应缓存
+            max_age_hours: 增量采集的最大数据年龄（小时）。设置后，raw_apps中在该时间内
+                           采集过的App直接使用本地数据，不再请求详情；None表示总是重新获取
+            data_manager: 读取本地数据用的DataManager，默认按需创建
+            max_retries: 被限流时的最大重试次数
+            http_client: HTTP客户端，默认使用进程内共享的连接池（keep-alive）
         """
         self.delay = delay
+        self.max_workers = max(1, max_workers)
+        self.bulk_lookup = bulk_lookup
+        self.batch_size = max(1, min(batch_size, LOOKUP_BATCH_SIZE))
+        self.cache = (cache or get_response_cache()) if use_cache else None
+        self.http = http_client or get_http_client()
         self.scraper = AppStoreScraper() if HAS_SCRAPER else None
-        # 获取项目根目录
-        # __file__ = backend/src/scrapers/app_store_scraper.py
-        # parent.parent.parent.parent = 项目根目录
-        PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+        self.max_age_hours = max_age_hours
+        self.data_manager = data_manager
+        self.max_retries = max(0, max_retries)
+        # 本实例中直接使用本地数据（未重新请求）的 (国家, App ID)，调用方据此避免重复保存
+        self.reused_app_ids = set()
         self.data_dir = PROJECT_ROOT / "data" / "raw" / "app_store"
         self.data_dir.mkdir(parents=True, exist_ok=True)
     
-    def search_apps(self, keyword: str, country: str = "us", limit: int = 50) -> List[Dict]:
+    def search_apps(self, keyword: str, country: str = "us", limit: int = 50,
+                    max_age_hours: Optional[float] = None) -> List[Dict]:
         """
         搜索App
         
@@ -58,6 +185,7 @@ class AppStoreScraperWrapper:
             keyword: 搜索关键词
             country: 国家代码
             limit: 返回数量限制
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
             
         Returns:
             App列表
@@ -67,41 +195,521 @@ class AppStoreScraperWrapper:
             return []
         
         try:
-            # 使用现成的工具搜索
-            app_ids = self.scraper.get_app_ids_for_query(keyword, country=country)
-            app_ids = app_ids[:limit]
+            app_ids = self.search_app_ids(keyword, country=country, limit=limit)
+            return self._fetch_app_details(app_ids, country=country, desc=f"获取App详情: {keyword}",
+                                           max_age_hours=max_age_hours)
+            
+        except Exception as e:
+            print(f"搜索失败: {e}")
+            return []
+    
+    def search_app_ids(self, keyword: str, country: str = "us", limit: int = 50) -> List:
+        """搜索关键词对应的App ID列表（按搜索排名）"""
+        # 请求与itunes-app-scraper的get_app_ids_for_query相同，但经过响应缓存
+        store_id = self.scraper.get_store_id_for_country(country)
+        headers = {
+            "X-Apple-Store-Front": "%s,24 t:native" % store_id,
+            "Accept-Language": "nl",  # 与itunes-app-scraper的默认值保持一致
+        }
+        params = {'clientApplication': 'Software', 'media': 'software', 'term': keyword}
+        response = self._get(ITUNES_SEARCH_URL, params=params, headers=headers,
+                             source='app_store_search')
+        response.raise_for_status()
+        result = response.json()
+        if not result.get('bubbles'):
+            return []
+        app_ids = [app['id'] for app in result['bubbles'][0]['results']]
+        return app_ids[:limit]
+    
+    def _rate_limiter(self, url: str):
+        """
+        获取请求URL所在host的共享限速器
+    
+        Apple按host（而不是按国家商店）限流，所有国家的请求共用同一个速率预算
+        """
+        return get_rate_limiter(urlparse(url).netloc, self.delay)
+    
+    def _get(self, url: str, params: Optional[Dict] = None,
+             headers: Optional[Dict] = None, source: str = 'default'):
+        """
+        发送GET请求：优先使用响应缓存，只有真正访问网络时才经过该host的限速器
+        
+        网络响应的状态码会反馈给限速器（AIMD调整速率），被限流（429/403/503）时
+        按调整后的间隔最多重试 max_retries 次
+        """
+        rate_limiter = self._rate_limiter(url)
+        for attempt in range(self.max_retries + 1):
+            if self.cache:
+                response = self.cache.fetch(url, params=params, headers=headers, source=source,
+                                            session=self.http.session, timeout=self.http.timeout,
+                                            before_request=rate_limiter.acquire)
+                if response.from_cache:
+                    if response.revalidated:
+                        # 304重新验证也发出了网络请求
+                        rate_limiter.report(304)
+                    return response
+            else:
+                rate_limiter.acquire()
+                response = self.http.get(url, params=params, headers=headers)
+            
+            throttled = rate_limiter.report(response.status_code, response.headers.get('Retry-After'))
+            if not throttled:
+                break
+        return response
+    
+    def plan_search(self, keywords: List[str], country: str = "us", limit: int = 50,
+                    on_keyword: Optional[Callable[[int, str, int], None]] = None,
+                    checkpoint: Optional[TaskJournal] = None) -> Dict:
+        """
+        规划多关键词采集：先解析所有关键词的App ID，再合并去重
+        
+        关键词之间经常有重叠（如 "task management" 和 "productivity"），
+        先合并ID可以保证每个App的详情在一次任务中只获取一次。
+        
+        Args:
+            keywords: 关键词列表
+            country: 国家代码
+            limit: 每个关键词的App数量限制
+            on_keyword: 每个关键词解析完成后的回调 (序号, 关键词, 命中数量)
+            checkpoint: 任务检查点，已解析过的关键词直接使用记录的ID，新解析的关键词会被记录
             
-            apps = []
-            for app_id in tqdm(app_ids, desc=f"获取App详情: {keyword}"):
+        Returns:
+            采集计划：
+            - app_ids: 去重后的App ID列表（按首次出现顺序）
+            - provenance: {app_id: [{'keyword': 关键词, 'rank': 排名}]}，排名从1开始
+            - keyword_hits: {关键词: 命中数量}
+        """
+        plan = {'app_ids': [], 'provenance': {}, 'keyword_hits': {}}
+        if not self.scraper:
+            print("错误: itunes-app-scraper未安装")
+            return plan
+        
+        country = country.lower()
+        for idx, keyword in enumerate(keywords):
+            app_ids = checkpoint.resolved_ids(country, keyword) if checkpoint else None
+            if app_ids is None:
                 try:
-                    # 获取App详情
-                    app_details = self.scraper.get_app_details(app_id, country=country)
-                    if app_details:
-                        apps.append(app_details)
-                    time.sleep(self.delay)
+                    app_ids = self.search_app_ids(keyword, country=country, limit=limit)
+                    if checkpoint:
+                        checkpoint.record_keyword(country, keyword, app_ids)
                 except Exception as e:
-                    print(f"获取App {app_id} 详情失败: {e}")
-                    continue
+                    # 失败的关键词不记录为已解析，任务保持未完成，恢复任务时会重试
+                    print(f"搜索关键词 {keyword} 失败: {e}")
+                    if checkpoint:
+                        checkpoint.record_failure(country, keyword, str(e))
+                    app_ids = []
+            
+            plan['keyword_hits'][keyword] = len(app_ids)
+            for rank, app_id in enumerate(app_ids, start=1):
+                key = str(app_id)
+                if key not in plan['provenance']:
+                    plan['provenance'][key] = []
+                    plan['app_ids'].append(app_id)
+                plan['provenance'][key].append({'keyword': keyword, 'rank': rank})
+            
+            if on_keyword:
+                on_keyword(idx, keyword, len(app_ids))
+        
+        return plan
+    
+    def fetch_plan(self, plan: Dict, country: str = "us",
+                   max_age_hours: Optional[float] = None,
+                   on_app: Optional[Callable[[Dict], None]] = None,
+                   checkpoint: Optional[TaskJournal] = None) -> List[Dict]:
+        """
+        按采集计划获取App详情
+        
+        每个App只获取一次，并在结果中附加 search_provenance 字段
+        （该App命中的关键词及排名）。
+        
+        Args:
+            plan: plan_search返回的采集计划
+            country: 国家代码
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
+            on_app: 每获取到一个App时的回调（如流式写入文件）
+            checkpoint: 任务检查点，已获取过的App直接从检查点读取，新获取的App会被记录
             
+        Returns:
+            App详情列表
+        """
+        country = country.lower()
+        
+        def attach_provenance(app):
+            app['search_provenance'] = plan['provenance'].get(str(app.get('trackId')), [])
+            # 只记录从网络获取的App，本地数据恢复时重新读取即可
+            if checkpoint and not self.is_reused(app):
+                checkpoint.record_app(app)
+            if on_app:
+                on_app(app)
+        
+        app_ids = plan['app_ids']
+        restored = []
+        if checkpoint:
+            restored = [app for app in checkpoint.iter_apps(country)
+                        if str(app.get('trackId')) in plan['provenance']]
+            for app in restored:
+                attach_provenance(app)
+            app_ids = [app_id for app_id in app_ids if not checkpoint.is_fetched(country, app_id)]
+            if restored:
+                print(f"从检查点恢复 {len(restored)} 个已获取的App，剩余 {len(app_ids)} 个")
+        
+        apps = self._fetch_app_details(app_ids, country=country,
+                                       desc=f"获取App详情: {len(plan['keyword_hits'])}个关键词",
+                                       max_age_hours=max_age_hours, on_app=attach_provenance)
+        if not restored:
             return apps
+        
+        # 按计划中的顺序合并恢复的App和新获取的App
+        by_id = {str(app.get('trackId')): app for app in restored + apps}
+        return [by_id[str(app_id)] for app_id in plan['app_ids'] if str(app_id) in by_id]
+    
+    def search_keywords(self, keywords: List[str], country: str = "us", limit: int = 50,
+                        max_age_hours: Optional[float] = None) -> List[Dict]:
+        """
+        多关键词搜索App（跨关键词去重后只获取一次详情）
+        
+        Args:
+            keywords: 关键词列表
+            country: 国家代码
+            limit: 每个关键词的App数量限制
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
+            
+        Returns:
+            去重后的App列表
+        """
+        plan = self.plan_search(keywords, country=country, limit=limit)
+        return self.fetch_plan(plan, country=country, max_age_hours=max_age_hours)
+    
+    def is_reused(self, app: Dict) -> bool:
+        """判断App数据是否直接取自本地存储（未重新请求）"""
+        return (app.get('country', 'us'), str(app.get('trackId'))) in self.reused_app_ids
+    
+    def collect_countries(self, keywords: List[str], countries: Optional[List[str]] = None,
+                          limit: int = 50, max_age_hours: Optional[float] = None,
+                          on_keyword: Optional[Callable[[str, int, str, int], None]] = None,
+                          on_app: Optional[Callable[[Dict], None]] = None,
+                          checkpoint: Optional[TaskJournal] = None) -> List[Dict]:
+        """
+        多国家并行采集
+        
+        每个国家的商店在独立的线程中采集（规划+获取详情），所有国家共享按host划分的限速器，
+        因此总请求速率不会随商店数量增加（多个商店的请求交替排队）。
+        
+        Args:
+            keywords: 关键词列表
+            countries: 国家代码列表，默认使用config.yaml中的 data_sources.app_store.countries
+            limit: 每个关键词的App数量限制
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
+            on_keyword: 每个关键词解析完成后的回调 (国家, 序号, 关键词, 命中数量)
+            on_app: 每获取到一个App时的回调，会在多个线程中调用
+            checkpoint: 任务检查点（各国家分别记录）
+            
+        Returns:
+            所有国家的App列表，每条记录带有country字段；同一个App在每个国家各有一条记录
+        """
+        if countries is None:
+            countries = load_configured_countries()
+        countries = [country.lower() for country in countries]
+        
+        def collect(country):
+            callback = None
+            if on_keyword:
+                callback = lambda idx, keyword, hits: on_keyword(country, idx, keyword, hits)
+            plan = self.plan_search(keywords, country=country, limit=limit, on_keyword=callback,
+                                    checkpoint=checkpoint)
+            return self.fetch_plan(plan, country=country, max_age_hours=max_age_hours, on_app=on_app,
+                                   checkpoint=checkpoint)
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(countries))) as executor:
+            futures = {executor.submit(collect, country): country for country in countries}
+            for future in as_completed(futures):
+                country = futures[future]
+                try:
+                    results[country] = future.result()
+                    print(f"商店 {country} 采集到 {len(results[country])} 个App")
+                except Exception as e:
+                    print(f"商店 {country} 采集失败: {e}")
+                    if checkpoint:
+                        checkpoint.record_failure(country, None, str(e))
+                    results[country] = []
+        
+        # 按传入的国家顺序合并，保证结果顺序稳定
+        return [app for country in countries for app in results[country]]
+    
+    def get_apps_details_batch(self, app_ids: List, country: str = "us") -> List[Dict]:
+        """
+        通过一次lookup请求获取多个App详情
+        
+        Args:
+            app_ids: App ID列表（不超过batch_size个）
+            country: 国家代码
             
+        Returns:
+            App详情列表（格式与get_app_details相同，不存在的App不会出现在结果中）
+        """
+        params = {
+            'id': ",".join(str(app_id) for app_id in app_ids),
+            'country': country,
+            'entity': 'software',
+        }
+        response = self._get(ITUNES_LOOKUP_URL, params=params, source='app_store_lookup')
+        response.raise_for_status()
+        results = response.json().get('results', [])
+        apps = []
+        for app in results:
+            # entity=software时可能混入非App条目，只保留软件
+            if not app.get('trackId') or app.get('kind', 'software') != 'software':
+                continue
+            app = _flatten_app(app)
+            # 标记数据来自哪个国家的商店（同一个App在不同商店的评分、价格不同）
+            app['country'] = country.lower()
+            apps.append(app)
+        return apps
+    
+    def _get_fresh_apps(self, app_ids: List, max_age_hours: float, country: str = "us") -> Dict[str, Dict]:
+        """从raw_apps读取指定国家商店中未过期的App数据"""
+        if self.data_manager is None:
+            from utils.data_manager import DataManager
+            self.data_manager = DataManager()
+        try:
+            return self.data_manager.get_fresh_raw_apps(app_ids, max_age_hours, source='app_store',
+                                                        country=country)
         except Exception as e:
-            print(f"搜索失败: {e}")
+            print(f"读取本地App数据失败，全部重新获取: {e}")
+            return {}
+    
+    def _fetch_app_details(self, app_ids: List, country: str = "us", desc: str = "获取App详情",
+                           max_age_hours: Optional[float] = None,
+                           on_app: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        并发获取App详情
+        
+        使用线程池并发请求，每个请求前通过共享限速器排队，
+        因此并发只用来填满等待时间，不会超过允许的请求速率。
+        bulk_lookup开启时每个请求获取一批App，否则每个请求获取一个App。
+        
+        Args:
+            app_ids: App ID列表
+            country: 国家代码
+            desc: 进度条描述
+            max_age_hours: 最大数据年龄（小时），未过期的App直接使用本地数据
+            on_app: 每得到一个App（本地数据或新获取）时立即调用，顺序为到达顺序
+            
+        Returns:
+            App详情列表（保持app_ids中的顺序，获取失败的App被跳过）
+        """
+        if not app_ids:
             return []
+        country = country.lower()
+        
+        # 增量采集：未过期的App直接使用本地数据
+        if max_age_hours is None:
+            max_age_hours = self.max_age_hours
+        results = {}
+        if max_age_hours is not None:
+            results = self._get_fresh_apps(app_ids, max_age_hours, country=country)
+            for app_id, app in results.items():
+                app['country'] = country
+                self.reused_app_ids.add((country, app_id))
+                if on_app:
+                    on_app(app)
+            if results:
+                print(f"{len(results)} 个App的数据在 {max_age_hours} 小时内已采集过，直接使用本地数据")
+        to_fetch = [app_id for app_id in app_ids if str(app_id) not in results]
+        
+        if self.bulk_lookup:
+            batches = [to_fetch[i:i + self.batch_size] for i in range(0, len(to_fetch), self.batch_size)]
+        else:
+            batches = [[app_id] for app_id in to_fetch]
+        if not batches:
+            return [results[str(app_id)] for app_id in app_ids if str(app_id) in results]
+        
+        def fetch(batch):
+            # 单个App也走lookup接口（与get_app_details请求相同），以便共享响应缓存
+            return self.get_apps_details_batch(batch, country=country)
+        
+        # 按trackId收集结果，搜索结果中的id可能是字符串，统一转为字符串比较
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+            futures = {executor.submit(fetch, batch): batch for batch in batches}
+            with tqdm(total=len(to_fetch), desc=desc) as progress:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    try:
+                        for app_details in future.result():
+                            app_id = str(app_details.get('trackId', batch[0]))
+                            results[app_id] = app_details
+                            self.reused_app_ids.discard((country, app_id))
+                            if on_app:
+                                on_app(app_details)
+                    except Exception as e:
+                        if len(batch) == 1:
+                            print(f"获取App {batch[0]} 详情失败: {e}")
+                        else:
+                            print(f"批量获取 {len(batch)} 个App详情失败: {e}")
+                    progress.update(len(batch))
+        
+        return [results[str(app_id)] for app_id in app_ids if str(app_id) in results]
+    
+    def iter_chart_app_ids(self, genre_id: int, country: str = "us", limit: int = 100,
+                           chart: str = "topfreeapplications") -> Iterator[str]:
+        """
+        流式读取分类排行榜，按排名逐个产出App ID
+        
+        使用iterparse边下载边解析RSS，每解析完一个entry就清理掉，
+        大榜单也不会整体驻留在内存中。排行榜为流式读取，不经过响应缓存。
+        
+        Args:
+            genre_id: App Store分类id
+            country: 国家代码
+            limit: 榜单数量（最多200）
+            chart: 榜单类型，如 topfreeapplications、toppaidapplications、topgrossingapplications
+            
+        Yields:
+            App ID（按排名顺序）
+        """
+        url = ITUNES_CHART_FEED_URL.format(
+            country=country.lower(), chart=chart,
+            limit=min(limit, CHART_FEED_MAX_LIMIT), genre_id=genre_id
+        )
+        rate_limiter = self._rate_limiter(url)
+        rate_limiter.acquire()
+        response = self.http.get(url, stream=True)
+        try:
+            rate_limiter.report(response.status_code, response.headers.get('Retry-After'))
+            response.raise_for_status()
+            response.raw.decode_content = True
+            
+            root = None
+            for event, elem in ET.iterparse(response.raw, events=('start', 'end')):
+                if root is None:
+                    root = elem
+                if event != 'end' or elem.tag != f"{ATOM_NS}entry":
+                    continue
+                id_elem = elem.find(f"{ATOM_NS}id")
+                app_id = id_elem.get(f"{ITUNES_RSS_NS}id") if id_elem is not None else None
+                # 清理已处理的entry，保持内存占用恒定
+                root.clear()
+                if app_id:
+                    yield app_id
+        finally:
+            response.close()
     
-    def get_category_top_apps(self, category: str, country: str = "us", limit: int = 100) -> List[Dict]:
+    def get_category_top_apps(self, category: str, country: str = "us", limit: int = 100,
+                              chart: str = "topfreeapplications",
+                              max_age_hours: Optional[float] = None) -> List[Dict]:
         """
         获取分类Top Apps
         
-        注意：itunes-app-scraper可能不支持直接获取分类，需要自己实现
+        通过App Store排行榜RSS获取App ID，再走批量/并发的详情获取流程。
+        相比关键词搜索，几次请求就能覆盖一个分类的头部App。
+        
+        Args:
+            category: 分类名称（如 '效率'、'Productivity'）或genre id
+            country: 国家代码
+            limit: 返回数量限制（最多200）
+            chart: 榜单类型
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
+            
+        Returns:
+            App列表（按榜单排名，带有chart_category和chart_rank字段）
         """
-        # TODO: 如果现成工具不支持，需要自己实现
-        # 可以使用App Store的RSS feed或网页爬虫
-        print(f"获取分类 {category} 的Top Apps（待实现）")
-        return []
+        genre_id = get_genre_id(category)
+        if genre_id is None:
+            print(f"未知的App Store分类: {category}")
+            return []
+        
+        try:
+            app_ids = list(self.iter_chart_app_ids(genre_id, country=country, limit=limit, chart=chart))
+        except Exception as e:
+            print(f"获取分类 {category} 的排行榜失败: {e}")
+            return []
+        
+        apps = self._fetch_app_details(app_ids, country=country, desc=f"获取App详情: {category}",
+                                       max_age_hours=max_age_hours)
+        ranks = {str(app_id): rank for rank, app_id in enumerate(app_ids, start=1)}
+        for app in apps:
+            app['chart_category'] = str(category)
+            app['chart_rank'] = ranks.get(str(app.get('trackId')))
+        return apps
     
-    def save_apps(self, apps: List[Dict], filename: Optional[str] = None):
-        """保存App数据"""
+    def collect_categories(self, categories: Optional[List[str]] = None, country: str = "us",
+                           limit: int = 100, chart: str = "topfreeapplications",
+                           max_age_hours: Optional[float] = None) -> List[Dict]:
+        """
+        采集多个分类的排行榜（跨分类去重）
+        
+        Args:
+            categories: 分类列表，默认使用config.yaml中的 data_sources.app_store.categories
+            country: 国家代码
+            limit: 每个分类的数量限制
+            chart: 榜单类型
+            max_age_hours: 覆盖实例的max_age_hours，只重新获取超过该年龄的App
+            
+        Returns:
+            去重后的App列表
+        """
+        if categories is None:
+            categories = load_configured_categories()
+        
+        # 不同分类名可能对应同一个genre（如 '效率' 和 '生产力'），只请求一次
+        genres = {}
+        for category in categories:
+            genre_id = get_genre_id(category)
+            if genre_id is None:
+                print(f"未知的App Store分类: {category}")
+            elif genre_id not in genres:
+                genres[genre_id] = category
+        
+        all_apps = []
+        seen_app_ids = set()
+        for category in genres.values():
+            apps = self.get_category_top_apps(category, country=country, limit=limit, chart=chart,
+                                              max_age_hours=max_age_hours)
+            for app in apps:
+                app_id = str(app.get('trackId'))
+                if app_id not in seen_app_ids:
+                    seen_app_ids.add(app_id)
+                    all_apps.append(app)
+        return all_apps
+    
+    def open_app_writer(self, filename: Optional[str] = None, compression: Optional[str] = 'gzip',
+                        flush_every: int = 100) -> NDJSONWriter:
+        """
+        打开App数据的流式写入器（NDJSON，每行一个App）
+        
+        配合on_app回调使用，App到达时立即写入，内存占用不随任务规模增长。
+        
+        Args:
+            filename: 文件名，默认 app_store_时间戳.ndjson.gz
+            compression: 压缩方式：None、'gzip'、'zstd'
+            flush_every: 每写入多少个App刷一次磁盘，任务崩溃时已写入的App不会只留在压缩缓冲区中
+            
+        Returns:
+            NDJSONWriter，写完后需要close（或使用with）
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = ndjson_filename(f"app_store_{timestamp}", compression)
+        return NDJSONWriter(self.data_dir / filename, flush_every=flush_every)
+    
+    def save_apps(self, apps: List[Dict], filename: Optional[str] = None, fmt: str = 'json',
+                  compression: Optional[str] = None):
+        """
+        保存App数据
+        
+        Args:
+            apps: App列表
+            filename: 文件名
+            fmt: 'json'（整个列表一个JSON文件）或 'ndjson'（每行一个App，可压缩）
+            compression: fmt为'ndjson'时的压缩方式：None、'gzip'、'zstd'
+        """
+        if fmt == 'ndjson':
+            with self.open_app_writer(filename, compression=compression) as writer:
+                writer.write_many(apps)
+            print(f"已保存 {writer.count} 个App数据到: {writer.path}")
+            return writer.path
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"app_store_{timestamp}.json"
@@ -1,99 +1,404 @@
 """
 Product Hunt数据采集脚本
-优先使用现成的工具，如果没有则自己实现
+Product Hunt是Next.js + Apollo的服务端渲染页面，产品数据已经嵌在HTML里
+（__NEXT_DATA__ / Apollo缓存状态），直接提取这段JSON解析即可，不需要Selenium
 """
 
 import json
-import time
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, Dict, Iterator, List, Optional
 
-import requests
-from bs4 import BeautifulSoup
 from tqdm import tqdm
 
+# 更快的JSON解析（可选，需要orjson库）
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 添加backend/src到路径，以便直接运行本脚本时也能导入utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.http_cache import ResponseCache, get_response_cache
+from utils.rate_limiter import get_rate_limiter
+from utils.http_client import get_http_client
+from utils.record_store import NDJSONWriter, ndjson_filename
+
+# 获取项目根目录
+# __file__ = backend/src/scrapers/product_hunt_scraper.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+CONFIG_PATH = PROJECT_ROOT / "backend" / "config" / "config.yaml"
+
+# 默认每日采集数量（config.yaml: data_sources.product_hunt.daily_limit）
+DEFAULT_DAILY_LIMIT = 50
+
+# 页面中嵌入的状态数据
+NEXT_DATA_RE = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+APOLLO_STATE_RE = re.compile(r'window\.__APOLLO_STATE__\s*=\s*(\{.*?\})\s*;?\s*</script>', re.S)
+APOLLO_TRANSPORT_RE = re.compile(r'ApolloSSRDataTransport"\)\]\s*\?\?=\s*\[\]\)\.push\((\{.*?\})\)\s*;?\s*</script>', re.S)
+
+
+def _loads(text):
+    """解析JSON（有orjson时使用orjson）"""
+    if HAS_ORJSON:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def load_daily_limit() -> int:
+    """读取config.yaml中的 data_sources.product_hunt.daily_limit"""
+    try:
+        import yaml
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+        limit = config.get('data_sources', {}).get('product_hunt', {}).get('daily_limit')
+        return int(limit) if limit else DEFAULT_DAILY_LIMIT
+    except Exception as e:
+        print(f"读取Product Hunt配置失败，使用默认数量{DEFAULT_DAILY_LIMIT}: {e}")
+        return DEFAULT_DAILY_LIMIT
+
+
+def extract_page_state(html: str) -> List:
+    """
+    提取页面中嵌入的JSON状态
+    
+    Returns:
+        所有解析成功的状态（__NEXT_DATA__、__APOLLO_STATE__、Apollo SSR传输数据）
+    """
+    states = []
+    for pattern in (NEXT_DATA_RE, APOLLO_STATE_RE, APOLLO_TRANSPORT_RE):
+        for match in pattern.finditer(html):
+            try:
+                states.append(_loads(match.group(1)))
+            except ValueError:
+                continue
+    return states
+
+
+def _iter_typed(node, typename: str) -> Iterator[Dict]:
+    """遍历JSON树，返回所有 __typename 为指定类型的对象（非递归实现，避免深层嵌套时栈溢出）"""
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            if current.get('__typename') == typename:
+                yield current
+            stack.extend(reversed(list(current.values())))
+        elif isinstance(current, list):
+            stack.extend(reversed(current))
+
+
+def _find_apollo_cache(node) -> Dict:
+    """
+    在状态中找到Apollo规范化缓存（键为 'Post123' 之类、值带 __typename 的字典），用于解析 __ref 引用
+    """
+    cache = {}
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, dict):
+            for key, value in current.items():
+                if isinstance(value, dict) and '__typename' in value and (
+                        key.startswith(value['__typename']) or key == 'ROOT_QUERY'):
+                    cache[key] = value
+                if isinstance(value, (dict, list)):
+                    stack.append(value)
+        elif isinstance(current, list):
+            stack.extend(current)
+    return cache
+
+
+class PageState:
+    """一个页面的嵌入状态：合并同一产品分散在各处的字段，并解析Apollo引用"""
+    
+    def __init__(self, states: List):
+        self.refs: Dict[str, Dict] = {}
+        self.posts: Dict[str, Dict] = {}
+        for state in states:
+            self.refs.update(_find_apollo_cache(state))
+        for state in states:
+            for post in _iter_typed(state, 'Post'):
+                post_id = str(post.get('id') or '')
+                if not post_id:
+                    continue
+                merged = self.posts.setdefault(post_id, {})
+                for key, value in post.items():
+                    if value is not None and key not in merged:
+                        merged[key] = value
+    
+    def resolve(self, value):
+        """解析 {'__ref': 'Topic123'} 引用"""
+        if isinstance(value, dict) and '__ref' in value:
+            return self.refs.get(value['__ref'], {})
+        return value
+    
+    def names(self, value) -> List[str]:
+        """从列表或GraphQL连接（edges/nodes）中取出各对象的name"""
+        value = self.resolve(value)
+        if isinstance(value, dict):
+            if 'edges' in value:
+                value = [self.resolve(edge).get('node') for edge in value['edges'] or []]
+            elif 'nodes' in value:
+                value = value['nodes']
+            else:
+                value = [value]
+        names = []
+        for item in value or []:
+            item = self.resolve(item)
+            if isinstance(item, dict) and item.get('name'):
+                names.append(item['name'])
+        return names
+
+
+def _first(post: Dict, *keys, default=None):
+    for key in keys:
+        if post.get(key) is not None:
+            return post[key]
+    return default
+
 
 class ProductHuntScraper:
     """Product Hunt爬虫"""
     
-    def __init__(self, delay: float = 2.0):
+    def __init__(self, delay: float = 2.0, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True, max_retries: int = 3, max_workers: int = 8,
+                 data_manager=None):
         """
         Args:
-            delay: 请求间隔（秒）
+            delay: 初始请求间隔（秒），由共享的自适应限速器按响应状态调整
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            use_cache: 是否使用响应缓存
+            max_retries: 被限流时的最大重试次数
+            max_workers: 并发获取产品详情的线程数（整体速率仍由限速器控制）
+            data_manager: 保存原始数据用的DataManager，默认按需创建
         """
         self.delay = delay
+        self.max_retries = max(0, max_retries)
+        self.max_workers = max(1, max_workers)
+        self.rate_limiter = get_rate_limiter('producthunt', delay)
+        self.cache = (cache or get_response_cache()) if use_cache else None
+        self.data_manager = data_manager
         self.base_url = "https://www.producthunt.com"
-        # 获取项目根目录
-        # __file__ = backend/src/scrapers/product_hunt_scraper.py
-        # parent.parent.parent.parent = 项目根目录
-        PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
         self.data_dir = PROJECT_ROOT / "data" / "raw" / "product_hunt"
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # 共享HTTP客户端（keep-alive连接池，默认带浏览器User-Agent）
+        self.http = get_http_client()
+        self.session = self.http.session
     
-    def get_today_products(self, limit: int = 50) -> List[Dict]:
+    def _get(self, url: str):
+        """
+        发送GET请求（优先使用响应缓存，过期时按ETag/Last-Modified重新验证）
+        
+        访问网络的请求经过限速器，被限流时放慢速率并重试
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.cache:
+                response = self.cache.fetch(url, session=self.session, source='product_hunt', timeout=10,
+                                            before_request=self.rate_limiter.acquire)
+                if response.from_cache:
+                    if response.revalidated:
+                        # 304重新验证也发出了网络请求
+                        self.rate_limiter.report(304)
+                    return response
+            else:
+                self.rate_limiter.acquire()
+                response = self.session.get(url, timeout=10)
+            
+            if not self.rate_limiter.report(response.status_code, response.headers.get('Retry-After')):
+                break
+        return response
+    
+    def _to_product(self, post: Dict, state: PageState) -> Dict:
+        """Apollo中的Post对象 -> 产品记录"""
+        slug = post.get('slug') or ''
+        thumbnail = state.resolve(post.get('thumbnail'))
+        return {
+            'id': str(post.get('id')),
+            'name': post.get('name', ''),
+            'tagline': post.get('tagline', ''),
+            'description': _first(post, 'description', default=''),
+            'slug': slug,
+            'url': f"{self.base_url}/posts/{slug}" if slug else '',
+            'website': _first(post, 'website', 'websiteUrl', default=''),
+            'votes': int(_first(post, 'votesCount', 'latestScore', default=0) or 0),
+            'comments': int(_first(post, 'commentsCount', default=0) or 0),
+            'topics': state.names(post.get('topics')),
+            'makers': state.names(post.get('makers')),
+            'created_at': _first(post, 'featuredAt', 'createdAt', default=''),
+            'thumbnail': thumbnail.get('url', '') if isinstance(thumbnail, dict) else '',
+            'source': 'product_hunt',
+        }
+    
+    def _parse_products(self, html: str) -> List[Dict]:
+        """解析页面中的所有产品（保持页面中的顺序）"""
+        state = PageState(extract_page_state(html))
+        return [self._to_product(post, state) for post in state.posts.values() if post.get('name')]
+    
+    def fetch_today_products(self, limit: int = 50) -> List[Dict]:
         """
-        获取今日热门产品
+        获取今日热门产品（请求失败时抛出异常，由调用方决定是否重试）
         
         Args:
             limit: 返回数量限制
-            
+        
         Returns:
-            产品列表
+            产品列表（按票数从高到低）
+        
+        Raises:
+            requests.HTTPError: 上游返回错误状态码（异常的response带有状态码和Retry-After）
+        """
+        response = self._get(f"{self.base_url}/")
+        response.raise_for_status()
+        
+        products = self._parse_products(response.text)
+        if not products:
+            print("警告: 首页中没有找到嵌入的产品数据，页面结构可能已变化")
+        products.sort(key=lambda product: product['votes'], reverse=True)
+        return products[:limit]
+    
+    def fetch_product_details(self, product_url: str) -> Optional[Dict]:
+        """
+        获取产品详情（请求失败时抛出异常，由调用方决定是否重试）
+        
+        Returns:
+            产品详情，页面中没有产品数据时返回None
+        """
+        response = self._get(product_url)
+        response.raise_for_status()
+        
+        products = self._parse_products(response.text)
+        if not products:
+            return None
+        # 详情页中也会嵌入相关产品，按slug找到当前产品
+        slug = product_url.rstrip('/').rsplit('/', 1)[-1]
+        for product in products:
+            if product['slug'] == slug:
+                return product
+        return products[0]
+    
+    def get_today_products(self, limit: int = 50) -> List[Dict]:
         """
-        url = f"{self.base_url}/"
+        获取今日热门产品（失败时返回空列表）
         
+        Args:
+            limit: 返回数量限制
+        
+        Returns:
+            产品列表（按票数从高到低）
+        """
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            products = []
-            
-            # TODO: 解析Product Hunt页面结构
-            # 注意：Product Hunt是动态加载的，可能需要Selenium
-            # 或者使用他们的API（如果有的话）
-            
-            # 这里先提供一个基础框架
-            # 实际实现需要根据Product Hunt的页面结构调整
-            
-            print("注意: Product Hunt页面是动态加载的，可能需要使用Selenium")
-            print("或者查找是否有官方API或现成的爬虫工具")
-            
-            return products
-            
+            return self.fetch_today_products(limit=limit)
         except Exception as e:
             print(f"获取Product Hunt数据失败: {e}")
             return []
     
     def get_product_details(self, product_url: str) -> Optional[Dict]:
-        """获取产品详情"""
+        """获取产品详情（失败时返回None）"""
         try:
-            response = self.session.get(product_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # TODO: 解析产品详情页面
-            product = {
-                'url': product_url,
-                'title': '',
-                'description': '',
-                'votes': 0,
-                'comments': 0,
-                'maker': '',
-            }
-            
-            return product
-            
+            return self.fetch_product_details(product_url)
         except Exception as e:
             print(f"获取产品详情失败: {e}")
             return None
     
+    def get_products_details(self, products: List[Dict],
+                             on_product: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """
+        并发获取产品详情并合并到列表数据中
+        
+        Args:
+            products: get_today_products返回的产品列表
+            on_product: 每个产品合并完成后的回调（如流式写入文件）
+        
+        Returns:
+            合并详情后的产品列表（顺序不变；获取详情失败的产品保留列表数据）
+        """
+        results = [dict(product) for product in products]
+        
+        # 没有详情页链接的产品不需要等待，直接交给回调
+        if on_product:
+            for product in results:
+                if not product.get('url'):
+                    on_product(product)
+        
+        def merge(index, details):
+            if details:
+                for key, value in details.items():
+                    # 详情页的字段更完整，但不覆盖为空值
+                    if value not in (None, '', [], 0) or key not in results[index]:
+                        results[index][key] = value
+            if on_product:
+                on_product(results[index])
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_product_details, product['url']): index
+                for index, product in enumerate(products) if product.get('url')
+            }
+            with tqdm(total=len(futures), desc="获取产品详情") as pbar:
+                for future in as_completed(futures):
+                    merge(futures[future], future.result())
+                    pbar.update(1)
+        
+        return results
+    
+    def collect_daily(self, limit: Optional[int] = None, fetch_details: bool = True,
+                      save: bool = True) -> List[Dict]:
+        """
+        每日采集：今日热门产品 + 详情，保存到数据库（raw_apps，source='product_hunt'）和NDJSON文件
+        
+        Args:
+            limit: 采集数量，默认使用config.yaml中的 daily_limit
+            fetch_details: 是否获取详情页（描述、制作者等列表页没有的字段）
+            save: 是否保存
+        
+        Returns:
+            产品列表
+        """
+        limit = limit or load_daily_limit()
+        products = self.get_today_products(limit=limit)
+        print(f"Product Hunt今日热门: {len(products)} 个产品")
+        if not products:
+            return []
+        
+        writer = self.open_product_writer() if save else None
+        try:
+            if fetch_details:
+                products = self.get_products_details(products, on_product=writer.write if writer else None)
+            elif writer:
+                writer.write_many(products)
+        finally:
+            if writer:
+                writer.close()
+                print(f"已写入 {writer.count} 个产品数据到: {writer.path}")
+        
+        if save:
+            data_manager = self.data_manager
+            if data_manager is None:
+                from utils.data_manager import DataManager
+                data_manager = DataManager()
+            data_manager.save_raw_data(products, 'product_hunt')
+        return products
+    
+    def open_product_writer(self, filename: Optional[str] = None,
+                            compression: Optional[str] = 'gzip') -> NDJSONWriter:
+        """
+        打开流式写入的原始数据文件（与App Store原始数据相同的NDJSON格式）
+        
+        Args:
+            filename: 文件名，默认 product_hunt_<时间>.ndjson.gz
+            compression: 压缩方式：None、'gzip'、'zstd'
+        """
+        if not filename:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            filename = ndjson_filename(f"product_hunt_{timestamp}", compression)
+        return NDJSONWriter(self.data_dir / filename)
+    
     def save_products(self, products: List[Dict], filename: Optional[str] = None):
         """保存产品数据"""
         if not filename:
@@ -113,8 +418,9 @@ def main():
     scraper = ProductHuntScraper()
     
     print("测试Product Hunt爬虫...")
-    print("注意: 需要根据实际页面结构实现解析逻辑")
-    print("或者查找现成的工具/API")
+    products = scraper.collect_daily(save=False)
+    for product in products[:10]:
+        print(f"  {product['votes']:>5} 票  {product['name']} - {product['tagline']}")
 
 
 if __name__ == "__main__":
@@ -10,9 +10,13 @@
 import json
 import time
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timedelta
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 import pandas as pd
 
 # 修复Windows控制台编码问题（仅在需要时修改，避免在Flask中出错）
@@ -28,12 +32,21 @@ if sys.platform == 'win32':
 
 # Google Trends
 try:
-    from pytrends.request import TrendReq
+    from pytrends.request import TrendReq, BASE_TRENDS_URL
+    from pytrends import exceptions as pytrends_exceptions
     HAS_PYTRENDS = True
 except ImportError:
     HAS_PYTRENDS = False
     print("警告: pytrends未安装，Google Trends功能不可用。安装: pip install pytrends")
 
+# 添加backend/src到路径，以便直接运行本脚本时也能导入utils
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.http_cache import ResponseCache, get_response_cache
+from utils.record_store import NDJSONWriter, ndjson_filename
+from utils.rate_limiter import get_rate_limiter
+from utils.http_client import HTTPClient, get_http_client
+
 # 百度指数（可选，需要cookie）
 try:
     # 可以使用 gopup 或其他库
@@ -43,42 +56,437 @@ except ImportError:
 
 # 获取项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+CONFIG_PATH = PROJECT_ROOT / "backend" / "config" / "config.yaml"
+
+# TrendReq会话池默认大小，以及cookie多久后重新获取（秒）
+DEFAULT_SESSION_POOL_SIZE = 4
+DEFAULT_COOKIE_TTL = 1800
+
+# Google Trends单个payload最多支持的关键词数量
+TRENDS_BATCH_SIZE = 5
+# Google Trends对不超过约270天的时间范围返回按天数据，增量刷新窗口不超过这个长度
+MAX_DAILY_WINDOW_DAYS = 250
+# 日期的存储格式（与str(Timestamp)一致）
+TREND_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def plan_anchor_batches(keywords: List[str], anchor: str) -> List[List[str]]:
+    """
+    把关键词按每批最多5个分组，每批都包含同一个锚点关键词
+    
+    Google Trends对每个payload单独归一化到0~100，不同批次的数值不可直接比较；
+    每批都带上锚点关键词后，可以用锚点在各批中的数值把所有批次换算到同一个尺度。
+    
+    Returns:
+        [[anchor, kw1, kw2, kw3, kw4], [anchor, kw5, ...], ...]
+    """
+    others = [keyword for keyword in dict.fromkeys(keywords) if keyword != anchor]
+    size = TRENDS_BATCH_SIZE - 1
+    return [[anchor] + others[i:i + size] for i in range(0, len(others), size)] or [[anchor]]
+
+
+def anchor_scale_factor(reference_rows: List[Dict], rows: List[Dict], anchor: str) -> Optional[float]:
+    """
+    计算把一批数据换算到参考批次尺度的系数
+    
+    使用锚点关键词在两批中的总和之比（比逐点比值更稳定，不受单个0值影响）。
+    
+    Returns:
+        换算系数；锚点在任一批中总和为0时无法换算，返回None
+    """
+    reference_total = sum(row.get(anchor) or 0.0 for row in reference_rows)
+    total = sum(row.get(anchor) or 0.0 for row in rows)
+    return _scale_from_totals(reference_total, total)
+
+
+def _scale_from_totals(reference_total: float, total: float) -> Optional[float]:
+    if reference_total <= 0 or total <= 0:
+        return None
+    return reference_total / total
+
+
+def interest_columns(interest_over_time: pd.DataFrame, keywords: List[str]) -> Dict:
+    """
+    pytrends的interest_over_time DataFrame -> 列式数据（向量化转换，不逐行遍历）
+    
+    Returns:
+        {'dates': [日期字符串], 'values': {关键词: [数值]}}，缺失值为0.0；
+        可直接传给DataManager.save_trend_series批量写入
+    """
+    if interest_over_time is None or interest_over_time.empty:
+        return {'dates': [], 'values': {}}
+    
+    index = interest_over_time.index
+    if isinstance(index, pd.DatetimeIndex):
+        # 与str(Timestamp)格式一致，保证和已保存数据的日期可以对上
+        dates = index.strftime(TREND_DATE_FORMAT).tolist()
+    else:
+        dates = index.astype(str).tolist()
+    
+    values = {
+        keyword: interest_over_time[keyword].to_numpy(dtype=float, na_value=0.0).tolist()
+        for keyword in keywords if keyword in interest_over_time.columns
+    }
+    return {'dates': dates, 'values': values}
+
+
+def columns_to_records(columns: Dict) -> List[Dict]:
+    """列式数据 -> 记录列表 [{'date': ..., 关键词: 数值, ...}]"""
+    keywords = list(columns.get('values', {}))
+    series = [columns['values'][keyword] for keyword in keywords]
+    return [
+        {'date': date, **dict(zip(keywords, row))}
+        for date, row in zip(columns.get('dates', []), zip(*series) if series else repeat(()))
+    ]
+
+
+def aggregate_weekly(series: pd.Series) -> pd.Series:
+    """
+    按天数据 -> 按周数据（取平均值）
+    
+    与Google Trends的周数据一致：每周从周日开始，以周日的日期作为该周的日期
+    """
+    week_start = series.index - pd.to_timedelta((series.index.dayofweek + 1) % 7, unit='D')
+    return series.groupby(week_start).mean()
+
+
+def records_to_columns(records: List[Dict], keywords: List[str]) -> Dict:
+    """记录列表 -> 列式数据（用于批量采集合并后的结果和旧格式的缓存）"""
+    present = [keyword for keyword in keywords if any(keyword in record for record in records)]
+    return {
+        'dates': [str(record.get('date', '')) for record in records],
+        'values': {keyword: [float(record.get(keyword) or 0.0) for record in records] for keyword in present}
+    }
+
+
+if HAS_PYTRENDS:
+    class PooledTrendReq(TrendReq):
+        """
+        使用共享HTTP连接池、并经过共享自适应限速器的TrendReq
+
+        pytrends原生实现每个请求都新建一个requests.Session（每次都重新握手），
+        这里改为复用共享客户端的keep-alive连接；一次查询会发出多个请求
+        （token、时间序列、相关查询等），在 _get_data 中限速才能让所有请求共享同一个速率预算。
+        配置了代理时回退到pytrends原生实现。
+        """
+        
+        def __init__(self, *args, rate_limiter=None, max_retries: int = 2,
+                     http_client: Optional[HTTPClient] = None, **kwargs):
+            self.rate_limiter = rate_limiter or get_rate_limiter('google_trends')
+            self.max_retries = max(0, max_retries)
+            self.http = http_client or get_http_client()
+            super().__init__(*args, **kwargs)
+        
+        def GetGoogleCookie(self):
+            if self.proxies or 'proxies' in self.requests_args:
+                return super().GetGoogleCookie()
+            # 获取cookie也计入Google Trends的速率预算，大量会话同时创建时不会集中冲击explore页面；
+            # 响应状态同样反馈给限速器，被限流时按调整后的间隔重试
+            for attempt in range(self.max_retries + 1):
+                self.rate_limiter.acquire()
+                response = self.http.get(f"{BASE_TRENDS_URL}/explore/?geo={self.hl[-2:]}",
+                                         timeout=self.timeout, **self.requests_args)
+                throttled = self.rate_limiter.report(response.status_code, response.headers.get('Retry-After'))
+                if throttled and attempt < self.max_retries:
+                    continue
+                if response.status_code >= 400:
+                    # 被限流或出错时返回的cookie不可用，由会话池丢弃这个会话
+                    if response.status_code == 429:
+                        raise pytrends_exceptions.TooManyRequestsError.from_response(response)
+                    raise pytrends_exceptions.ResponseError.from_response(response)
+                return {name: value for name, value in response.cookies.items() if name == 'NID'}
+        
+        def _send(self, url, method, trim_chars, **kwargs):
+            """通过共享连接池发送请求，返回解析后的JSON"""
+            if self.proxies:
+                return super()._get_data(url, method=method, trim_chars=trim_chars, **kwargs)
+            
+            response = self.http.request('POST' if method == TrendReq.POST_METHOD else 'GET', url,
+                                         timeout=self.timeout, cookies=self.cookies,
+                                         headers=self.headers, **kwargs, **self.requests_args)
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code == 200 and any(
+                    t in content_type for t in ('application/json', 'application/javascript', 'text/javascript')):
+                # 部分响应以 ")]}'," 之类的字符开头，需要先去掉
+                return json.loads(response.text[trim_chars:])
+            if response.status_code == 429:
+                raise pytrends_exceptions.TooManyRequestsError.from_response(response)
+            raise pytrends_exceptions.ResponseError.from_response(response)
+        
+        def _get_data(self, url, method=TrendReq.GET_METHOD, trim_chars=0, **kwargs):
+            for attempt in range(self.max_retries + 1):
+                self.rate_limiter.acquire()
+                try:
+                    data = self._send(url, method, trim_chars, **kwargs)
+                except pytrends_exceptions.ResponseError as e:
+                    response = e.response
+                    throttled = self.rate_limiter.report(response.status_code,
+                                                         response.headers.get('Retry-After'))
+                    if throttled and attempt < self.max_retries:
+                        continue
+                    raise
+                self.rate_limiter.on_success()
+                return data
+
+
+def load_trends_config() -> Dict:
+    """读取config.yaml中的 data_sources.google_trends 配置（会话池大小、cookie有效期）"""
+    config = {'session_pool_size': DEFAULT_SESSION_POOL_SIZE, 'cookie_ttl': DEFAULT_COOKIE_TTL}
+    try:
+        import yaml
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            loaded = yaml.safe_load(f) or {}
+        config.update(loaded.get('data_sources', {}).get('google_trends') or {})
+    except Exception as e:
+        print(f"读取Google Trends配置失败，使用默认配置: {e}")
+    return config
+
+
+class _PooledSession:
+    """会话池中的一个TrendReq及其cookie获取时间"""
+    
+    def __init__(self, trend_req):
+        self.trend_req = trend_req
+        self.cookie_time = time.monotonic()
+        self.uses = 0
+
+
+class TrendReqPool:
+    """
+    进程内共享的TrendReq会话池
+    
+    TrendReq创建时要先请求一次explore页面获取cookie，而且build_payload和后续查询之间保存状态，
+    不能被多个线程同时使用。会话池预先创建好带cookie的TrendReq，按借出/归还使用：
+    - 借出时优先复用空闲会话，cookie超过cookie_ttl时先重新获取
+    - 没有空闲会话且未达到上限时创建新会话，达到上限时等待其他线程归还
+    - 使用中出错的会话归还后，下次借出前重新获取cookie（不单独探测会话是否可用：
+      cookie请求本身会检查响应状态，失败时丢弃该会话）
+    - 创建会话和刷新cookie串行进行，请求突增时不会同时冲击cookie接口
+    """
+    
+    def __init__(self, size: int = DEFAULT_SESSION_POOL_SIZE, cookie_ttl: float = DEFAULT_COOKIE_TTL,
+                 factory: Optional[Callable[[], object]] = None):
+        """
+        Args:
+            size: 最多同时存在的会话数量
+            cookie_ttl: cookie有效期（秒），超过后借出前重新获取
+            factory: 创建TrendReq的函数，默认创建使用共享连接池和限速器的PooledTrendReq
+        """
+        self.size = max(1, int(size))
+        self.cookie_ttl = cookie_ttl
+        self.factory = factory or _create_trend_req
+        self._idle: List[_PooledSession] = []
+        self._in_use: Dict[int, _PooledSession] = {}
+        self._total = 0
+        self._cond = threading.Condition()
+        # 创建会话和刷新cookie都要请求cookie接口，串行进行
+        self._cookie_lock = threading.Lock()
+        self._stats = {'created': 0, 'checkouts': 0, 'waits': 0, 'cookie_refreshes': 0, 'discarded': 0}
+    
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        借出一个TrendReq（用完后必须调用release归还）
+        
+        Raises:
+            TimeoutError: timeout秒内没有可用的会话
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                if self._idle:
+                    # 后进先出：最近用过的会话连接和cookie都最新
+                    entry = self._idle.pop()
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    entry = None
+                    break
+                self._stats['waits'] += 1
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError('等待Google Trends会话超时')
+                self._cond.wait(remaining)
+            self._stats['checkouts'] += 1
+        
+        try:
+            if entry is None:
+                entry = self._create()
+            elif time.monotonic() - entry.cookie_time > self.cookie_ttl:
+                self._refresh_cookie(entry)
+        except Exception:
+            # 创建或刷新失败，释放名额让其他线程重试
+            self._drop()
+            raise
+        
+        entry.uses += 1
+        with self._cond:
+            self._in_use[id(entry.trend_req)] = entry
+        return entry.trend_req
+    
+    def release(self, trend_req, healthy: bool = True):
+        """
+        归还TrendReq
+        
+        Args:
+            healthy: 使用中是否正常；为False时把cookie标记为过期，下次借出前重新获取
+                     （获取失败时该会话被丢弃）
+        """
+        with self._cond:
+            entry = self._in_use.pop(id(trend_req), None)
+            if entry is None:
+                return
+            if not healthy:
+                entry.cookie_time = float('-inf')
+            self._idle.append(entry)
+            self._cond.notify()
+    
+    def discard(self, trend_req):
+        """丢弃借出的TrendReq（不再放回池中）"""
+        with self._cond:
+            if self._in_use.pop(id(trend_req), None) is None:
+                return
+        self._drop()
+    
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """
+        借出一个TrendReq，退出时自动归还（出现异常时标记为需要刷新cookie）
+        
+        Example:
+            with pool.session() as pytrends:
+                pytrends.build_payload(['python'])
+                df = pytrends.interest_over_time()
+        """
+        trend_req = self.acquire(timeout)
+        try:
+            yield trend_req
+        except BaseException:
+            self.release(trend_req, healthy=False)
+            raise
+        self.release(trend_req)
+    
+    def warm(self, count: Optional[int] = None) -> int:
+        """
+        预先创建会话（如在服务启动时调用，第一个请求就不需要等待获取cookie）
+        
+        Args:
+            count: 预先创建的数量，默认创建到池的上限
+        
+        Returns:
+            实际新建的会话数量
+        """
+        created = 0
+        target = min(self.size, count or self.size)
+        while True:
+            with self._cond:
+                if self._total >= target:
+                    break
+                self._total += 1
+            try:
+                entry = self._create()
+            except Exception as e:
+                self._drop()
+                print(f"预热Google Trends会话失败: {e}")
+                break
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+            created += 1
+        return created
+    
+    def stats(self) -> Dict:
+        """会话池状态"""
+        with self._cond:
+            return dict(self._stats, size=self.size, total=self._total,
+                        idle=len(self._idle), in_use=len(self._in_use))
+    
+    def _create(self) -> _PooledSession:
+        with self._cookie_lock:
+            entry = _PooledSession(self.factory())
+        with self._cond:
+            self._stats['created'] += 1
+        return entry
+    
+    def _refresh_cookie(self, entry: _PooledSession):
+        with self._cookie_lock:
+            entry.trend_req.cookies = entry.trend_req.GetGoogleCookie()
+            entry.cookie_time = time.monotonic()
+        with self._cond:
+            self._stats['cookie_refreshes'] += 1
+    
+    def _drop(self):
+        with self._cond:
+            self._total -= 1
+            self._stats['discarded'] += 1
+            self._cond.notify()
+
+
+def _create_trend_req():
+    return PooledTrendReq(hl='en-US', tz=360, rate_limiter=get_rate_limiter('google_trends'))
+
+
+_trend_req_pool: Optional[TrendReqPool] = None
+_trend_req_pool_lock = threading.Lock()
+
+
+def get_trend_req_pool() -> TrendReqPool:
+    """获取进程内共享的TrendReq会话池（大小和cookie有效期来自config.yaml）"""
+    global _trend_req_pool
+    with _trend_req_pool_lock:
+        if _trend_req_pool is None:
+            config = load_trends_config()
+            _trend_req_pool = TrendReqPool(size=config['session_pool_size'],
+                                           cookie_ttl=config['cookie_ttl'])
+        return _trend_req_pool
 
 
 class TrendScraper:
     """搜索趋势数据采集器"""
     
-    def __init__(self, delay: float = 1.0):
+    def __init__(self, delay: float = 1.0, cache: Optional[ResponseCache] = None,
+                 use_cache: bool = True, pool: Optional[TrendReqPool] = None):
         """
         Args:
-            delay: 请求间隔（秒），避免被封
+            delay: Google Trends的初始请求间隔（秒）。限速器按AIMD自适应调整，
+                   所有线程和进程共享，被限流（429）时自动放慢并重试
+            cache: 响应缓存，默认使用进程内共享的磁盘缓存
+            use_cache: 是否使用响应缓存
+            pool: TrendReq会话池，默认使用进程内共享的会话池（创建TrendScraper不再发出任何请求）
         """
         self.delay = delay
-        self.pytrends = None
+        self.cache = (cache or get_response_cache()) if use_cache else None
+        self.pool = None
         if HAS_PYTRENDS:
-            try:
-                self.pytrends = TrendReq(hl='en-US', tz=360)
-            except Exception as e:
-                print(f"初始化Google Trends失败: {e}")
+            # 首次创建限速器时使用delay作为初始请求间隔，会话池中的TrendReq共用这个限速器
+            get_rate_limiter('google_trends', delay)
+            self.pool = pool or get_trend_req_pool()
         
         self.data_dir = PROJECT_ROOT / "data" / "raw" / "trends"
         self.data_dir.mkdir(parents=True, exist_ok=True)
     
     def get_google_trends(self, keywords: List[str], timeframe: str = 'today 12-m', 
-                          geo: str = '', cat: int = 0) -> Dict:
+                          geo: str = '', cat: int = 0, include_related: bool = False,
+                          columnar: bool = False) -> Dict:
         """
         获取Google Trends数据
         
+        默认只请求时间序列（interest_over_time）。相关查询和相关主题每个关键词各需要
+        一次额外请求，只在include_related为True时获取，也可以之后调用get_google_trends_related单独获取
+        
         Args:
             keywords: 关键词列表（最多5个）
             timeframe: 时间范围，如 'today 12-m', 'today 3-m', 'all'
             geo: 地理位置代码，如 'US', 'CN', ''表示全球
             cat: 分类代码，0表示所有分类
+            include_related: 是否同时获取相关查询和相关主题
+            columnar: 为True时时间序列以列式数据 data['interest_columns']
+                      （{'dates': [...], 'values': {关键词: [...]}}）返回，不转换为记录列表，
+                      适合直接批量写入数据库
             
         Returns:
             包含趋势数据的字典
         """
-        if not HAS_PYTRENDS or not self.pytrends:
+        if not HAS_PYTRENDS or not self.pool:
             return {
                 'success': False,
                 'error': 'pytrends未安装或初始化失败',
@@ -95,60 +503,117 @@ class TrendScraper:
         # Google Trends最多支持5个关键词
         keywords = keywords[:5]
         
-        try:
-            # 构建请求
-            self.pytrends.build_payload(
-                kw_list=keywords,
-                cat=cat,
-                timeframe=timeframe,
-                geo=geo,
-                gprop=''  # 默认网页搜索，也可以是 'images', 'news', 'youtube', 'froogle'
-            )
-            
-            # 获取时间序列数据
-            interest_over_time = self.pytrends.interest_over_time()
-            
-            # 获取相关查询（可能失败，需要错误处理）
-            related_queries = {}
+        # pytrends自己管理HTTP请求，因此按查询参数缓存处理后的结果
+        # （时间序列和相关数据分开缓存，只要时间序列的调用不会被相关数据拖慢）
+        cache_key = None
+        result = None
+        if self.cache:
+            cache_key = self.cache.make_key('google_trends', keywords, timeframe, geo, cat)
+            cached = self.cache.lookup(cache_key, 'google_trends')
+            if cached is not None:
+                result = json.loads(cached)
+                if 'interest_columns' not in result['data']:
+                    # 旧格式缓存（记录列表）
+                    result['data'] = {'interest_columns': records_to_columns(
+                        result['data'].get('interest_over_time', []), keywords)}
+        
+        related = None
+        if result is None:
             try:
-                related_queries = self.pytrends.related_queries()
-            except Exception as e:
-                print(f"获取相关查询失败: {e}")
+                with self.pool.session() as pytrends:
+                    self._build_payload(pytrends, keywords, timeframe, geo, cat)
+                
+                    # 获取时间序列数据
+                    interest_over_time = pytrends.interest_over_time()
+                
+                    # 转换为字典格式
+                    result = {
+                        'success': True,
+                        'platform': 'google_trends',
+                        'keywords': keywords,
+                        'timeframe': timeframe,
+                        'geo': geo,
+                        'data': {
+                            # 缓存列式数据，需要记录列表时再转换
+                            'interest_columns': interest_columns(interest_over_time, keywords)
+                        }
+                    }
+                
+                    if cache_key:
+                        self.cache.store(cache_key, 'google_trends',
+                                         json.dumps(result, ensure_ascii=False, default=str).encode('utf-8'))
+                    
+                    if include_related:
+                        # 复用刚构建的payload，不再重复请求explore
+                        related = self.get_google_trends_related(keywords, timeframe=timeframe, geo=geo,
+                                                                 cat=cat, pytrends=pytrends)
             
-            # 获取相关主题（可能失败，需要错误处理）
-            related_topics = {}
-            try:
-                related_topics = self.pytrends.related_topics()
             except Exception as e:
-                print(f"获取相关主题失败: {e}")
-            
-            # 处理时间序列数据，转换为易处理的格式
-            interest_data = []
-            if not interest_over_time.empty:
-                # 重置索引，确保date在列中
-                df = interest_over_time.reset_index()
-                # 转换为记录列表
-                for _, row in df.iterrows():
-                    record = {}
-                    # 获取日期
-                    if 'date' in df.columns:
-                        record['date'] = str(row['date'])
-                    elif df.index.name == 'date':
-                        # 使用iloc而不是索引访问
-                        try:
-                            record['date'] = str(df.index.iloc[_])
-                        except (IndexError, AttributeError):
-                            record['date'] = str(row.name) if hasattr(row, 'name') else str(_)
-                    else:
-                        # 尝试从索引获取
-                        record['date'] = str(row.name) if hasattr(row, 'name') else str(_)
-                    
-                    # 获取每个关键词的值
-                    for kw in keywords:
-                        if kw in row:
-                            record[kw] = float(row[kw]) if pd.notna(row[kw]) else 0.0
-                    
-                    interest_data.append(record)
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'data': {}
+                }
+        
+        columns = result['data']['interest_columns']
+        if columnar:
+            data = {'interest_columns': columns}
+        else:
+            data = {'interest_over_time': columns_to_records(columns)}  # 返回记录列表，更易处理
+        
+        if include_related:
+            if related is None:
+                related = self.get_google_trends_related(keywords, timeframe=timeframe, geo=geo, cat=cat)
+            data['related_queries'] = related['data'].get('related_queries', {})
+            data['related_topics'] = related['data'].get('related_topics', {})
+        
+        return dict(result, data=data)
+    
+    def get_google_trends_related(self, keywords: List[str], timeframe: str = 'today 12-m',
+                                  geo: str = '', cat: int = 0, pytrends=None) -> Dict:
+        """
+        获取Google Trends相关查询和相关主题（与时间序列分开缓存）
+        
+        Args:
+            keywords: 关键词列表（最多5个）
+            timeframe: 时间范围
+            geo: 地理位置代码
+            cat: 分类代码
+            pytrends: 调用方借出的、刚用相同参数调用过build_payload的TrendReq（内部使用）
+        
+        Returns:
+            {'success', 'keywords', 'data': {'related_queries': {...}, 'related_topics': {...}}}
+        """
+        if not HAS_PYTRENDS or not self.pool:
+            return {
+                'success': False,
+                'error': 'pytrends未安装或初始化失败',
+                'data': {}
+            }
+        
+        if not keywords:
+            return {
+                'success': False,
+                'error': '关键词列表不能为空',
+                'data': {}
+            }
+        
+        keywords = keywords[:5]
+        
+        cache_key = None
+        if self.cache:
+            cache_key = self.cache.make_key('google_trends_related', keywords, timeframe, geo, cat)
+            cached = self.cache.lookup(cache_key, 'google_trends')
+            if cached is not None:
+                return json.loads(cached)
+        
+        try:
+            if pytrends is not None:
+                related_queries, related_topics = self._fetch_related(pytrends)
+            else:
+                with self.pool.session() as pytrends:
+                    self._build_payload(pytrends, keywords, timeframe, geo, cat)
+                    related_queries, related_topics = self._fetch_related(pytrends)
             
             # 处理相关查询
             related_queries_dict = {}
@@ -182,7 +647,6 @@ class TrendScraper:
                     else:
                         related_topics_dict[kw] = {'top': [], 'rising': []}
             
-            # 转换为字典格式
             result = {
                 'success': True,
                 'platform': 'google_trends',
@@ -190,13 +654,15 @@ class TrendScraper:
                 'timeframe': timeframe,
                 'geo': geo,
                 'data': {
-                    'interest_over_time': interest_data,  # 返回记录列表，更易处理
                     'related_queries': related_queries_dict,
                     'related_topics': related_topics_dict
                 }
             }
             
-            time.sleep(self.delay)
+            if cache_key:
+                self.cache.store(cache_key, 'google_trends',
+                                 json.dumps(result, ensure_ascii=False, default=str).encode('utf-8'))
+            
             return result
             
         except Exception as e:
@@ -206,6 +672,279 @@ class TrendScraper:
                 'data': {}
             }
     
+    @staticmethod
+    def _fetch_related(pytrends):
+        """获取当前payload的相关查询和相关主题"""
+        # 获取相关查询（可能失败，需要错误处理）
+        related_queries = {}
+        try:
+            related_queries = pytrends.related_queries()
+        except Exception as e:
+            print(f"获取相关查询失败: {e}")
+        
+        # 获取相关主题（可能失败，需要错误处理）
+        related_topics = {}
+        try:
+            related_topics = pytrends.related_topics()
+        except Exception as e:
+            print(f"获取相关主题失败: {e}")
+        
+        return related_queries, related_topics
+    
+    @staticmethod
+    def _build_payload(pytrends, keywords: List[str], timeframe: str, geo: str, cat: int):
+        """构建请求（pytrends会请求一次explore接口获取各数据的token）"""
+        pytrends.build_payload(
+            kw_list=keywords,
+            cat=cat,
+            timeframe=timeframe,
+            geo=geo,
+            gprop=''  # 默认网页搜索，也可以是 'images', 'news', 'youtube', 'froogle'
+        )
+    
+    def get_google_trends_batched(self, keywords: List[str], anchor: Optional[str] = None,
+                                  timeframe: str = 'today 12-m', geo: str = '', cat: int = 0,
+                                  on_batch: Optional[Callable[[int, int, List[str], bool], None]] = None,
+                                  should_stop: Optional[Callable[[], bool]] = None,
+                                  columnar: bool = False) -> Dict:
+        """
+        批量获取任意数量关键词的Google Trends数据（每个payload 5个关键词，含1个锚点）
+        
+        每批数据用锚点关键词换算到第一批的尺度上，因此所有关键词的数值可以互相比较
+        （数值可能超过100）。与逐个关键词请求相比，请求次数约减少为1/4。
+        
+        Args:
+            keywords: 关键词列表（不限数量）
+            anchor: 锚点关键词，默认使用第一个关键词；应选择搜索量稳定、不过高也不过低的词
+            timeframe: 时间范围
+            geo: 地理位置代码
+            cat: 分类代码
+            on_batch: 每批完成后的回调 (批次序号, 批次总数, 本批关键词, 是否成功)
+            should_stop: 返回True时停止剩余批次
+            columnar: 为True时返回列式数据 data['interest_columns']（见get_google_trends）
+        
+        Returns:
+            与get_google_trends相同的格式，另外包含：
+            - anchor: 锚点关键词
+            - scale_factors: {关键词: 换算系数}
+            - unscaled_keywords: 锚点在该批为0、无法换算的关键词（保留原始值）
+            - failed_keywords: 请求失败的关键词
+        """
+        keywords = [keyword for keyword in keywords if keyword]
+        if not keywords:
+            return {
+                'success': False,
+                'error': '关键词列表不能为空',
+                'data': {}
+            }
+        
+        anchor = anchor or keywords[0]
+        batches = plan_anchor_batches(keywords, anchor)
+        
+        reference = None
+        frames = []
+        scale_factors: Dict[str, float] = {}
+        unscaled, failed = [], []
+        errors = []
+        
+        for idx, batch in enumerate(batches):
+            if should_stop and should_stop():
+                failed.extend(keyword for batch_left in batches[idx:] for keyword in batch_left[1:])
+                break
+            
+            result = self.get_google_trends(batch, timeframe=timeframe, geo=geo, cat=cat, columnar=True)
+            columns = result.get('data', {}).get('interest_columns') if result.get('success') else None
+            if not columns or not columns['dates']:
+                failed.extend(batch[1:])
+                errors.append(result.get('error', '没有数据'))
+                if on_batch:
+                    on_batch(idx, len(batches), batch, False)
+                continue
+            
+            frame = pd.DataFrame(columns['values'], index=columns['dates'])
+            if reference is None:
+                # 第一批成功的数据作为参考尺度，锚点关键词只保留参考批次的数值
+                reference = frame
+                factor = 1.0
+                batch_keywords = batch
+            else:
+                factor = _scale_from_totals(float(reference[anchor].sum()) if anchor in reference else 0.0,
+                                            float(frame[anchor].sum()) if anchor in frame else 0.0)
+                batch_keywords = batch[1:]
+            frame = frame[[keyword for keyword in batch_keywords if keyword in frame.columns]]
+            frames.append(frame * factor if factor is not None else frame)
+            for keyword in batch_keywords:
+                if factor is None:
+                    unscaled.append(keyword)
+                else:
+                    scale_factors[keyword] = round(factor, 6)
+            
+            if on_batch:
+                on_batch(idx, len(batches), batch, True)
+        
+        if unscaled:
+            print(f"警告: 锚点 {anchor} 在部分批次中没有数据，{len(unscaled)} 个关键词无法换算到统一尺度")
+        
+        if reference is None:
+            return {
+                'success': False,
+                'error': errors[0] if errors else '没有数据',
+                'data': {}
+            }
+        
+        # 按日期对齐所有批次（某批缺少的日期记为0）
+        merged = pd.concat(frames, axis=1).sort_index()
+        columns = {
+            'dates': merged.index.tolist(),
+            'values': {keyword: merged[keyword].to_numpy(dtype=float, na_value=0.0).round(3).tolist()
+                       for keyword in merged.columns}
+        }
+        
+        return {
+            'success': True,
+            'platform': 'google_trends',
+            'keywords': [keyword for keyword in dict.fromkeys([anchor] + keywords) if keyword not in failed],
+            'timeframe': timeframe,
+            'geo': geo,
+            'anchor': anchor,
+            'batches': len(batches),
+            'scale_factors': scale_factors,
+            'unscaled_keywords': unscaled,
+            'failed_keywords': failed,
+            'data': {'interest_columns': columns} if columnar else {'interest_over_time': columns_to_records(columns)}
+        }
+    
+    def refresh_google_trends(self, keywords: List[str], data_manager, timeframe: str = 'today 12-m',
+                              geo: str = '', overlap_weeks: int = 4, batch_size: int = TRENDS_BATCH_SIZE,
+                              on_keyword: Optional[Callable[[str, int], None]] = None,
+                              should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        """
+        增量刷新已保存的Google Trends数据（只获取最近一段时间）
+        
+        对每个关键词找到已保存的最新日期，只请求从该日期前overlap_weeks周到今天的短窗口，
+        用窗口与已保存数据重叠部分的总和之比把窗口数据换算到已保存数据的尺度，
+        然后只写入最新日期及之后的数据点（最新一周可能是不完整的，一并更新）。
+        已保存数据是按周数据时，窗口的按天数据先按周汇总。
+        
+        没有已保存数据、最新日期太久远或重叠部分无法换算的关键词退回到完整采集timeframe。
+        
+        Args:
+            keywords: 关键词列表
+            data_manager: DataManager实例（读取已保存数据并写入新数据）
+            timeframe: 完整采集时使用的时间范围
+            geo: 地理位置代码
+            overlap_weeks: 重叠部分的周数
+            batch_size: 每个请求包含的关键词数量（每个关键词用自己的重叠部分单独换算）
+            on_keyword: 每个关键词完成后的回调 (关键词, 写入的数据点数量)
+            should_stop: 返回True时停止剩余关键词
+        
+        Returns:
+            {'success', 'incremental': {关键词: 数据点数量}, 'full_reload': {关键词: 数据点数量},
+             'failed_keywords', 'requests'}
+        """
+        platform = 'google_trends'
+        keywords = [keyword for keyword in dict.fromkeys(keywords) if keyword]
+        today = pd.Timestamp.now().normalize()
+        latest_dates = data_manager.get_latest_trend_dates(keywords, platform)
+        
+        stats = {'incremental': {}, 'full_reload': {}, 'failed_keywords': [], 'requests': 0}
+        
+        # 需要完整采集的关键词，以及增量刷新的 (窗口开始日期, 关键词, 最新日期)
+        full, windows = [], []
+        for keyword in keywords:
+            if keyword not in latest_dates:
+                full.append(keyword)
+                continue
+            latest = pd.Timestamp(latest_dates[keyword])
+            start = latest - pd.Timedelta(weeks=overlap_weeks)
+            if (today - start).days > MAX_DAILY_WINDOW_DAYS:
+                full.append(keyword)
+            else:
+                windows.append((start, keyword, latest))
+        
+        # 窗口开始日期相近的关键词放在同一个请求里
+        windows.sort()
+        batch_size = max(1, min(batch_size, TRENDS_BATCH_SIZE))
+        pending = [windows[i:i + batch_size] for i in range(0, len(windows), batch_size)]
+        while pending:
+            if should_stop and should_stop():
+                break
+            batch = pending.pop(0)
+            batch_keywords = [keyword for _, keyword, _ in batch]
+            window = f"{batch[0][0]:%Y-%m-%d} {today:%Y-%m-%d}"
+            result = self.get_google_trends(batch_keywords, timeframe=window, geo=geo, columnar=True)
+            stats['requests'] += 1
+            columns = result.get('data', {}).get('interest_columns') if result.get('success') else None
+            if not columns or not columns['dates']:
+                print(f"增量刷新失败 {batch_keywords}: {result.get('error', '没有数据')}")
+                full.extend(batch_keywords)
+                continue
+            
+            dates = pd.to_datetime(columns['dates'])
+            for start, keyword, latest in batch:
+                # 请求结果中没有该关键词时按全0处理（无法换算，会单独重试）
+                series = pd.Series(columns['values'].get(keyword, 0.0), index=dates, dtype=float)
+                saved = self._merge_refresh_window(data_manager, keyword, series, start, latest)
+                if saved is None and len(batch) > 1:
+                    # 同一请求中其他关键词热度高得多时，本关键词的数值可能被压成0，单独重试
+                    pending.append([(start, keyword, latest)])
+                elif saved is None:
+                    full.append(keyword)
+                else:
+                    stats['incremental'][keyword] = saved
+                    if on_keyword:
+                        on_keyword(keyword, saved)
+        
+        for keyword in full:
+            if should_stop and should_stop():
+                break
+            result = self.get_google_trends([keyword], timeframe=timeframe, geo=geo, columnar=True)
+            stats['requests'] += 1
+            if not result.get('success'):
+                stats['failed_keywords'].append(keyword)
+                continue
+            columns = result['data']['interest_columns']
+            saved = data_manager.save_trend_series(platform, columns['dates'], columns['values'],
+                                                   metadata={'refresh': 'full'})
+            stats['full_reload'][keyword] = saved
+            if on_keyword:
+                on_keyword(keyword, saved)
+        
+        stats['success'] = not stats['failed_keywords']
+        print(f"Google Trends增量刷新: {len(stats['incremental'])} 个关键词增量更新，"
+              f"{len(stats['full_reload'])} 个完整采集，{len(stats['failed_keywords'])} 个失败，"
+              f"共 {stats['requests']} 个请求")
+        return stats
+    
+    def _merge_refresh_window(self, data_manager, keyword: str, window: pd.Series,
+                              start: pd.Timestamp, latest: pd.Timestamp) -> Optional[int]:
+        """
+        把增量窗口换算到已保存数据的尺度并写入最新日期及之后的数据点
+        
+        Returns:
+            写入的数据点数量；重叠部分无法换算时返回None
+        """
+        stored = data_manager.get_trend_data(keyword=keyword, platform='google_trends',
+                                             start_date=start.strftime(TREND_DATE_FORMAT))
+        stored = pd.Series(stored['value'].to_numpy(dtype=float), index=pd.to_datetime(stored['date']))
+        
+        # 已保存数据相邻日期间隔7天及以上视为按周数据
+        if len(stored) >= 2 and stored.index.to_series().diff().min() >= pd.Timedelta(days=7):
+            window = aggregate_weekly(window)
+        
+        # 重叠部分：窗口中早于最新日期的数据点（没有保存的日期表示0）
+        overlap = window[(window.index >= start) & (window.index < latest)]
+        stored_overlap = stored.reindex(overlap.index, fill_value=0.0)
+        factor = _scale_from_totals(float(stored_overlap.sum()), float(overlap.sum()))
+        if factor is None:
+            return None
+        
+        new_points = window[window.index >= latest] * factor
+        return data_manager.save_trend_series(
+            'google_trends', new_points.index.strftime(TREND_DATE_FORMAT).tolist(),
+            {keyword: new_points.round(3).to_numpy()},
+            metadata={'refresh': 'incremental', 'scale_factor': round(factor, 6)})
+    
     def get_google_trends_suggestions(self, keyword: str) -> List[Dict]:
         """
         获取Google Trends关键词建议
@@ -216,11 +955,13 @@ class TrendScraper:
         Returns:
             建议列表
         """
-        if not HAS_PYTRENDS or not self.pytrends:
+        if not HAS_PYTRENDS or not self.pool:
             return []
         
         try:
-            suggestions = self.pytrends.suggestions(keyword=keyword)
+            # 会话池中的TrendReq已经带有cookie，只需要一次请求
+            with self.pool.session() as pytrends:
+                suggestions = pytrends.suggestions(keyword=keyword)
             return suggestions if suggestions else []
         except Exception as e:
             print(f"获取Google Trends建议失败: {e}")
@@ -296,7 +1037,7 @@ class TrendScraper:
     def get_trends_multi_platform(self, keywords: List[str], platforms: List[str] = None,
                                   timeframe: str = 'today 12-m') -> Dict:
         """
-        从多个平台获取趋势数据
+        从多个平台获取趋势数据（各平台并发请求）
         
         Args:
             keywords: 关键词列表
@@ -306,45 +1047,138 @@ class TrendScraper:
         Returns:
             包含所有平台数据的字典
         """
-        if platforms is None:
-            platforms = ['google_trends']  # 默认只使用Google Trends
+        collected = self.collect_trends(keywords, platforms=platforms, timeframe=timeframe)
         
         results = {
             'keywords': keywords,
             'timeframe': timeframe,
             'platforms': {},
-            'timestamp': datetime.now().isoformat()
+            'timestamp': collected['timestamp']
         }
+        # 只有一个地区，去掉地区这一层
+        for platform, by_geo in collected['platforms'].items():
+            results['platforms'][platform] = next(iter(by_geo.values()))
         
+        return results
+    
+    def collect_trends(self, keywords: List[str], platforms: List[str] = None, geos: List[str] = None,
+                       timeframe: str = 'today 12-m', max_workers: int = 8, columnar: bool = False) -> Dict:
+        """
+        并发采集多个平台、多个地区的趋势数据
+        
+        每个 (平台, 地区) 是一个独立的请求，在线程池中同时进行，总耗时约等于最慢的一个请求，
+        而不是所有请求耗时之和。每个上游使用自己的共享限速器（如Google Trends的所有地区共用
+        'google_trends'的速率预算），同时进行的Google Trends请求数不超过会话池大小。
+        
+        Args:
+            keywords: 关键词列表（Google Trends超过5个时按锚点分批，见get_google_trends_batched）
+            platforms: 平台列表，默认只使用Google Trends
+            geos: 地区代码列表，如 ['US', 'GB', 'DE']，默认 ['']（全球）；
+                  百度指数和微信指数只有中国数据，地区固定为 'CN'
+            timeframe: 时间范围
+            max_workers: 最多同时进行的请求数
+            columnar: Google Trends时间序列是否以列式数据返回
+        
+        Returns:
+            {
+                'keywords', 'timeframe', 'geos', 'timestamp', 'elapsed',
+                'platforms': {平台: {地区: 该平台该地区的结果}},
+                'errors': [{'platform', 'geo', 'error'}]
+            }
+        """
+        if platforms is None:
+            platforms = ['google_trends']  # 默认只使用Google Trends
+        geos = list(dict.fromkeys(geos or ['']))
+        
+        # (平台, 地区, 采集函数)
+        tasks = []
         for platform in platforms:
             if platform == 'google_trends':
-                data = self.get_google_trends(keywords, timeframe=timeframe)
-                results['platforms']['google_trends'] = data
+                for geo in geos:
+                    tasks.append((platform, geo, lambda geo=geo: self._google_trends_for_geo(
+                        keywords, timeframe, geo, columnar)))
             elif platform == 'baidu_index':
                 # 计算日期范围
                 end_date = datetime.now()
                 start_date = end_date - timedelta(days=365)
-                data = self.get_baidu_index(
-                    keywords,
-                    start_date.strftime('%Y%m%d'),
-                    end_date.strftime('%Y%m%d')
-                )
-                results['platforms']['baidu_index'] = data
+                tasks.append((platform, 'CN', lambda start=start_date, end=end_date: self.get_baidu_index(
+                    keywords, start.strftime('%Y%m%d'), end.strftime('%Y%m%d'))))
             elif platform == 'wechat_index':
                 # 微信指数一次只能查询一个关键词
-                wechat_data = {}
-                for keyword in keywords:
-                    data = self.get_wechat_index(keyword)
-                    wechat_data[keyword] = data
-                results['platforms']['wechat_index'] = wechat_data
+                tasks.append((platform, 'CN', lambda: {keyword: self.get_wechat_index(keyword)
+                                                       for keyword in keywords}))
             elif platform == 'youtube':
-                data = self.get_youtube_trends(keywords)
-                results['platforms']['youtube'] = data
+                for geo in geos:
+                    tasks.append((platform, geo or 'US', lambda region=geo or 'US': self.get_youtube_trends(
+                        keywords, region=region)))
+        
+        results = {
+            'keywords': keywords,
+            'timeframe': timeframe,
+            'geos': geos,
+            'platforms': {},
+            'errors': [],
+            'timestamp': datetime.now().isoformat()
+        }
+        start = time.monotonic()
+        
+        if tasks:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tasks)))) as executor:
+                futures = {executor.submit(func): (platform, geo) for platform, geo, func in tasks}
+                for future in as_completed(futures):
+                    platform, geo = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        data = {'success': False, 'error': str(e), 'data': {}}
+                    results['platforms'].setdefault(platform, {})[geo] = data
+                    if isinstance(data, dict) and data.get('success') is False:
+                        results['errors'].append({'platform': platform, 'geo': geo,
+                                                  'error': data.get('error', '未知错误')})
         
+        results['elapsed'] = round(time.monotonic() - start, 3)
         return results
     
-    def save_trends(self, trends_data: Dict, filename: Optional[str] = None) -> Path:
-        """保存趋势数据"""
+    def _google_trends_for_geo(self, keywords: List[str], timeframe: str, geo: str, columnar: bool) -> Dict:
+        """一个地区的Google Trends数据（超过5个关键词时按锚点分批）"""
+        if len(keywords) > TRENDS_BATCH_SIZE:
+            return self.get_google_trends_batched(keywords, timeframe=timeframe, geo=geo, columnar=columnar)
+        return self.get_google_trends(keywords, timeframe=timeframe, geo=geo, columnar=columnar)
+    
+    def open_trend_writer(self, filename: Optional[str] = None, compression: Optional[str] = 'gzip',
+                          append: bool = True) -> NDJSONWriter:
+        """
+        打开趋势数据的流式写入器（NDJSON，每行一个采集结果）
+        
+        Args:
+            filename: 文件名，默认按天 trends_日期.ndjson.gz，同一天的结果追加到同一个文件
+            compression: 压缩方式：None、'gzip'、'zstd'
+            append: 是否追加到已有文件
+            
+        Returns:
+            NDJSONWriter，写完后需要close（或使用with）
+        """
+        if not filename:
+            filename = ndjson_filename(f"trends_{datetime.now().strftime('%Y%m%d')}", compression)
+        return NDJSONWriter(self.data_dir / filename, append=append)
+    
+    def save_trends(self, trends_data: Dict, filename: Optional[str] = None, fmt: str = 'json',
+                    compression: Optional[str] = None) -> Path:
+        """
+        保存趋势数据
+        
+        Args:
+            trends_data: 趋势数据
+            filename: 文件名
+            fmt: 'json'（每次一个JSON文件）或 'ndjson'（追加为按天文件中的一行，可压缩）
+            compression: fmt为'ndjson'时的压缩方式：None、'gzip'、'zstd'
+        """
+        if fmt == 'ndjson':
+            with self.open_trend_writer(filename, compression=compression) as writer:
+                writer.write(trends_data)
+            print(f"已追加趋势数据到: {writer.path}")
+            return writer.path
+        
         if not filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             filename = f"trends_{timestamp}.json"
@@ -0,0 +1,178 @@
+"""
+采集任务检查点日志
+记录任务参数、已完成的关键词和已获取的App，进程崩溃或重启后可以从检查点继续，
+不需要从头重新请求
+"""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.record_store import NDJSONWriter, iter_ndjson
+
+
+# 获取项目根目录
+# __file__ = backend/src/utils/checkpoint.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+
+class TaskJournal:
+    """
+    单个采集任务的检查点日志
+
+    两个只追加的NDJSON文件：
+    - <task_id>.journal.ndjson：任务事件（start / keyword / keyword_failed / finish）
+    - <task_id>.apps.ndjson：已从网络获取的App数据
+    每条记录写入后立即flush，进程被杀掉时最多丢失正在写的那一行。
+    """
+
+    def __init__(self, task_id: str, checkpoint_dir: Optional[str] = None):
+        """
+        Args:
+            task_id: 任务ID
+            checkpoint_dir: 检查点目录，默认 data/checkpoints
+        """
+        if checkpoint_dir is None:
+            self.checkpoint_dir = PROJECT_ROOT / "data" / "checkpoints"
+        else:
+            self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        self.task_id = task_id
+        self.journal_path = self.checkpoint_dir / f"{task_id}.journal.ndjson"
+        self.apps_path = self.checkpoint_dir / f"{task_id}.apps.ndjson"
+
+        self._lock = threading.Lock()
+        self._journal_writer = None
+        self._apps_writer = None
+
+        # 从已有日志恢复的状态
+        self.params: Dict = {}
+        self.finished = False
+        self._resolved: Dict[Tuple[str, str], List] = {}
+        self._fetched: Set[Tuple[str, str]] = set()
+        # 本次运行中失败的关键词（有失败时任务不能标记完成，恢复时重试）
+        self.failures: List[Dict] = []
+        self._load()
+
+    def _load(self):
+        """读取已有的检查点"""
+        if self.journal_path.exists():
+            for event in iter_ndjson(self.journal_path):
+                kind = event.get('event')
+                if kind == 'start':
+                    self.params = event.get('params', {})
+                elif kind == 'keyword':
+                    self._resolved[(event['country'], event['keyword'])] = event.get('app_ids', [])
+                elif kind == 'finish':
+                    self.finished = True
+        if self.apps_path.exists():
+            for app in iter_ndjson(self.apps_path):
+                self._fetched.add((app.get('country', 'us'), str(app.get('trackId'))))
+
+    @property
+    def exists(self) -> bool:
+        return self.journal_path.exists()
+
+    def _write_event(self, event: Dict):
+        event['time'] = datetime.now().isoformat()
+        with self._lock:
+            if self._journal_writer is None:
+                self._journal_writer = NDJSONWriter(self.journal_path, append=True)
+            self._journal_writer.write(event)
+            self._journal_writer.flush()
+
+    # ---------- 写入 ----------
+
+    def start(self, params: Dict):
+        """记录任务参数（已存在的日志不会重复记录）"""
+        if self.params:
+            return
+        self.params = params
+        self._write_event({'event': 'start', 'params': params})
+
+    def record_keyword(self, country: str, keyword: str, app_ids: List):
+        """记录关键词已解析出的App ID"""
+        self._resolved[(country, keyword)] = list(app_ids)
+        self._write_event({'event': 'keyword', 'country': country, 'keyword': keyword,
+                           'app_ids': list(app_ids)})
+
+    def record_failure(self, country: str, keyword: Optional[str], error: str):
+        """记录本次运行中失败的关键词（keyword为None表示整个国家商店失败）"""
+        failure = {'country': country, 'keyword': keyword, 'error': error}
+        with self._lock:
+            self.failures.append(failure)
+        self._write_event(dict(failure, event='keyword_failed'))
+
+    def record_app(self, app: Dict):
+        """记录已从网络获取的App数据"""
+        key = (app.get('country', 'us'), str(app.get('trackId')))
+        with self._lock:
+            if key in self._fetched:
+                return
+            self._fetched.add(key)
+            if self._apps_writer is None:
+                self._apps_writer = NDJSONWriter(self.apps_path, append=True)
+            self._apps_writer.write(app)
+            self._apps_writer.flush()
+
+    def finish(self, results: Optional[Dict] = None):
+        """标记任务完成（完成的任务不会再被恢复）"""
+        self._write_event({'event': 'finish', 'results': results or {}})
+        self.finished = True
+        self.close()
+
+    def close(self):
+        with self._lock:
+            for writer in (self._journal_writer, self._apps_writer):
+                if writer:
+                    writer.close()
+            self._journal_writer = None
+            self._apps_writer = None
+
+    # ---------- 读取 ----------
+
+    def resolved_ids(self, country: str, keyword: str) -> Optional[List]:
+        """关键词已解析出的App ID，未解析过返回None"""
+        return self._resolved.get((country, keyword))
+
+    def is_fetched(self, country: str, app_id) -> bool:
+        """App是否已经获取过"""
+        return (country, str(app_id)) in self._fetched
+
+    def iter_apps(self, country: Optional[str] = None) -> Iterator[Dict]:
+        """逐条读取已获取的App数据"""
+        if not self.apps_path.exists():
+            return
+        for app in iter_ndjson(self.apps_path):
+            if country is None or app.get('country', 'us') == country:
+                yield app
+
+    @classmethod
+    def list_unfinished(cls, checkpoint_dir: Optional[str] = None) -> List[Dict]:
+        """
+        列出未完成（可恢复）的任务
+
+        Returns:
+            [{'task_id', 'params', 'keywords_done', 'apps_fetched'}]
+        """
+        if checkpoint_dir is None:
+            checkpoint_dir = PROJECT_ROOT / "data" / "checkpoints"
+        checkpoint_dir = Path(checkpoint_dir)
+        if not checkpoint_dir.exists():
+            return []
+
+        unfinished = []
+        for path in sorted(checkpoint_dir.glob("*.journal.ndjson")):
+            task_id = path.name[:-len(".journal.ndjson")]
+            journal = cls(task_id, checkpoint_dir)
+            if not journal.finished:
+                unfinished.append({
+                    'task_id': task_id,
+                    'params': journal.params,
+                    'keywords_done': len(journal._resolved),
+                    'apps_fetched': len(journal._fetched),
+                })
+        return unfinished
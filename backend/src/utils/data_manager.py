@@ -5,9 +5,11 @@
 
 import json
 import sqlite3
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Sequence, Tuple
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 
@@ -16,6 +18,10 @@ import pandas as pd
 # parent.parent.parent.parent = 项目根目录
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 
+# opportunities表中保存的各维度分数列（与OpportunityAnalyzer的SCORE_COMPONENTS一致），
+# 修改权重或阈值时直接在数据库中重新计算机会分数
+SCORE_COMPONENT_COLUMNS = ('market_size', 'competition', 'user_satisfaction', 'growth_trend', 'monetization')
+
 
 class DataManager:
     """数据管理器"""
@@ -49,10 +55,20 @@ class DataManager:
                 price REAL,
                 opportunity_score REAL,
                 url TEXT,
+                market_size REAL,
+                competition REAL,
+                user_satisfaction REAL,
+                growth_trend REAL,
+                monetization REAL,
+                meets_thresholds INTEGER DEFAULT 1,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(app_id)
             )
         ''')
+        # 旧数据库没有各维度分数列（这些机会的分数在重新分析前不会随权重变化）
+        for column in SCORE_COMPONENT_COLUMNS:
+            self._add_column_if_missing(cursor, 'opportunities', column, 'REAL')
+        self._add_column_if_missing(cursor, 'opportunities', 'meets_thresholds', 'INTEGER DEFAULT 1')
         
         # 创建原始数据表
         cursor.execute('''
@@ -61,9 +77,13 @@ class DataManager:
                 app_id TEXT,
                 data TEXT,
                 source TEXT,
+                country TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # 旧数据库没有country列（同一个App在不同国家商店的数据分别保存）
+        self._add_column_if_missing(cursor, 'raw_apps', 'country', 'TEXT')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_raw_apps_app_id ON raw_apps(app_id, created_at)')
         
         # 创建搜索趋势表
         cursor.execute('''
@@ -99,34 +119,134 @@ class DataManager:
         conn.commit()
         conn.close()
     
+    @staticmethod
+    def _add_column_if_missing(cursor, table: str, column: str, column_type: str):
+        """为已存在的表补充新增的列"""
+        cursor.execute(f'PRAGMA table_info({table})')
+        columns = [row[1] for row in cursor.fetchall()]
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {column_type}')
+    
     def save_opportunity(self, opportunity: Dict):
         """保存机会到数据库"""
+        self.save_opportunities([opportunity])
+    
+    def save_opportunities(self, opportunities: List[Dict]) -> int:
+        """
+        批量保存机会（OpportunityAnalyzer.score_apps的所有评分结果，含各维度分数）
+        
+        没有meets_thresholds字段的记录视为满足阈值
+        
+        Returns:
+            保存的条数
+        """
+        rows = [
+            (
+                opportunity.get('app_id'),
+                opportunity.get('name'),
+                opportunity.get('category'),
+                opportunity.get('rating'),
+                opportunity.get('review_count'),
+                opportunity.get('price'),
+                opportunity.get('opportunity_score'),
+                opportunity.get('url'),
+            ) + tuple(opportunity.get(column) for column in SCORE_COMPONENT_COLUMNS)
+            + (int(bool(opportunity.get('meets_thresholds', True))),)
+            for opportunity in opportunities
+        ]
+        if not rows:
+            return 0
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
-        cursor.execute('''
+        cursor.executemany('''
             INSERT OR REPLACE INTO opportunities 
-            (app_id, name, category, rating, review_count, price, opportunity_score, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            opportunity.get('app_id'),
-            opportunity.get('name'),
-            opportunity.get('category'),
-            opportunity.get('rating'),
-            opportunity.get('review_count'),
-            opportunity.get('price'),
-            opportunity.get('opportunity_score'),
-            opportunity.get('url'),
-        ))
+            (app_id, name, category, rating, review_count, price, opportunity_score, url,
+             market_size, competition, user_satisfaction, growth_trend, monetization, meets_thresholds)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', rows)
+        conn.commit()
+        conn.close()
+        return len(rows)
+    
+    def recompute_opportunity_scores(self, weights: Dict[str, float], min_score: float = 0.6,
+                                     min_reviews: int = 10) -> Dict:
+        """
+        按新的权重和阈值重新计算所有机会的分数（一条UPDATE语句，不需要重新分析原始数据）
+        
+        只更新保存了各维度分数的App；score_apps的所有评分结果都会保存，
+        因此结果与重新分析一致：不满足新阈值的App标记为meets_thresholds=0，不出现在机会列表中，
+        新满足阈值的App标记为1
         
+        Args:
+            weights: 维度 -> 权重，包含SCORE_COMPONENT_COLUMNS中的所有维度
+            min_score: 最低机会分数
+            min_reviews: 最少评论数
+        
+        Returns:
+            {'updated': 重新计算的机会数, 'skipped': 没有维度分数的旧机会数,
+             'meets_thresholds': 满足阈值的机会数}
+        """
+        missing = [column for column in SCORE_COMPONENT_COLUMNS if column not in weights]
+        if missing:
+            raise ValueError(f"缺少维度权重: {missing}")
+        
+        # 累加顺序与OpportunityAnalyzer.score_frame相同，结果一致
+        weighted_sum = ' + '.join(f'{column} * ?' for column in SCORE_COMPONENT_COLUMNS)
+        has_components = ' AND '.join(f'{column} IS NOT NULL' for column in SCORE_COMPONENT_COLUMNS)
+        params = [float(weights[column]) for column in SCORE_COMPONENT_COLUMNS]
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            UPDATE opportunities SET opportunity_score = ROUND({weighted_sum}, 3)
+            WHERE {has_components}
+        ''', params)
+        updated = cursor.rowcount
+        cursor.execute('''
+            UPDATE opportunities
+            SET meets_thresholds = (opportunity_score >= ? AND COALESCE(review_count, 0) >= ?)
+        ''', (float(min_score), int(min_reviews)))
+        cursor.execute('SELECT COUNT(*), COALESCE(SUM(meets_thresholds), 0) FROM opportunities')
+        total, meets = cursor.fetchone()
         conn.commit()
         conn.close()
+        
+        return {'updated': updated, 'skipped': total - updated, 'meets_thresholds': meets}
+    
+    def get_opportunity_components(self, category: Optional[str] = None) -> pd.DataFrame:
+        """
+        获取保存了各维度分数的所有App（用于按多组权重批量试算）
+        
+        包括当前不满足阈值的App（score_apps的所有评分结果都会保存），
+        试算结果不会偏向当前配置的权重
+        
+        Args:
+            category: 只返回该分类的App
+        
+        Returns:
+            列为app_id、name、category、review_count、opportunity_score和各维度分数的DataFrame，
+            按当前机会分数降序排列
+        """
+        has_components = ' AND '.join(f'{column} IS NOT NULL' for column in SCORE_COMPONENT_COLUMNS)
+        query = (f"SELECT app_id, name, category, review_count, opportunity_score, "
+                 f"{', '.join(SCORE_COMPONENT_COLUMNS)} FROM opportunities WHERE {has_components}")
+        params = []
+        if category:
+            query += ' AND category = ?'
+            params.append(category)
+        query += ' ORDER BY opportunity_score DESC, id'
+        
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
     
     def get_top_opportunities(self, limit: int = 20) -> pd.DataFrame:
         """获取Top机会"""
         conn = sqlite3.connect(self.db_path)
         df = pd.read_sql_query(
-            f'SELECT * FROM opportunities ORDER BY opportunity_score DESC LIMIT {limit}',
+            f'SELECT * FROM opportunities WHERE meets_thresholds = 1 ORDER BY opportunity_score DESC LIMIT {limit}',
             conn
         )
         conn.close()
@@ -136,7 +256,7 @@ class DataManager:
         """获取所有机会"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM opportunities ORDER BY opportunity_score DESC')
+        cursor.execute('SELECT * FROM opportunities WHERE meets_thresholds = 1 ORDER BY opportunity_score DESC')
         
         columns = [description[0] for description in cursor.description]
         opportunities = [dict(zip(columns, row)) for row in cursor.fetchall()]
@@ -145,7 +265,7 @@ class DataManager:
         return opportunities
     
     def get_opportunity_by_id(self, app_id: str) -> Optional[Dict]:
-        """根据app_id获取机会"""
+        """根据app_id获取机会（包括不满足当前阈值的App，见meets_thresholds字段）"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         cursor.execute('SELECT * FROM opportunities WHERE app_id = ?', (str(app_id),))
@@ -168,13 +288,112 @@ class DataManager:
             data_json = json.dumps(item, ensure_ascii=False)
             
             cursor.execute('''
-                INSERT INTO raw_apps (app_id, data, source)
-                VALUES (?, ?, ?)
-            ''', (app_id, data_json, source))
+                INSERT INTO raw_apps (app_id, data, source, country)
+                VALUES (?, ?, ?, ?)
+            ''', (app_id, data_json, source, item.get('country')))
         
         conn.commit()
         conn.close()
     
+    def iter_raw_data(self, source: str = 'app_store', batch_size: int = 1000,
+                      start_id: Optional[int] = None, end_id: Optional[int] = None) -> Iterator[Dict]:
+        """
+        逐条读取原始数据（按批从数据库取出，内存占用与数据总量无关）
+        
+        Args:
+            source: 数据来源
+            batch_size: 每次从数据库取出的行数
+            start_id: 只读取 id >= start_id 的行（用于按id范围分区并行处理）
+            end_id: 只读取 id < end_id 的行
+        """
+        query = 'SELECT data FROM raw_apps WHERE source = ?'
+        params = [source]
+        if start_id is not None:
+            query += ' AND id >= ?'
+            params.append(start_id)
+        if end_id is not None:
+            query += ' AND id < ?'
+            params.append(end_id)
+        query += ' ORDER BY id'
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for (data_json,) in rows:
+                    try:
+                        yield json.loads(data_json)
+                    except (TypeError, ValueError):
+                        continue
+        finally:
+            conn.close()
+    
+    def get_raw_id_range(self, source: str = 'app_store') -> Tuple[Optional[int], Optional[int], int]:
+        """
+        原始数据的id范围
+        
+        Returns:
+            (最小id, 最大id, 行数)，没有数据时为 (None, None, 0)
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('SELECT MIN(id), MAX(id), COUNT(*) FROM raw_apps WHERE source = ?', (source,))
+        min_id, max_id, count = cursor.fetchone()
+        conn.close()
+        return min_id, max_id, count
+    
+    def get_fresh_raw_apps(self, app_ids: List, max_age_hours: float, source: str = 'app_store',
+                           country: Optional[str] = None) -> Dict[str, Dict]:
+        """
+        获取仍然新鲜的原始App数据
+        
+        Args:
+            app_ids: App ID列表
+            max_age_hours: 最大数据年龄（小时），早于该时间采集的数据视为过期
+            source: 数据来源
+            country: 国家代码，只返回该国家商店的数据（未记录国家的旧数据视为us）
+            
+        Returns:
+            {app_id(字符串): 最近一次采集的App数据}，只包含未过期的App
+        """
+        fresh = {}
+        if not app_ids:
+            return fresh
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        ids = [str(app_id) for app_id in app_ids]
+        # SQLite单条语句的参数数量有限，分批查询
+        chunk_size = 500
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            params = [source, *chunk, f'-{float(max_age_hours)} hours']
+            country_filter = ''
+            if country:
+                country_filter = "AND COALESCE(country, 'us') = ?"
+                params.append(country.lower())
+            # MAX(created_at)配合GROUP BY时，data取自同一行（即最近一次采集）
+            cursor.execute(f'''
+                SELECT app_id, data, MAX(created_at) FROM raw_apps
+                WHERE source = ? AND app_id IN ({placeholders})
+                  AND created_at >= datetime('now', ?) {country_filter}
+                GROUP BY app_id
+            ''', params)
+            for app_id, data_json, _ in cursor.fetchall():
+                try:
+                    fresh[str(app_id)] = json.loads(data_json)
+                except (TypeError, ValueError):
+                    continue
+        
+        conn.close()
+        return fresh
+    
     def save_trend_data(self, keyword: str, platform: str, date: str, value: float, metadata: Optional[Dict] = None):
         """保存趋势数据"""
         conn = sqlite3.connect(self.db_path)
@@ -196,22 +415,57 @@ class DataManager:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        for trend in trends:
-            metadata_json = json.dumps(trend.get('metadata'), ensure_ascii=False) if trend.get('metadata') else None
-            cursor.execute('''
-                INSERT OR REPLACE INTO search_trends 
-                (keyword, platform, date, value, metadata)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                trend.get('keyword'),
-                trend.get('platform'),
-                trend.get('date'),
-                trend.get('value'),
-                metadata_json
-            ))
+        cursor.executemany('''
+            INSERT OR REPLACE INTO search_trends 
+            (keyword, platform, date, value, metadata)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(
+            trend.get('keyword'),
+            trend.get('platform'),
+            trend.get('date'),
+            trend.get('value'),
+            json.dumps(trend.get('metadata'), ensure_ascii=False) if trend.get('metadata') else None
+        ) for trend in trends])
+        
+        conn.commit()
+        conn.close()
+    
+    def save_trend_series(self, platform: str, dates: Sequence[str], values: Dict[str, Sequence[float]],
+                          metadata: Optional[Dict] = None) -> int:
+        """
+        批量保存列式趋势数据（只保存大于0的值）
+        
+        Args:
+            platform: 平台
+            dates: 日期列表
+            values: {关键词: 与dates等长的数值序列}
+            metadata: 所有记录共用的元数据
+        
+        Returns:
+            保存的记录数
+        """
+        dates = np.asarray(dates, dtype=object)
+        metadata_json = json.dumps(metadata, ensure_ascii=False) if metadata else None
+        
+        rows = []
+        for keyword, series in values.items():
+            series = np.asarray(series, dtype=float)
+            # NaN与0一样不保存
+            mask = series > 0
+            rows.extend(zip(repeat(keyword), repeat(platform), dates[mask].tolist(),
+                            series[mask].tolist(), repeat(metadata_json)))
+        if not rows:
+            return 0
         
+        conn = sqlite3.connect(self.db_path)
+        conn.executemany('''
+            INSERT OR REPLACE INTO search_trends 
+            (keyword, platform, date, value, metadata)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
         conn.commit()
         conn.close()
+        return len(rows)
     
     def get_trend_data(self, keyword: str = None, platform: str = None, 
                       start_date: str = None, end_date: str = None) -> pd.DataFrame:
@@ -249,6 +503,37 @@ class DataManager:
         conn.close()
         return keywords
     
+    def get_latest_trend_dates(self, keywords: List[str], platform: str) -> Dict[str, str]:
+        """
+        获取每个关键词最新的趋势数据日期
+        
+        Returns:
+            {关键词: 最新日期}，没有数据的关键词不包含在内
+        """
+        latest = {}
+        if not keywords:
+            return latest
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        # SQLite单条语句的参数数量有限，分批查询
+        chunk_size = 500
+        for i in range(0, len(keywords), chunk_size):
+            chunk = list(keywords[i:i + chunk_size])
+            placeholders = ','.join('?' * len(chunk))
+            cursor.execute(f'''
+                SELECT keyword, MAX(date) FROM search_trends
+                WHERE platform = ? AND keyword IN ({placeholders})
+                GROUP BY keyword
+            ''', [platform, *chunk])
+            for keyword, date in cursor.fetchall():
+                if date:
+                    latest[keyword] = date
+        
+        conn.close()
+        return latest
+    
     def save_trend_task(self, task_id: str, keywords: List[str], platforms: List[str], 
                        timeframe: str, status: str = 'pending', progress: Dict = None,
                        results: Dict = None, error: str = None):
@@ -0,0 +1,337 @@
+"""
+HTTP响应缓存
+所有爬虫共享的磁盘缓存：按请求内容寻址，支持按数据源设置TTL、
+按容量LRU淘汰，以及在上游支持时使用ETag/Last-Modified做条件请求重新验证
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import requests
+
+from utils.http_client import get_http_client
+
+# 获取项目根目录
+# __file__ = backend/src/utils/http_cache.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+# 各数据源的默认缓存时间（秒）
+DEFAULT_TTLS = {
+    'app_store_search': 6 * 3600,
+    'app_store_lookup': 24 * 3600,
+    'google_trends': 12 * 3600,
+    'product_hunt': 3600,
+    'default': 3600,
+}
+
+# 默认缓存容量上限（字节）
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class CachedResponse:
+    """
+    缓存或网络返回的响应（只保留爬虫需要的部分）
+
+    from_cache为True时内容来自缓存；其中revalidated为True表示发送了条件请求、
+    上游返回304，这次仍然访问了网络（需要反馈给限速器）
+    """
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict] = None,
+                 from_cache: bool = False, revalidated: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+        self.revalidated = revalidated
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            # 带上response，调用方（如采集运行时）可以读取状态码和Retry-After
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class ResponseCache:
+    """磁盘响应缓存"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            cache_dir: 缓存目录，默认 data/cache/http
+            max_bytes: 缓存容量上限，超出后按最近访问时间淘汰
+            ttls: 各数据源的缓存时间（秒），覆盖DEFAULT_TTLS中的同名配置
+        """
+        if cache_dir is None:
+            self.cache_dir = PROJECT_ROOT / "data" / "cache" / "http"
+        else:
+            self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.cache_dir / "index.db"
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._init_index()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def _init_index(self):
+        """初始化缓存索引表"""
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                source TEXT,
+                url TEXT,
+                status INTEGER,
+                headers TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_access REAL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)')
+        conn.commit()
+        conn.close()
+
+    # ---------- 键与文件 ----------
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """根据请求内容生成缓存键（sha256）"""
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _body_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def ttl_for(self, source: str) -> int:
+        return self.ttls.get(source, self.ttls['default'])
+
+    # ---------- 统计 ----------
+
+    def _count(self, source: str, field: str):
+        with self._lock:
+            counters = self._stats.setdefault(
+                source, {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0})
+            counters[field] += 1
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            各数据源的命中/未命中/重新验证次数与命中率，以及缓存条目数和占用空间
+        """
+        with self._lock:
+            sources = {name: dict(counters) for name, counters in self._stats.items()}
+        for counters in sources.values():
+            lookups = counters['hits'] + counters['revalidated'] + counters['misses']
+            counters['hit_rate'] = round((counters['hits'] + counters['revalidated']) / lookups, 3) if lookups else 0.0
+
+        conn = self._connect()
+        entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        conn.close()
+
+        total_hits = sum(c['hits'] + c['revalidated'] for c in sources.values())
+        total_lookups = total_hits + sum(c['misses'] for c in sources.values())
+        return {
+            'entries': entries,
+            'size_bytes': size,
+            'max_bytes': self.max_bytes,
+            'hit_rate': round(total_hits / total_lookups, 3) if total_lookups else 0.0,
+            'sources': sources,
+        }
+
+    # ---------- 读写 ----------
+
+    def _get_entry(self, key: str) -> Optional[Dict]:
+        conn = self._connect()
+        cursor = conn.execute('SELECT * FROM entries WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        columns = [description[0] for description in cursor.description]
+        conn.close()
+        if not row:
+            return None
+        entry = dict(zip(columns, row))
+        try:
+            entry['content'] = self._body_path(key).read_bytes()
+        except OSError:
+            # 索引存在但文件丢失，视为未缓存
+            return None
+        entry['headers'] = json.loads(entry['headers']) if entry['headers'] else {}
+        return entry
+
+    def _touch(self, key: str, refresh: bool = False):
+        """更新最近访问时间；refresh=True时同时重置缓存创建时间（重新验证成功）"""
+        now = time.time()
+        conn = self._connect()
+        if refresh:
+            conn.execute('UPDATE entries SET last_access = ?, created_at = ? WHERE key = ?', (now, now, key))
+        else:
+            conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+        conn.commit()
+        conn.close()
+
+    def store(self, key: str, source: str, content: bytes, url: str = '', status: int = 200,
+              headers: Optional[Dict] = None):
+        """写入缓存条目"""
+        headers = headers or {}
+        body_path = self._body_path(key)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        # 先写临时文件再替换，避免并发读到半个文件
+        tmp_path = body_path.with_suffix(f'.{threading.get_ident()}.tmp')
+        tmp_path.write_bytes(content)
+        tmp_path.replace(body_path)
+
+        now = time.time()
+        conn = self._connect()
+        conn.execute('''
+            INSERT OR REPLACE INTO entries
+            (key, source, url, status, headers, etag, last_modified, size, created_at, last_access)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            key, source, url, status,
+            json.dumps(headers, ensure_ascii=False),
+            headers.get('ETag'), headers.get('Last-Modified'),
+            len(content), now, now
+        ))
+        conn.commit()
+        conn.close()
+        self._count(source, 'stores')
+        self._evict()
+
+    def lookup(self, key: str, source: str) -> Optional[bytes]:
+        """
+        读取未过期的缓存内容（用于非HTTP结果的缓存，如pytrends返回的数据）
+
+        Returns:
+            缓存内容，不存在或已过期时返回None
+        """
+        entry = self._get_entry(key)
+        if entry and time.time() - entry['created_at'] < self.ttl_for(source):
+            self._touch(key)
+            self._count(source, 'hits')
+            return entry['content']
+        self._count(source, 'misses')
+        return None
+
+    def _evict(self):
+        """超出容量时按最近访问时间淘汰，淘汰到容量的90%"""
+        conn = self._connect()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            conn.close()
+            return
+
+        target = self.max_bytes * 0.9
+        evicted = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access ASC'):
+            if total <= target:
+                break
+            evicted.append(key)
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in evicted])
+        conn.commit()
+        conn.close()
+
+        for key in evicted:
+            try:
+                self._body_path(key).unlink()
+            except OSError:
+                pass
+
+    # ---------- HTTP ----------
+
+    def fetch(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+              source: str = 'default', session=None, timeout: Optional[float] = None,
+              before_request: Optional[Callable[[], None]] = None) -> CachedResponse:
+        """
+        带缓存的GET请求
+
+        未过期的缓存直接返回；过期但有ETag/Last-Modified时发送条件请求，
+        上游返回304则继续使用缓存；否则重新请求并缓存200响应。
+
+        Args:
+            url: 请求地址
+            params: 查询参数
+            headers: 请求头（参与缓存键计算，如App Store的Store-Front）
+            source: 数据源名称，决定TTL并用于统计
+            session: requests.Session，默认使用共享HTTP客户端的连接池
+            timeout: 超时时间（秒），默认使用共享HTTP客户端的超时设置
+            before_request: 真正发出网络请求前的回调（如限速器的acquire），命中缓存时不调用
+
+        Returns:
+            CachedResponse
+        """
+        key = self.make_key('GET', url, params or {}, headers or {})
+        entry = self._get_entry(key)
+
+        if entry and time.time() - entry['created_at'] < self.ttl_for(source):
+            self._touch(key)
+            self._count(source, 'hits')
+            return CachedResponse(entry['status'], entry['content'], entry['headers'], from_cache=True)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry['etag']:
+                request_headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        if before_request:
+            before_request()
+        if session is None:
+            http = get_http_client()
+            session = http.session
+            timeout = timeout or http.timeout
+        response = session.get(url, params=params, headers=request_headers, timeout=timeout or 30)
+
+        if response.status_code == 304 and entry:
+            self._touch(key, refresh=True)
+            self._count(source, 'revalidated')
+            return CachedResponse(entry['status'], entry['content'], entry['headers'], from_cache=True,
+                                  revalidated=True)
+
+        self._count(source, 'misses')
+        response_headers = {
+            name: response.headers[name]
+            for name in ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After')
+            if name in response.headers
+        }
+        if response.status_code == 200:
+            self.store(key, source, response.content, url=url, status=200, headers=response_headers)
+        return CachedResponse(response.status_code, response.content, response_headers)
+
+
+# 进程内共享的缓存实例
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """获取进程内共享的响应缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
@@ -0,0 +1,174 @@
+"""
+共享HTTP客户端
+所有爬虫共用的 requests.Session：按host维护连接池并保持keep-alive，
+避免每个请求重新建立TCP连接和TLS握手；统一超时设置，并统计连接复用情况
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.http_replay import FixtureRecorder, ReplaySession, record_dir_from_env, replay_base_from_env
+
+
+# 获取项目根目录
+# __file__ = backend/src/utils/http_client.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+CONFIG_PATH = PROJECT_ROOT / "backend" / "config" / "config.yaml"
+
+# 默认配置（可在config.yaml的 http 节中覆盖）
+DEFAULT_HTTP_CONFIG = {
+    'pool_connections': 32,     # 最多保留多少个host的连接池
+    'pool_maxsize': 10,         # 每个host的连接池大小（并发连接数）
+    'connect_timeout': 5,       # 建立连接超时（秒）
+    'read_timeout': 30,         # 读取响应超时（秒）
+    'host_pool_sizes': {},      # 单独指定某些host的连接池大小，如 {'itunes.apple.com': 16}
+}
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def load_http_config() -> Dict:
+    """读取config.yaml中的 http 配置，读取失败时使用默认配置"""
+    config = dict(DEFAULT_HTTP_CONFIG)
+    try:
+        import yaml
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config.update((yaml.safe_load(f) or {}).get('http') or {})
+    except Exception as e:
+        print(f"读取HTTP配置失败，使用默认配置: {e}")
+    return config
+
+
+class HTTPClient:
+    """
+    共享HTTP客户端
+
+    requests.Session 的 HTTPAdapter 为每个host维护一个urllib3连接池，
+    同一个host的请求复用已建立的连接（keep-alive）。
+    """
+
+    def __init__(self, pool_connections: int = 32, pool_maxsize: int = 10,
+                 connect_timeout: float = 5, read_timeout: float = 30,
+                 host_pool_sizes: Optional[Dict[str, int]] = None,
+                 user_agent: str = DEFAULT_USER_AGENT, record_dir: Optional[str] = None,
+                 replay_url: Optional[str] = None):
+        """
+        Args:
+            pool_connections: 最多保留多少个host的连接池（超出后最久未用的连接池被关闭）
+            pool_maxsize: 每个host的连接池大小，应不小于访问该host的并发线程数
+            connect_timeout: 建立连接超时（秒）
+            read_timeout: 读取响应超时（秒）
+            host_pool_sizes: 单独指定某些host的连接池大小
+            user_agent: 默认User-Agent
+            record_dir: 录制模式：把收到的响应保存为fixture到该目录
+            replay_url: 回放模式：所有请求改发到该回放服务器（见 backend/scripts/replay_server.py）
+        """
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.replay_url = replay_url
+        self.session = ReplaySession(replay_url) if replay_url else requests.Session()
+        self.session.headers.update({'User-Agent': user_agent})
+        self.recorder = None
+        if record_dir:
+            self.recorder = FixtureRecorder(record_dir)
+            self.session.hooks['response'].append(self.recorder)
+
+        self._adapters = []
+        default_adapter = self._make_adapter(pool_connections, pool_maxsize)
+        self.session.mount('https://', default_adapter)
+        self.session.mount('http://', default_adapter)
+        for host, size in (host_pool_sizes or {}).items():
+            adapter = self._make_adapter(pool_connections, size)
+            self.session.mount(f'https://{host}', adapter)
+            self.session.mount(f'http://{host}', adapter)
+
+    def _make_adapter(self, pool_connections: int, pool_maxsize: int) -> HTTPAdapter:
+        # pool_block=False：连接池满时临时新建连接而不是阻塞等待
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._adapters.append(adapter)
+        return adapter
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送请求（未指定timeout时使用默认超时）"""
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def stats(self) -> Dict:
+        """
+        获取连接复用统计
+
+        Returns:
+            各host的请求数、新建连接数、复用次数，以及整体复用率。
+            只统计仍保留在连接池中的host（超过pool_connections被关闭的连接池不计）
+        """
+        hosts = {}
+        for adapter in self._adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                name = f"{pool.scheme}://{pool.host}"
+                counters = hosts.setdefault(name, {'requests': 0, 'connections': 0})
+                counters['requests'] += pool.num_requests
+                counters['connections'] += pool.num_connections
+
+        for counters in hosts.values():
+            counters['reused'] = max(0, counters['requests'] - counters['connections'])
+            counters['reuse_rate'] = round(counters['reused'] / counters['requests'], 3) if counters['requests'] else 0.0
+
+        total_requests = sum(c['requests'] for c in hosts.values())
+        total_reused = sum(c['reused'] for c in hosts.values())
+        return {
+            'requests': total_requests,
+            'connections': sum(c['connections'] for c in hosts.values()),
+            'reuse_rate': round(total_reused / total_requests, 3) if total_requests else 0.0,
+            'hosts': hosts,
+            'replay_url': self.replay_url,
+            'recorded': self.recorder.count if self.recorder else 0,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+# 进程内共享的客户端实例
+_client: Optional[HTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """
+    获取进程内共享的HTTP客户端
+
+    按config.yaml的 http 配置创建；环境变量 FERRET_HTTP_RECORD / FERRET_HTTP_REPLAY
+    分别启用录制模式和回放模式
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            config = load_http_config()
+            _client = HTTPClient(
+                pool_connections=config['pool_connections'],
+                pool_maxsize=config['pool_maxsize'],
+                connect_timeout=config['connect_timeout'],
+                read_timeout=config['read_timeout'],
+                host_pool_sizes=config['host_pool_sizes'],
+                record_dir=record_dir_from_env(),
+                replay_url=replay_base_from_env(),
+            )
+            if _client.replay_url:
+                print(f"HTTP回放模式: 所有请求改发到 {_client.replay_url}")
+            if _client.recorder:
+                print(f"HTTP录制模式: 响应保存到 {_client.recorder.fixture_dir}")
+        return _client
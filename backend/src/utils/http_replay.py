@@ -0,0 +1,164 @@
+"""
+HTTP录制/回放
+录制模式把爬虫收到的真实响应保存为fixture文件；回放模式把爬虫请求改写到
+本地回放服务器（backend/scripts/replay_server.py），离线复现上游响应，
+用于在没有网络的情况下对并发和限速改动做可重复的性能测试。
+
+通过环境变量启用（共享HTTP客户端创建时读取）：
+- FERRET_HTTP_RECORD=<目录>：录制响应到该目录
+- FERRET_HTTP_REPLAY=http://127.0.0.1:8765：所有请求改发到回放服务器
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+
+
+# 获取项目根目录
+# __file__ = backend/src/utils/http_replay.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+DEFAULT_FIXTURE_DIR = PROJECT_ROOT / "data" / "fixtures" / "http"
+
+RECORD_ENV = 'FERRET_HTTP_RECORD'
+REPLAY_ENV = 'FERRET_HTTP_REPLAY'
+
+# 录制时保留的响应头
+RECORDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Set-Cookie')
+
+
+# 决定响应内容的请求头（参与fixture键计算）：App Store按X-Apple-Store-Front选择国家商店，
+# URL相同但商店不同的请求必须分别录制
+KEY_HEADERS = ('X-Apple-Store-Front',)
+
+
+def fixture_key(method: str, url: str, headers: Optional[Mapping[str, str]] = None) -> str:
+    """
+    请求 -> fixture键（方法 + 完整URL含查询参数 + KEY_HEADERS中的请求头）
+
+    没有KEY_HEADERS中的请求头时只用方法和URL，与之前录制的fixture兼容
+    """
+    raw = f"{method.upper()} {url}"
+    if headers:
+        lowered = {name.lower(): value for name, value in headers.items()}
+        for name in KEY_HEADERS:
+            value = lowered.get(name.lower())
+            if value is not None:
+                raw += f"\n{name}: {value}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def fixture_path(fixture_dir: Union[str, Path], method: str, url: str,
+                 headers: Optional[Mapping[str, str]] = None) -> Path:
+    """fixture文件路径：<目录>/<host>/<键>.json"""
+    host = urlsplit(url).hostname or 'unknown'
+    return Path(fixture_dir) / host / f"{fixture_key(method, url, headers)}.json"
+
+
+def load_fixture(fixture_dir: Union[str, Path], method: str, url: str,
+                 headers: Optional[Mapping[str, str]] = None) -> Optional[Dict]:
+    """
+    读取录制的响应
+
+    Args:
+        headers: 请求头（回放服务器收到的请求头，取其中的KEY_HEADERS）
+
+    Returns:
+        {'status', 'headers', 'content'(bytes)}，没有录制时返回None
+    """
+    path = fixture_path(fixture_dir, method, url, headers)
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        fixture = json.load(f)
+    fixture['content'] = base64.b64decode(fixture.pop('body_base64', ''))
+    return fixture
+
+
+def rewrite_url(url: str, replay_base: str) -> str:
+    """
+    原始URL -> 回放服务器URL
+
+    https://itunes.apple.com/lookup?id=1 -> http://127.0.0.1:8765/https/itunes.apple.com/lookup?id=1
+    """
+    parts = urlsplit(url)
+    rewritten = f"{replay_base.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path or '/'}"
+    if parts.query:
+        rewritten += f"?{parts.query}"
+    return rewritten
+
+
+def original_url(replay_path: str) -> Optional[str]:
+    """回放服务器收到的路径 -> 原始URL（rewrite_url的逆运算），格式不对时返回None"""
+    segments = replay_path.lstrip('/').split('/', 2)
+    if len(segments) < 2 or segments[0] not in ('http', 'https'):
+        return None
+    scheme, netloc = segments[0], segments[1]
+    rest = segments[2] if len(segments) > 2 else ''
+    return f"{scheme}://{netloc}/{rest}"
+
+
+class FixtureRecorder:
+    """
+    录制响应的requests钩子
+
+    挂到Session的 response 钩子上，每个响应保存为一个JSON fixture
+    （同一个请求重复录制时覆盖为最新响应）。
+    """
+
+    def __init__(self, fixture_dir: Union[str, Path, None] = None):
+        self.fixture_dir = Path(fixture_dir) if fixture_dir else DEFAULT_FIXTURE_DIR
+        self.fixture_dir.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, response: requests.Response, *args, **kwargs):
+        request = response.request
+        # 读取完整内容；流式响应读取后用内存中的副本替换raw，调用方仍可按流读取
+        content = response.content
+        if kwargs.get('stream'):
+            response.raw = io.BytesIO(content)
+
+        fixture = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'body_base64': base64.b64encode(content).decode('ascii'),
+        }
+        path = fixture_path(self.fixture_dir, request.method, request.url, request.headers)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False)
+        tmp_path.replace(path)
+        with self._lock:
+            self.count += 1
+        return response
+
+
+class ReplaySession(requests.Session):
+    """把所有请求改写到回放服务器的Session"""
+
+    def __init__(self, replay_base: str):
+        super().__init__()
+        self.replay_base = replay_base
+
+    def request(self, method, url, *args, **kwargs):
+        return super().request(method, rewrite_url(url, self.replay_base), *args, **kwargs)
+
+
+def replay_base_from_env() -> Optional[str]:
+    return os.environ.get(REPLAY_ENV) or None
+
+
+def record_dir_from_env() -> Optional[str]:
+    return os.environ.get(RECORD_ENV) or None
@@ -0,0 +1,272 @@
+"""
+请求限速器
+多个线程/多个采集任务共享同一个上游的请求速率限制，替代固定的 time.sleep
+
+AdaptiveRateLimiter 按上游（host）自适应调整请求间隔（AIMD）：
+请求成功时加性提高速率，遇到 429/403/503 时成倍降低速率。
+限速状态保存在SQLite（data/ratelimit.db）中，同一台机器上的多个线程和
+多个工作进程共享同一个上游的速率预算。
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+
+# 获取项目根目录
+# __file__ = backend/src/utils/rate_limiter.py
+# parent.parent.parent.parent = 项目根目录
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+
+# 表示被上游限流/封禁的状态码
+THROTTLE_STATUS_CODES = (403, 429, 503)
+
+# 限速状态超过该时间（秒）未更新时恢复为初始间隔，避免很久以前的限流影响新任务
+STATE_RESET_AFTER = 3600
+
+
+class AdaptiveRateLimiter:
+    """
+    跨进程共享的AIMD自适应限速器
+
+    - acquire()：在SQLite事务中预约下一个请求时间点，所有进程按同一个间隔排队
+    - on_success()：速率加性增加 increase 次/秒（间隔不小于 min_interval）；
+      成功次数先在进程内累计，随下一次acquire/on_throttle在同一个事务中写入
+    - on_throttle()：间隔乘以 1 / decrease（不超过 max_interval），每个间隔内最多降速一次
+      （并发请求同时收到的多个429只算一次拥塞），有 Retry-After 时在此之前不再发出请求
+    """
+
+    def __init__(self, name: str, interval: float = 1.0, min_interval: Optional[float] = None,
+                 max_interval: float = 60.0, increase: float = 0.05, decrease: float = 0.5,
+                 db_path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            name: 上游名称，如 'itunes.apple.com'，同名的限速器共享状态
+            interval: 初始请求间隔（秒）
+            min_interval: 最小请求间隔（秒），默认为初始间隔的1/4
+            max_interval: 最大请求间隔（秒）
+            increase: 每次成功后速率增加量（次/秒）
+            decrease: 被限流后速率乘以的系数（0~1）
+            db_path: 状态数据库路径，默认 data/ratelimit.db
+        """
+        self.name = name
+        self.initial_interval = max(0.0, interval)
+        self.min_interval = self.initial_interval / 4 if min_interval is None else max(0.0, min_interval)
+        self.max_interval = max(max_interval, self.initial_interval)
+        self.increase = increase
+        self.decrease = decrease
+
+        if db_path is None:
+            self.db_path = PROJECT_ROOT / "data" / "ratelimit.db"
+        else:
+            self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # 每个线程复用一个连接（sqlite3连接不能跨线程使用）
+        self._local = threading.local()
+        # 尚未写入数据库的成功次数
+        self._pending_successes = 0
+        self._pending_lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None：手动用 BEGIN IMMEDIATE 控制事务，保证读-改-写在进程间互斥
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        """初始化限速状态表"""
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                name TEXT PRIMARY KEY,
+                interval REAL,
+                next_slot REAL,
+                successes INTEGER DEFAULT 0,
+                throttles INTEGER DEFAULT 0,
+                last_throttle REAL DEFAULT 0,
+                updated_at REAL
+            )
+        ''')
+        # 兼容旧版本的状态表
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(rate_limits)')}
+        if 'last_throttle' not in columns:
+            conn.execute('ALTER TABLE rate_limits ADD COLUMN last_throttle REAL DEFAULT 0')
+
+    def _take_successes(self) -> int:
+        with self._pending_lock:
+            successes, self._pending_successes = self._pending_successes, 0
+        return successes
+
+    def _update(self, func):
+        """
+        在写事务中读取并更新本上游的状态（同时写入累计的成功次数）
+
+        Args:
+            func: 接收 (interval, next_slot, last_throttle, now)，
+                  返回新的 (interval, next_slot, last_throttle, 结果, 限流计数增量)
+        """
+        successes = self._take_successes()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute('''
+                SELECT interval, next_slot, last_throttle, updated_at FROM rate_limits WHERE name = ?
+            ''', (self.name,)).fetchone()
+            if row is None or now - row[3] > STATE_RESET_AFTER:
+                interval, next_slot, last_throttle = self.initial_interval, 0.0, 0.0
+            else:
+                interval, next_slot, last_throttle = row[0], row[1], row[2] or 0.0
+
+            if successes:
+                # 加性增加：每次成功速率增加 increase 次/秒
+                rate = 1.0 / interval if interval > 0 else float('inf')
+                interval = max(self.min_interval, 1.0 / (rate + self.increase * successes))
+
+            interval, next_slot, last_throttle, result, throttles = func(interval, next_slot, last_throttle, now)
+            conn.execute('''
+                INSERT INTO rate_limits (name, interval, next_slot, successes, throttles, last_throttle, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET interval = excluded.interval,
+                    next_slot = excluded.next_slot,
+                    successes = successes + excluded.successes,
+                    throttles = throttles + excluded.throttles,
+                    last_throttle = excluded.last_throttle,
+                    updated_at = excluded.updated_at
+            ''', (self.name, interval, next_slot, successes, throttles, last_throttle, now))
+            conn.execute('COMMIT')
+            return result
+        except Exception:
+            conn.execute('ROLLBACK')
+            # 写入失败时保留成功次数，下次再写
+            with self._pending_lock:
+                self._pending_successes += successes
+            raise
+
+    def acquire(self):
+        """阻塞直到允许发出下一个请求"""
+        def reserve(interval, next_slot, last_throttle, now):
+            slot = max(now, next_slot)
+            return interval, slot + interval, last_throttle, slot, 0
+
+        slot = self._update(reserve)
+        wait = slot - time.time()
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        """请求成功：加性提高速率（随下一次acquire写入，每个请求只需一个写事务）"""
+        with self._pending_lock:
+            self._pending_successes += 1
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        """
+        被上游限流：成倍降低速率
+
+        距上次降速不足一个间隔时只记录限流次数和Retry-After，不再次降速
+        （这些响应对应的请求是在上次降速之前发出的）。
+
+        Args:
+            retry_after: 上游要求的等待时间（秒），来自 Retry-After 响应头
+        """
+        def back_off(interval, next_slot, last_throttle, now):
+            decreased = now - last_throttle >= interval
+            if decreased:
+                interval = min(self.max_interval, max(interval, self.min_interval, 0.1) / self.decrease)
+                last_throttle = now
+            pause = retry_after if retry_after is not None else interval
+            return interval, max(next_slot, now + pause), last_throttle, (decreased, interval), 1
+
+        decreased, interval = self._update(back_off)
+        if decreased:
+            print(f"上游 {self.name} 限流，请求间隔调整为 {interval:.2f} 秒")
+
+    def report(self, status_code: int, retry_after=None) -> bool:
+        """
+        根据响应状态码调整速率
+
+        Args:
+            status_code: HTTP状态码
+            retry_after: Retry-After 响应头（秒数）
+
+        Returns:
+            是否被限流（调用方可以据此决定是否重试）
+        """
+        if status_code in THROTTLE_STATUS_CODES:
+            self.on_throttle(parse_retry_after(retry_after))
+            return True
+        if status_code < 400:
+            self.on_success()
+        return False
+
+    @property
+    def interval(self) -> float:
+        """当前请求间隔（秒，不含尚未写入的成功次数）"""
+        row = self._connect().execute('SELECT interval FROM rate_limits WHERE name = ?',
+                                      (self.name,)).fetchone()
+        return row[0] if row else self.initial_interval
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """解析 Retry-After 响应头（只支持秒数格式，HTTP日期格式返回None）"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def list_rate_limits(db_path: Optional[Union[str, Path]] = None) -> List[Dict]:
+    """
+    获取所有上游的当前限速状态
+
+    Returns:
+        [{'name', 'interval', 'requests_per_second', 'successes', 'throttles', 'updated_at'}]
+    """
+    db_path = Path(db_path) if db_path else PROJECT_ROOT / "data" / "ratelimit.db"
+    if not db_path.exists():
+        return []
+    conn = sqlite3.connect(db_path, timeout=30)
+    rows = conn.execute('''
+        SELECT name, interval, successes, throttles, updated_at FROM rate_limits ORDER BY name
+    ''').fetchall()
+    conn.close()
+    return [{
+        'name': name,
+        'interval': round(interval, 3),
+        'requests_per_second': round(1.0 / interval, 3) if interval > 0 else None,
+        'successes': successes,
+        'throttles': throttles,
+        'updated_at': updated_at,
+    } for name, interval, successes, throttles, updated_at in rows]
+
+
+# 进程内按名称共享的限速器（同一个上游只有一个限速器）
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(name: str, interval: float = 1.0, **kwargs) -> AdaptiveRateLimiter:
+    """
+    获取指定上游的共享限速器
+
+    Args:
+        name: 上游名称，如 'itunes.apple.com'
+        interval: 首次创建时使用的初始请求间隔（秒）
+        **kwargs: 其他AdaptiveRateLimiter参数（min_interval、max_interval等）
+
+    Returns:
+        该上游的共享限速器（状态在进程间共享）
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = AdaptiveRateLimiter(name, interval, **kwargs)
+            _limiters[name] = limiter
+        return limiter
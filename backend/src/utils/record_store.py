@@ -0,0 +1,164 @@
+"""
+原始数据记录存储
+以NDJSON（每行一条JSON）流式写入和读取原始数据，支持gzip/zstd压缩。
+记录到达时立即追加写入，不需要先在内存中攒齐整个结果列表
+"""
+
+import gzip
+import io
+import json
+import threading
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Union
+
+# zstd压缩（可选，需要zstandard库）
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# 压缩方式 -> 文件后缀
+COMPRESSION_SUFFIXES = {
+    None: '',
+    'gzip': '.gz',
+    'zstd': '.zst',
+}
+
+# 可识别的NDJSON文件后缀
+NDJSON_SUFFIXES = ('.ndjson', '.jsonl')
+
+# 压缩流被截断（写入进程被杀掉、文件未关闭）时读取抛出的异常
+TRUNCATED_STREAM_ERRORS = (EOFError, zlib.error) + ((zstandard.ZstdError,) if HAS_ZSTD else ())
+
+
+def ndjson_filename(stem: str, compression: Optional[str] = None) -> str:
+    """
+    生成NDJSON文件名
+
+    Args:
+        stem: 文件名（不含后缀）
+        compression: 压缩方式：None、'gzip'、'zstd'
+
+    Returns:
+        如 app_store_20240101_120000.ndjson.gz
+    """
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"不支持的压缩方式: {compression}")
+    return f"{stem}.ndjson{COMPRESSION_SUFFIXES[compression]}"
+
+
+def is_ndjson_file(path: Union[str, Path]) -> bool:
+    """判断文件是否为NDJSON格式（可带压缩后缀）"""
+    suffixes = Path(path).suffixes
+    if suffixes and suffixes[-1] in ('.gz', '.zst'):
+        suffixes = suffixes[:-1]
+    return bool(suffixes) and suffixes[-1] in NDJSON_SUFFIXES
+
+
+def _compression_for(path: Path) -> Optional[str]:
+    """根据文件后缀判断压缩方式"""
+    if path.suffix == '.gz':
+        return 'gzip'
+    if path.suffix == '.zst':
+        return 'zstd'
+    return None
+
+
+def _open_text(path: Path, mode: str, compression: Optional[str]):
+    """按压缩方式打开文本流（mode为'w'、'a'或'r'）"""
+    if compression == 'gzip':
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    if compression == 'zstd':
+        if not HAS_ZSTD:
+            raise RuntimeError("zstd压缩需要安装zstandard: pip install zstandard")
+        if mode == 'r':
+            raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        else:
+            # zstd帧可以直接拼接，追加模式下新写入的帧解压时会被依次读出
+            raw = zstandard.ZstdCompressor().stream_writer(open(path, mode + 'b'), closefd=True)
+        return io.TextIOWrapper(raw, encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+class NDJSONWriter:
+    """
+    NDJSON流式写入器
+
+    每条记录写成一行JSON，记录到达时立即写入，内存占用与记录总数无关。
+    线程安全，可以在并发采集的回调中直接调用write()。
+    """
+
+    def __init__(self, path: Union[str, Path], append: bool = False, flush_every: int = 0):
+        """
+        Args:
+            path: 文件路径，压缩方式由后缀决定（.gz为gzip，.zst为zstd）
+            append: 是否追加到已有文件
+            flush_every: 每写入多少条记录刷一次磁盘（0表示不主动刷新）；
+                         进程崩溃时压缩文件最多丢失最近flush_every条记录
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = max(0, flush_every)
+        self.count = 0
+        self._lock = threading.Lock()
+        self._file = _open_text(self.path, 'a' if append else 'w', _compression_for(self.path))
+
+    def write(self, record: Dict):
+        """写入一条记录"""
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line)
+            self._file.write('\n')
+            self.count += 1
+            if self.flush_every and self.count % self.flush_every == 0:
+                self._file.flush()
+
+    def write_many(self, records: Iterable[Dict]):
+        """写入多条记录"""
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        """把已写入的记录刷到磁盘"""
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_ndjson(path: Union[str, Path]) -> Iterator[Dict]:
+    """
+    流式读取NDJSON文件（自动识别gzip/zstd压缩）
+
+    Args:
+        path: 文件路径
+
+    Yields:
+        每行一条记录；空行和被截断的最后一行（写入中断）会被跳过。
+        压缩文件没有正常关闭（写入进程崩溃）时，读到截断处为止
+    """
+    path = Path(path)
+    with _open_text(path, 'r', _compression_for(path)) as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    print(f"跳过无法解析的记录行: {path}")
+                    continue
+        except TRUNCATED_STREAM_ERRORS as e:
+            print(f"警告: 压缩文件不完整（写入未正常结束），已读取到截断处: {path} ({e})")
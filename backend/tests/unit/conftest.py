@@ -0,0 +1,59 @@
+"""
+单元测试公共配置：添加backend/src到路径，提供随机App数据
+"""
+
+import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+# 添加backend/src到路径
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
+sys.path.insert(0, str(BACKEND_SRC))
+
+# 各评分维度的分档边界及两侧的值
+REVIEW_COUNTS = [None, 0, 9, 10, 11, 99, 100, 101, 999, 1000, 1001, 9999, 10000, 10001, 250000]
+RATINGS = [None, 0, 1.0, 3.99, 4.0, 4.2, 4.5, 4.51, 4.6, 4.7, 4.71, 4.8, 4.81, 5.0]
+PRICES = [None, 0, 0.0, 0.99, 4.99]
+# 距今天数（额外加半天，避免两次计算之间跨过天数边界）
+UPDATE_AGES = [0, 29, 30, 31, 89, 90, 91, 179, 180, 181, 1000]
+# 无法解析的日期：与逐个计算一致，使用默认值0.5
+INVALID_DATES = ['not a date', '2024-13-45T00:00:00Z']
+
+
+def _release_date(rng: random.Random):
+    kind = rng.random()
+    if kind < 0.6:
+        released = datetime.now(timezone.utc) - timedelta(days=rng.choice(UPDATE_AGES), hours=12)
+        return released.strftime('%Y-%m-%dT%H:%M:%SZ')
+    if kind < 0.75:
+        return None
+    if kind < 0.9:
+        return ''
+    return rng.choice(INVALID_DATES)
+
+
+@pytest.fixture
+def make_apps():
+    """生成随机App数据（App Store lookup格式），覆盖各维度的分档边界"""
+    def make(count: int, seed: int = 0):
+        rng = random.Random(seed)
+        apps = []
+        for index in range(count):
+            review_count = rng.choice(REVIEW_COUNTS)
+            apps.append({
+                'trackId': 1000000000 + index,
+                'trackName': f'App {index}',
+                'primaryGenreName': rng.choice(['Productivity', 'Health & Fitness', 'Education']),
+                'averageUserRating': rng.choice(RATINGS),
+                'userRatingCount': review_count,
+                'userRatingCountForCurrentVersion': rng.choice([None, 0, 1, 5, 50, 500, 5000]),
+                'price': rng.choice(PRICES),
+                'currentVersionReleaseDate': _release_date(rng),
+                'trackViewUrl': f'https://apps.apple.com/app/id{1000000000 + index}',
+            })
+        return apps
+    return make
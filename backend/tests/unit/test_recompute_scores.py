@@ -0,0 +1,63 @@
+"""
+修改权重/阈值后在数据库中重新计算分数（DataManager.recompute_opportunity_scores）
+与按新配置重新分析原始数据的结果一致
+"""
+
+import pytest
+
+from analyzers.opportunity_analyzer import OpportunityAnalyzer
+from utils.data_manager import DataManager
+
+
+NEW_SCORING = [
+    ({'market_size': 0.1, 'competition': 0.4, 'user_satisfaction': 0.2, 'growth_trend': 0.2, 'monetization': 0.1},
+     {'min_score': 0.5, 'min_reviews': 100}),
+    ({'market_size': 0.5, 'competition': 0.1, 'user_satisfaction': 0.1, 'growth_trend': 0.1, 'monetization': 0.2},
+     {'min_score': 0.4, 'min_reviews': 0}),
+    ({'market_size': 0.3, 'competition': 0.25, 'user_satisfaction': 0.2, 'growth_trend': 0.15, 'monetization': 0.1},
+     {'min_score': 0.75, 'min_reviews': 1000}),
+]
+
+
+@pytest.mark.parametrize('weights, thresholds', NEW_SCORING)
+def test_recompute_matches_reanalysis(tmp_path, make_apps, weights, thresholds):
+    apps = make_apps(2000, seed=4)
+    analyzer = OpportunityAnalyzer()
+    data_manager = DataManager(tmp_path / "opportunities.db")
+    data_manager.save_opportunities(analyzer.score_apps(apps).to_dict('records'))
+    
+    analyzer.scoring_config['weights'] = weights
+    analyzer.scoring_config['thresholds'] = thresholds
+    stats = analyzer.rescore_saved_opportunities(data_manager)
+    
+    expected = analyzer.analyze_opportunities(apps)
+    saved = data_manager.get_opportunities()
+    assert stats['meets_thresholds'] == len(expected) == len(saved)
+    assert ({str(row['app_id']): row['opportunity_score'] for row in saved} ==
+            dict(zip(expected['app_id'], expected['opportunity_score'])))
+
+
+def test_relaxed_thresholds_bring_back_apps(tmp_path, make_apps):
+    apps = make_apps(500, seed=5)
+    analyzer = OpportunityAnalyzer()
+    analyzer.scoring_config['thresholds'] = {'min_score': 0.8, 'min_reviews': 1000}
+    data_manager = DataManager(tmp_path / "opportunities.db")
+    data_manager.save_opportunities(analyzer.score_apps(apps).to_dict('records'))
+    before = len(data_manager.get_opportunities())
+    
+    analyzer.scoring_config['thresholds'] = {'min_score': 0.3, 'min_reviews': 0}
+    analyzer.rescore_saved_opportunities(data_manager)
+    
+    assert len(data_manager.get_opportunities()) == len(analyzer.analyze_opportunities(apps)) > before
+
+
+def test_detail_reports_meets_thresholds(tmp_path, make_apps):
+    apps = make_apps(200, seed=6)
+    analyzer = OpportunityAnalyzer()
+    scored = analyzer.score_apps(apps)
+    data_manager = DataManager(tmp_path / "opportunities.db")
+    data_manager.save_opportunities(scored.to_dict('records'))
+    
+    for _, row in scored.head(50).iterrows():
+        saved = data_manager.get_opportunity_by_id(row['app_id'])
+        assert bool(saved['meets_thresholds']) == bool(row['meets_thresholds'])
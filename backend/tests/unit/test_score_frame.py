@@ -0,0 +1,88 @@
+"""
+向量化评分（score_frame）与逐个评分（calculate_opportunity_score）一致
+"""
+
+import numpy as np
+import pytest
+
+from analyzers.opportunity_analyzer import OpportunityAnalyzer, SCORE_COMPONENTS
+
+
+SCALAR_COMPONENTS = {
+    'market_size': '_calculate_market_size',
+    'competition': '_calculate_competition',
+    'user_satisfaction': '_calculate_user_satisfaction',
+    'growth_trend': '_calculate_growth_trend',
+    'monetization': '_calculate_monetization',
+}
+
+
+@pytest.fixture
+def analyzer():
+    return OpportunityAnalyzer()
+
+
+def test_components_match_scalar(analyzer, make_apps):
+    apps = make_apps(3000, seed=1)
+    scores = analyzer.score_frame(analyzer.build_app_frame(apps))
+    
+    for component, method in SCALAR_COMPONENTS.items():
+        expected = [getattr(analyzer, method)(app) for app in apps]
+        np.testing.assert_array_equal(scores[component].to_numpy(), expected, err_msg=component)
+
+
+def test_opportunity_score_matches_scalar(analyzer, make_apps):
+    apps = make_apps(3000, seed=2)
+    scores = analyzer.score_frame(analyzer.build_app_frame(apps))
+    
+    expected = [analyzer.calculate_opportunity_score(app) for app in apps]
+    np.testing.assert_array_equal(scores['opportunity_score'].to_numpy(), expected)
+
+
+@pytest.mark.parametrize('review_count, market_size', [
+    (10, 0.1), (11, 0.3), (100, 0.3), (101, 0.5), (1000, 0.5), (1001, 0.7), (10000, 0.7), (10001, 1.0),
+])
+def test_market_size_bucket_edges(analyzer, review_count, market_size):
+    app = {'trackId': 1, 'userRatingCount': review_count}
+    scores = analyzer.score_frame(analyzer.build_app_frame([app]))
+    assert analyzer._calculate_market_size(app) == market_size
+    assert scores['market_size'].iloc[0] == market_size
+
+
+@pytest.mark.parametrize('rating, competition, user_satisfaction', [
+    (4.5, 1.0, 1.0), (4.7, 0.6, 0.7), (4.8, 0.6, 0.3),
+])
+def test_rating_bucket_edges(analyzer, rating, competition, user_satisfaction):
+    app = {'trackId': 1, 'averageUserRating': rating}
+    scores = analyzer.score_frame(analyzer.build_app_frame([app]))
+    assert scores['competition'].iloc[0] == analyzer._calculate_competition(app) == competition
+    assert scores['user_satisfaction'].iloc[0] == analyzer._calculate_user_satisfaction(app) == user_satisfaction
+
+
+@pytest.mark.parametrize('release_date', [None, '', 'not a date'])
+def test_missing_or_invalid_release_date(analyzer, release_date):
+    apps = [
+        {'trackId': 1, 'currentVersionReleaseDate': release_date,
+         'userRatingCount': 100, 'userRatingCountForCurrentVersion': 50},
+        {'trackId': 2, 'currentVersionReleaseDate': release_date,
+         'userRatingCount': 100, 'userRatingCountForCurrentVersion': 20},
+        {'trackId': 3, 'currentVersionReleaseDate': release_date},
+    ]
+    scores = analyzer.score_frame(analyzer.build_app_frame(apps))
+    expected = [analyzer._calculate_growth_trend(app) for app in apps]
+    assert scores['growth_trend'].tolist() == expected
+    if release_date == 'not a date':
+        # 日期无法解析时不再按当前版本评论占比计算
+        assert expected == [0.5, 0.5, 0.5]
+    else:
+        assert expected == [0.8, 0.6, 0.5]
+
+
+def test_custom_weights(analyzer, make_apps):
+    analyzer.scoring_config['weights'] = {'market_size': 0.1, 'competition': 0.15, 'user_satisfaction': 0.25,
+                                          'growth_trend': 0.3, 'monetization': 0.2}
+    apps = make_apps(1000, seed=3)
+    scores = analyzer.score_frame(analyzer.build_app_frame(apps))
+    expected = [analyzer.calculate_opportunity_score(app) for app in apps]
+    np.testing.assert_array_equal(scores['opportunity_score'].to_numpy(), expected)
+    assert set(SCORE_COMPONENTS) <= set(scores.columns)
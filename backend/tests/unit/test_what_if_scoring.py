@@ -0,0 +1,82 @@
+"""
+按多组权重批量试算（OpportunityAnalyzer.score_weight_matrix）：
+排名相关系数与pandas的rank().corr()一致，Top K与逐组评分一致
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analyzers.opportunity_analyzer import OpportunityAnalyzer, SCORE_COMPONENTS
+
+
+WEIGHT_SETS = [
+    {'market_size': 0.5, 'competition': 0.1},
+    {'growth_trend': 0.6, 'monetization': 0.3},
+    {'user_satisfaction': 0.0},
+    {component: 1.0 for component in SCORE_COMPONENTS},
+    # 权重很大时分数取值范围超过计数数组的上限，排名改为排序计算
+    {'market_size': 5000.0, 'competition': 1234.5},
+]
+
+
+@pytest.fixture
+def analyzer():
+    return OpportunityAnalyzer()
+
+
+@pytest.fixture
+def components(analyzer, make_apps):
+    return analyzer.score_apps(make_apps(3000, seed=7)).reset_index(drop=True)
+
+
+def _scores(analyzer, components, weights):
+    merged = dict(analyzer.scoring_config.get('weights', {}), **weights)
+    vector = np.array([merged.get(component, default) for component, default in SCORE_COMPONENTS.items()])
+    return pd.Series(np.round(components[list(SCORE_COMPONENTS)].to_numpy() @ vector, 3))
+
+
+def test_spearman_matches_pandas(analyzer, components):
+    result = analyzer.score_weight_matrix(components, WEIGHT_SETS, top_k=10)
+    baseline = _scores(analyzer, components, {})
+    
+    for weights, scored in zip(WEIGHT_SETS, result['results']):
+        expected = baseline.rank().corr(_scores(analyzer, components, weights).rank())
+        assert scored['spearman'] == pytest.approx(round(expected, 4), abs=1e-4)
+
+
+def test_centered_ranks_match_pandas(analyzer, components):
+    scores = np.column_stack([_scores(analyzer, components, weights) for weights in WEIGHT_SETS])
+    expected = pd.DataFrame(scores).rank(method='average').to_numpy() - (len(scores) + 1) / 2.0
+    np.testing.assert_allclose(analyzer._centered_ranks(scores), expected)
+
+
+def test_top_k_matches_sorting(analyzer, components):
+    top_k = 15
+    result = analyzer.score_weight_matrix(components, WEIGHT_SETS, top_k=top_k)
+    min_reviews = result['thresholds']['min_reviews']
+    
+    for weights, scored in zip(WEIGHT_SETS, result['results']):
+        frame = components.assign(score=_scores(analyzer, components, weights))
+        frame = frame[frame['review_count'] >= min_reviews]
+        # 分数相同时保留components中靠前的App
+        expected = frame.sort_values('score', ascending=False, kind='stable').head(top_k)
+        assert [item['app_id'] for item in scored['top']] == expected['app_id'].tolist()
+
+
+def test_constant_scores_have_no_spearman(analyzer, components):
+    result = analyzer.score_weight_matrix(components, [{component: 0.0 for component in SCORE_COMPONENTS}])
+    assert result['results'][0]['spearman'] is None
+
+
+@pytest.mark.parametrize('weight', [math.nan, math.inf, -math.inf, -0.1])
+def test_rejects_invalid_weights(analyzer, components, weight):
+    with pytest.raises(ValueError):
+        analyzer.score_weight_matrix(components, [{'market_size': weight}])
+
+
+def test_rejects_unknown_component(analyzer, components):
+    with pytest.raises(ValueError):
+        analyzer.score_weight_matrix(components, [{'downloads': 0.5}])
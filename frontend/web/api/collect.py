@@ -0,0 +1,161 @@
+"""
+统一数据采集API
+任意已注册的数据源（App Store、Product Hunt、Google Trends等）都通过同一个异步采集运行时执行
+"""
+
+import sys
+import threading
+from pathlib import Path
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+
+# 添加backend/src到路径
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
+sys.path.insert(0, str(BACKEND_SRC))
+
+from pipeline.registry import get_source, list_sources
+from pipeline.runtime import CollectionRuntime
+from pipeline.sinks import DataManagerSink, NDJSONSink
+from utils.data_manager import DataManager
+from utils.record_store import ndjson_filename
+
+collect_bp = Blueprint('collect', __name__)
+
+# 存储任务状态（实际应该用Redis或数据库）
+collect_tasks = {}
+
+
+def run_collect_task(task_id, source_name, params, concurrency, max_retries):
+    """在后台线程运行采集任务"""
+    try:
+        collect_tasks[task_id]['status'] = 'running'
+        source = get_source(source_name)
+        
+        # 原始数据同时写入NDJSON文件和数据库
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        raw_path = PROJECT_ROOT / "data" / "raw" / source_name / ndjson_filename(f"{source_name}_{timestamp}", 'gzip')
+        sinks = [
+            NDJSONSink(raw_path),
+            DataManagerSink(DataManager(), source_name, record_type=source.record_type),
+        ]
+        
+        def on_progress(stats):
+            collect_tasks[task_id]['progress'] = {
+                'total': stats['items'],
+                'completed': stats['completed'] + stats['failed'] + stats['skipped'],
+                'failed': stats['failed'],
+                'records': stats['records'],
+            }
+        
+        runtime = CollectionRuntime(
+            concurrency=concurrency,
+            max_retries=max_retries,
+            should_stop=lambda: collect_tasks[task_id]['status'] == 'stopped'
+        )
+        stats = runtime.run(source, params, sinks=sinks, on_progress=on_progress)
+        
+        if collect_tasks[task_id]['status'] != 'stopped':
+            collect_tasks[task_id]['status'] = 'completed'
+        stats['raw_file'] = str(raw_path)
+        collect_tasks[task_id]['results'] = stats
+    
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        print(f"采集任务 {task_id} 出错: {e}")
+        collect_tasks[task_id]['status'] = 'error'
+        collect_tasks[task_id]['error'] = str(e)
+
+
+@collect_bp.route('/sources', methods=['GET'])
+def get_sources():
+    """列出已注册的数据源"""
+    return jsonify({
+        'status': 'success',
+        'data': list_sources()
+    })
+
+
+@collect_bp.route('/start', methods=['POST'])
+def start_collect():
+    """
+    启动采集
+    
+    请求体: {'source': 'app_store', 'params': {...}, 'concurrency': 8, 'max_retries': 3}
+    """
+    data = request.json or {}
+    source_name = data.get('source')
+    params = data.get('params') or {}
+    concurrency = int(data.get('concurrency', 8))
+    max_retries = int(data.get('max_retries', 3))
+    
+    if source_name not in {source['name'] for source in list_sources()}:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': f'未知的数据源: {source_name}'
+        }), 400
+    
+    task_id = f"collect_{source_name}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    collect_tasks[task_id] = {
+        'status': 'pending',
+        'source': source_name,
+        'params': params,
+        'progress': {}
+    }
+    
+    thread = threading.Thread(
+        target=run_collect_task,
+        args=(task_id, source_name, params, concurrency, max_retries)
+    )
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({
+        'status': 'success',
+        'task_id': task_id,
+        'message': '采集任务已启动'
+    })
+
+
+@collect_bp.route('/status/<task_id>', methods=['GET'])
+def get_collect_status(task_id):
+    """获取采集状态"""
+    if task_id not in collect_tasks:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'TASK_NOT_FOUND',
+            'message': '任务不存在'
+        }), 404
+    
+    task = collect_tasks[task_id]
+    response = {
+        'status': 'success',
+        'data': {
+            'status': task['status'],
+            'source': task['source'],
+            'progress': task.get('progress', {}),
+            'results': task.get('results', {})
+        }
+    }
+    if 'error' in task:
+        response['data']['error'] = task['error']
+    return jsonify(response)
+
+
+@collect_bp.route('/stop/<task_id>', methods=['POST'])
+def stop_collect(task_id):
+    """停止采集（正在处理的工作单元完成后停止）"""
+    if task_id not in collect_tasks:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'TASK_NOT_FOUND',
+            'message': '任务不存在'
+        }), 404
+    
+    collect_tasks[task_id]['status'] = 'stopped'
+    return jsonify({
+        'status': 'success',
+        'message': '采集任务已停止'
+    })
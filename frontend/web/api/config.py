@@ -2,16 +2,24 @@
 配置管理API
 """
 
+import sys
 import yaml
 from pathlib import Path
 from flask import Blueprint, request, jsonify
 
-config_bp = Blueprint('config', __name__)
-
 # 配置文件路径
 PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 CONFIG_PATH = PROJECT_ROOT / "backend" / "config" / "config.yaml"
 
+# 添加backend/src到路径
+BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
+sys.path.insert(0, str(BACKEND_SRC))
+
+from analyzers.opportunity_analyzer import OpportunityAnalyzer
+from utils.data_manager import DataManager
+
+config_bp = Blueprint('config', __name__)
+
 
 @config_bp.route('', methods=['GET'])
 def get_config():
@@ -34,7 +42,11 @@ def get_config():
 
 @config_bp.route('', methods=['POST'])
 def update_config():
-    """更新配置"""
+    """
+    更新配置
+    
+    scoring（权重或阈值）变化时，用保存的各维度分数立即重新计算所有机会的分数
+    """
     try:
         data = request.json
         
@@ -52,10 +64,15 @@ def update_config():
         with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
             yaml.dump(config, f, allow_unicode=True, default_flow_style=False)
         
-        return jsonify({
+        response = {
             'status': 'success',
             'message': '配置已更新'
-        })
+        }
+        if 'scoring' in data:
+            response['data'] = {
+                'rescored': OpportunityAnalyzer(CONFIG_PATH).rescore_saved_opportunities(DataManager())
+            }
+        return jsonify(response)
     except Exception as e:
         return jsonify({
             'status': 'error',
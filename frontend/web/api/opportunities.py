@@ -12,11 +12,15 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
 sys.path.insert(0, str(BACKEND_SRC))
 
+from analyzers.opportunity_analyzer import SCORE_COMPONENTS, OpportunityAnalyzer
 from utils.data_manager import DataManager
 
 opportunities_bp = Blueprint('opportunities', __name__)
 data_manager = DataManager()
 
+# 一次批量试算最多的权重组数
+MAX_WHAT_IF_WEIGHT_SETS = 1000
+
 
 @opportunities_bp.route('', methods=['GET'])
 def get_opportunities():
@@ -117,6 +121,7 @@ def get_opportunity_detail(app_id):
     conn.close()
     
     # 合并原始数据
+    raw_data = None
     if row:
         try:
             raw_data = json.loads(row[0])
@@ -152,17 +157,16 @@ def get_opportunity_detail(app_id):
         except Exception as e:
             print(f"解析原始数据失败: {e}")
     
-    # 计算评分详情（需要从analyzer获取）
-    # 这里简化处理，实际应该调用analyzer
-    scoring_details = {
-        'market_size': 1.0,
-        'competition': 1.0,
-        'user_satisfaction': 1.0,
-        'growth_trend': 1.0,
-        'monetization': 0.5
-    }
+    # 评分详情：使用分析时保存的各维度分数；旧数据没有保存时根据原始数据重新计算
+    scoring_details = {component: opportunity.get(component) for component in SCORE_COMPONENTS}
+    if any(value is None for value in scoring_details.values()) and raw_data is not None:
+        analyzer = OpportunityAnalyzer()
+        scores = analyzer.score_frame(analyzer.build_app_frame([raw_data]))
+        scoring_details = {component: float(scores[component].iloc[0]) for component in SCORE_COMPONENTS}
     
     opportunity['scoring_details'] = scoring_details
+    # 数据库中也保存了不满足当前阈值的App（修改阈值后可能重新满足），由前端决定如何展示
+    opportunity['meets_thresholds'] = bool(opportunity.get('meets_thresholds', 1))
     
     return jsonify({
         'status': 'success',
@@ -170,6 +174,62 @@ def get_opportunity_detail(app_id):
     })
 
 
+@opportunities_bp.route('/what_if', methods=['POST'])
+def what_if_scoring():
+    """
+    按多组候选权重批量试算机会分数（使用所有评分过的App保存的各维度分数，不修改配置和数据库）
+    
+    请求体: {'weights': [{'market_size': 0.4, 'competition': 0.2, ...}, ...], 'top_k': 20, 'category': None}
+    每组权重必须是非负的有限数值，缺少的维度使用当前配置的权重；返回每组权重的Top K，
+    以及与当前配置相比的排名稳定性（spearman、jaccard）
+    """
+    data = request.json or {}
+    weight_sets = data.get('weights')
+    
+    if not isinstance(weight_sets, list) or not weight_sets or \
+            not all(isinstance(weights, dict) for weights in weight_sets):
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': 'weights必须是非空的权重列表'
+        }), 400
+    if len(weight_sets) > MAX_WHAT_IF_WEIGHT_SETS:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': f'一次最多试算 {MAX_WHAT_IF_WEIGHT_SETS} 组权重'
+        }), 400
+    
+    try:
+        top_k = int(data.get('top_k', 20))
+        components = data_manager.get_opportunity_components(category=data.get('category'))
+        result = OpportunityAnalyzer().score_weight_matrix(components, weight_sets, top_k=top_k)
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': str(e)
+        }), 500
+    
+    if result['apps'] == 0:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'NO_DATA',
+            'message': '没有保存了各维度分数的App，请先重新分析数据'
+        }), 404
+    
+    return jsonify({
+        'status': 'success',
+        'data': result
+    })
+
+
 @opportunities_bp.route('/export', methods=['GET'])
 def export_opportunities():
     """导出机会数据"""
@@ -233,6 +293,12 @@ def export_opportunities():
         'price': '价格',
         'opportunity_score': '机会分数',
         'url': '链接',
+        'market_size': '市场规模分',
+        'competition': '竞争程度分',
+        'user_satisfaction': '用户满意度分',
+        'growth_trend': '增长趋势分',
+        'monetization': '变现潜力分',
+        'meets_thresholds': '满足阈值',
         'description': '描述',
         'release_date': '发布日期',
         'current_version': '当前版本',
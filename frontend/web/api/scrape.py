@@ -16,15 +16,39 @@ sys.path.insert(0, str(BACKEND_SRC))
 from scrapers.app_store_scraper import AppStoreScraperWrapper
 from analyzers.opportunity_analyzer import OpportunityAnalyzer
 from utils.data_manager import DataManager
+from utils.checkpoint import TaskJournal
 
 scrape_bp = Blueprint('scrape', __name__)
 
 # 存储任务状态（实际应该用Redis或数据库）
 tasks = {}
+# 检查并修改任务状态时加锁（如同时收到两个恢复请求时只启动一个任务）
+tasks_lock = threading.Lock()
 
-def run_scrape_task(task_id, keywords, data_source, limit_per_keyword):
-    """在后台线程运行采集任务"""
+def run_scrape_task(task_id, keywords, data_source, limit_per_keyword, max_age_hours=None,
+                    countries=None):
+    """
+    在后台线程运行采集任务
+    
+    max_age_hours不为None时为增量采集：该时间内已采集过的App直接使用本地数据
+    countries包含多个国家时，各国家商店并行采集，每条App记录带有country字段
+    
+    采集进度写入检查点日志（data/checkpoints），任务中断后可通过 /resume/<task_id>
+    从检查点继续：已解析的关键词和已获取的App不会重新请求
+    """
+    countries = countries or ['us']
+    writer = None
+    journal = None
     try:
+        # 检查点文件读写失败时任务进入error状态，而不是一直停在pending
+        journal = TaskJournal(task_id)
+        journal.start({
+            'keywords': keywords,
+            'data_source': data_source,
+            'limit_per_keyword': limit_per_keyword,
+            'max_age_hours': max_age_hours,
+            'countries': countries,
+        })
         tasks[task_id]['status'] = 'running'
         tasks[task_id]['progress'] = {
             'total': len(keywords) * limit_per_keyword,
@@ -33,52 +57,67 @@ def run_scrape_task(task_id, keywords, data_source, limit_per_keyword):
             'current_progress': '0/0'
         }
         
-        scraper = AppStoreScraperWrapper()
         data_manager = DataManager()
+        scraper = AppStoreScraperWrapper(max_age_hours=max_age_hours, data_manager=data_manager)
         analyzer = OpportunityAnalyzer()
         
-        all_apps = []
-        seen_app_ids = set()  # 去重
+        # App到达时立即以NDJSON（gzip）追加写入原始数据文件
+        writer = scraper.open_app_writer()
         
-        for idx, keyword in enumerate(keywords):
-            print(f"[任务 {task_id}] 开始采集关键词: {keyword} ({idx+1}/{len(keywords)})")
-            tasks[task_id]['progress']['current_keyword'] = keyword
-            tasks[task_id]['progress']['current_progress'] = f"0/{limit_per_keyword}"
-            print(f"[任务 {task_id}] 更新进度: {tasks[task_id]['progress']}")
+        if len(countries) == 1:
+            country = countries[0]
+            
+            # 阶段1：解析所有关键词的App ID并合并去重
+            def on_keyword(idx, keyword, hits):
+                print(f"[任务 {task_id}] 关键词 {keyword} 命中 {hits} 个App ({idx+1}/{len(keywords)})")
+                if idx + 1 < len(keywords):
+                    tasks[task_id]['progress']['current_keyword'] = keywords[idx + 1]
+                tasks[task_id]['progress']['current_progress'] = f"{hits}/{limit_per_keyword}"
+            
+            plan = scraper.plan_search(keywords, country=country, limit=limit_per_keyword, on_keyword=on_keyword,
+                                       checkpoint=journal)
+            print(f"[任务 {task_id}] 去重后共 {len(plan['app_ids'])} 个App需要获取详情")
             
-            apps = scraper.search_apps(keyword, limit=limit_per_keyword)
-            print(f"[任务 {task_id}] 关键词 {keyword} 采集到 {len(apps)} 个App")
+            # 阶段2：每个App只获取一次详情
+            tasks[task_id]['progress']['total'] = len(plan['app_ids'])
+            tasks[task_id]['progress']['current_keyword'] = '获取App详情'
+            tasks[task_id]['progress']['current_progress'] = f"0/{len(plan['app_ids'])}"
+            all_apps = scraper.fetch_plan(plan, country=country, on_app=writer.write, checkpoint=journal)
             
-            # 去重
-            new_apps = []
-            for app in apps:
-                app_id = app.get('trackId')
-                if app_id and app_id not in seen_app_ids:
-                    seen_app_ids.add(app_id)
-                    all_apps.append(app)
-                    new_apps.append(app)
+            tasks[task_id]['progress']['completed'] = len(all_apps)
+            tasks[task_id]['progress']['current_progress'] = f"{len(all_apps)}/{len(plan['app_ids'])}"
+            print(f"[任务 {task_id}] 当前进度: 已完成 {len(all_apps)}/{len(plan['app_ids'])}")
+        else:
+            # 多个国家：每个商店在独立线程中规划并获取详情
+            tasks[task_id]['progress']['total'] = len(keywords) * limit_per_keyword * len(countries)
             
-            tasks[task_id]['progress']['completed'] += len(new_apps)
-            tasks[task_id]['progress']['current_progress'] = f"{len(new_apps)}/{limit_per_keyword}"
-            print(f"[任务 {task_id}] 当前进度: 已完成 {tasks[task_id]['progress']['completed']}/{tasks[task_id]['progress']['total']}, 当前关键词: {len(new_apps)}/{limit_per_keyword}")
+            def on_country_keyword(country, idx, keyword, hits):
+                print(f"[任务 {task_id}] [{country}] 关键词 {keyword} 命中 {hits} 个App ({idx+1}/{len(keywords)})")
+                tasks[task_id]['progress']['current_keyword'] = f"[{country}] {keyword}"
+                tasks[task_id]['progress']['current_progress'] = f"{hits}/{limit_per_keyword}"
+            
+            all_apps = scraper.collect_countries(keywords, countries=countries, limit=limit_per_keyword,
+                                                 on_keyword=on_country_keyword, on_app=writer.write,
+                                                 checkpoint=journal)
+            tasks[task_id]['progress']['completed'] = len(all_apps)
+            print(f"[任务 {task_id}] {len(countries)} 个国家共采集 {len(all_apps)} 条App记录")
         
-        # 保存原始数据到数据库
-        if all_apps:
-            print(f"任务 {task_id} 保存 {len(all_apps)} 个App到数据库")
-            data_manager.save_raw_data(all_apps, 'app_store')
+        # 保存原始数据到数据库（直接使用本地数据的App不重复保存，保留原采集时间）
+        fetched_apps = [app for app in all_apps if not scraper.is_reused(app)]
+        if fetched_apps:
+            print(f"任务 {task_id} 保存 {len(fetched_apps)} 个App到数据库")
+            data_manager.save_raw_data(fetched_apps, 'app_store')
         
-        # 保存JSON文件
-        scraper.save_apps(all_apps)
+        writer.close()
+        print(f"任务 {task_id} 已写入 {writer.count} 个App数据到: {writer.path}")
         
         # 分析机会
         print(f"任务 {task_id} 开始分析机会")
         df = analyzer.analyze_opportunities(all_apps)
+        opportunities_count = len(df)
         
-        # 保存机会到数据库
-        opportunities_count = 0
-        for _, row in df.iterrows():
-            data_manager.save_opportunity(row.to_dict())
-            opportunities_count += 1
+        # 所有评分过的App（含各维度分数）都保存到数据库，修改权重/阈值时可以直接重新计算
+        data_manager.save_opportunities(analyzer.score_apps(all_apps).to_dict('records'))
         
         # 更新最终进度
         tasks[task_id]['progress']['completed'] = len(all_apps)
@@ -88,8 +127,18 @@ def run_scrape_task(task_id, keywords, data_source, limit_per_keyword):
         tasks[task_id]['status'] = 'completed'
         tasks[task_id]['results'] = {
             'apps_collected': len(all_apps),
+            'apps_fetched': len(fetched_apps),
+            'apps_reused': len(all_apps) - len(fetched_apps),
             'opportunities_found': opportunities_count
         }
+        if journal.failures:
+            # 有关键词搜索失败：检查点保持未完成状态，通过 /resume/<task_id> 重试失败的关键词
+            tasks[task_id]['results']['failed_keywords'] = journal.failures
+            tasks[task_id]['results']['resumable'] = True
+            journal.close()
+            print(f"任务 {task_id} 部分完成: {len(journal.failures)} 个关键词失败，可以从检查点恢复")
+        else:
+            journal.finish(tasks[task_id]['results'])
         print(f"任务 {task_id} 完成: 采集 {len(all_apps)} 个App, 发现 {opportunities_count} 个机会")
         
     except Exception as e:
@@ -97,6 +146,12 @@ def run_scrape_task(task_id, keywords, data_source, limit_per_keyword):
         error_msg = str(e)
         traceback.print_exc()
         print(f"任务 {task_id} 出错: {error_msg}")
+        if writer:
+            # 保留出错前已写入的数据
+            writer.close()
+        # 检查点保持未完成状态，可以稍后恢复
+        if journal:
+            journal.close()
         tasks[task_id]['status'] = 'error'
         tasks[task_id]['error'] = error_msg
 
@@ -108,6 +163,10 @@ def start_scrape():
     keywords = data.get('keywords', [])
     data_source = data.get('data_source', 'app_store')
     limit_per_keyword = data.get('limit_per_keyword', 20)
+    # 增量采集：只重新获取超过max_age_hours小时的App，不传则全部重新获取
+    max_age_hours = data.get('max_age_hours')
+    # 采集的国家商店，如 ['us', 'cn']，默认只采集us
+    countries = data.get('countries') or ['us']
     
     if not keywords:
         return jsonify({
@@ -124,13 +183,15 @@ def start_scrape():
         'status': 'pending',
         'keywords': keywords,
         'data_source': data_source,
-        'limit_per_keyword': limit_per_keyword
+        'limit_per_keyword': limit_per_keyword,
+        'max_age_hours': max_age_hours,
+        'countries': countries
     }
     
     # 在后台线程启动任务
     thread = threading.Thread(
         target=run_scrape_task,
-        args=(task_id, keywords, data_source, limit_per_keyword)
+        args=(task_id, keywords, data_source, limit_per_keyword, max_age_hours, countries)
     )
     thread.daemon = True
     thread.start()
@@ -186,3 +247,71 @@ def stop_scrape(task_id):
         'status': 'success',
         'message': '采集任务已停止'
     })
+
+
+@scrape_bp.route('/resume/<task_id>', methods=['POST'])
+def resume_scrape(task_id):
+    """从检查点恢复中断的采集任务"""
+    with tasks_lock:
+        if task_id in tasks and tasks[task_id].get('status') in ('pending', 'running'):
+            return jsonify({
+                'status': 'error',
+                'error_code': 'TASK_RUNNING',
+                'message': '任务正在运行'
+            }), 400
+    
+        journal = TaskJournal(task_id)
+        if not journal.exists or not journal.params:
+            return jsonify({
+                'status': 'error',
+                'error_code': 'CHECKPOINT_NOT_FOUND',
+                'message': '任务检查点不存在'
+            }), 404
+    
+        if journal.finished:
+            return jsonify({
+                'status': 'error',
+                'error_code': 'TASK_FINISHED',
+                'message': '任务已完成，无需恢复'
+            }), 400
+    
+        params = journal.params
+        journal.close()
+        keywords = params.get('keywords', [])
+        data_source = params.get('data_source', 'app_store')
+        limit_per_keyword = params.get('limit_per_keyword', 20)
+        max_age_hours = params.get('max_age_hours')
+        countries = params.get('countries') or ['us']
+    
+        # 在锁内标记为pending，之后的恢复请求会被拒绝
+        tasks[task_id] = {
+            'status': 'pending',
+            'keywords': keywords,
+            'data_source': data_source,
+            'limit_per_keyword': limit_per_keyword,
+            'max_age_hours': max_age_hours,
+            'countries': countries,
+            'resumed': True
+        }
+    
+    thread = threading.Thread(
+        target=run_scrape_task,
+        args=(task_id, keywords, data_source, limit_per_keyword, max_age_hours, countries)
+    )
+    thread.daemon = True
+    thread.start()
+    
+    return jsonify({
+        'status': 'success',
+        'task_id': task_id,
+        'message': '采集任务已从检查点恢复'
+    })
+
+
+@scrape_bp.route('/checkpoints', methods=['GET'])
+def list_checkpoints():
+    """列出可恢复的（未完成的）采集任务"""
+    return jsonify({
+        'status': 'success',
+        'data': TaskJournal.list_unfinished()
+    })
@@ -13,6 +13,10 @@ BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
 sys.path.insert(0, str(BACKEND_SRC))
 
 from utils.data_manager import DataManager
+from utils.http_cache import get_response_cache
+from utils.rate_limiter import list_rate_limits
+from utils.http_client import get_http_client
+from scrapers.trend_scraper import get_trend_req_pool
 
 stats_bp = Blueprint('stats', __name__)
 data_manager = DataManager()
@@ -44,3 +48,39 @@ def get_stats():
             'top_categories': top_categories
         }
     })
+
+
+@stats_bp.route('/cache', methods=['GET'])
+def get_cache_stats():
+    """获取爬虫响应缓存的命中率统计"""
+    return jsonify({
+        'status': 'success',
+        'data': get_response_cache().stats()
+    })
+
+
+@stats_bp.route('/rate_limits', methods=['GET'])
+def get_rate_limit_stats():
+    """获取各上游当前的自适应限速状态"""
+    return jsonify({
+        'status': 'success',
+        'data': list_rate_limits()
+    })
+
+
+@stats_bp.route('/http', methods=['GET'])
+def get_http_stats():
+    """获取共享HTTP客户端的连接复用统计"""
+    return jsonify({
+        'status': 'success',
+        'data': get_http_client().stats()
+    })
+
+
+@stats_bp.route('/trend_sessions', methods=['GET'])
+def get_trend_session_stats():
+    """获取Google Trends会话池状态"""
+    return jsonify({
+        'status': 'success',
+        'data': get_trend_req_pool().stats()
+    })
@@ -14,7 +14,7 @@ PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
 BACKEND_SRC = PROJECT_ROOT / "backend" / "src"
 sys.path.insert(0, str(BACKEND_SRC))
 
-from scrapers.trend_scraper import TrendScraper
+from scrapers.trend_scraper import TrendScraper, get_trend_req_pool
 from analyzers.trend_analyzer import TrendAnalyzer
 from utils.data_manager import DataManager
 
@@ -23,8 +23,48 @@ trends_bp = Blueprint('trends', __name__)
 # 存储任务状态（实际应该用Redis或数据库）
 trend_tasks = {}
 
-def run_trend_task(task_id, keywords, platforms, timeframe):
-    """在后台线程运行趋势采集任务"""
+# 关键词建议、相关数据等交互请求共用一个TrendScraper（TrendReq会话来自共享会话池）
+_suggestion_scraper = None
+_suggestion_scraper_lock = threading.Lock()
+
+
+# 会话池只在第一个趋势请求时预热（导入模块和注册蓝图时不发出网络请求）
+_sessions_warmed = False
+_sessions_warmed_lock = threading.Lock()
+
+
+@trends_bp.before_request
+def _warm_trend_sessions():
+    """第一个趋势请求时在后台预热Google Trends会话池，后续请求不需要等待获取cookie"""
+    global _sessions_warmed
+    with _sessions_warmed_lock:
+        if _sessions_warmed:
+            return
+        _sessions_warmed = True
+    thread = threading.Thread(target=get_trend_req_pool().warm)
+    thread.daemon = True
+    thread.start()
+
+
+def _get_suggestion_scraper():
+    global _suggestion_scraper
+    with _suggestion_scraper_lock:
+        if _suggestion_scraper is None:
+            _suggestion_scraper = TrendScraper()
+        return _suggestion_scraper
+
+
+def run_trend_task(task_id, keywords, platforms, timeframe, batch_keywords=False, anchor=None,
+                   incremental=False):
+    """
+    在后台线程运行趋势采集任务
+    
+    batch_keywords为True时，Google Trends每个请求打包5个关键词（含同一个锚点关键词anchor，
+    默认第一个关键词），各批数值通过锚点换算到同一尺度，请求次数约为逐个采集的1/4
+    
+    incremental为True时，已有数据的关键词只获取最新日期之后的短窗口并换算到已保存数据的尺度
+    （没有数据的关键词仍完整采集timeframe），适合每天定时刷新
+    """
     try:
         trend_tasks[task_id]['status'] = 'running'
         trend_tasks[task_id]['progress'] = {
@@ -38,12 +78,65 @@ def run_trend_task(task_id, keywords, platforms, timeframe):
         data_manager = DataManager()
         analyzer = TrendAnalyzer()
         
-        all_trends = []
+        trends_saved = 0
+        collected_keywords = set()
         completed = 0
         
         print(f"[Trend Task {task_id}] 开始采集任务，关键词: {keywords}, 平台: {platforms}, 时间范围: {timeframe}")
         
-        for keyword in keywords:
+        keyword_platforms = platforms
+        if incremental and 'google_trends' in platforms:
+            # Google Trends增量刷新，其余平台仍逐个关键词采集
+            keyword_platforms = [platform for platform in platforms if platform != 'google_trends']
+            trend_tasks[task_id]['progress']['current_platform'] = 'google_trends'
+            
+            def on_keyword(keyword, saved):
+                nonlocal completed, trends_saved
+                completed += 1
+                trends_saved += saved
+                collected_keywords.add(keyword)
+                trend_tasks[task_id]['progress']['completed'] = completed
+                trend_tasks[task_id]['progress']['current_keyword'] = keyword
+            
+            result = scraper.refresh_google_trends(
+                keywords, data_manager, timeframe=timeframe, on_keyword=on_keyword,
+                should_stop=lambda: trend_tasks.get(task_id, {}).get('status') == 'stopped'
+            )
+            if result['failed_keywords']:
+                print(f"[Trend Task {task_id}] 采集失败的关键词: {result['failed_keywords']}")
+        elif batch_keywords and 'google_trends' in platforms:
+            # Google Trends批量采集，其余平台仍逐个关键词采集
+            keyword_platforms = [platform for platform in platforms if platform != 'google_trends']
+            trend_tasks[task_id]['progress']['current_platform'] = 'google_trends'
+            keyword_set = set(keywords)
+            
+            def on_batch(idx, total, batch, success):
+                nonlocal completed
+                new_keywords = batch if idx == 0 else batch[1:]
+                completed += len([keyword for keyword in new_keywords if keyword in keyword_set])
+                trend_tasks[task_id]['progress']['completed'] = completed
+                trend_tasks[task_id]['progress']['current_keyword'] = ', '.join(batch)
+                print(f"[Trend Task {task_id}] 批次 {idx+1}/{total} {'完成' if success else '失败'}: {batch}")
+            
+            result = scraper.get_google_trends_batched(
+                keywords, anchor=anchor, timeframe=timeframe, on_batch=on_batch,
+                should_stop=lambda: trend_tasks.get(task_id, {}).get('status') == 'stopped',
+                columnar=True
+            )
+            if result['success']:
+                columns = result['data']['interest_columns']
+                values = {keyword: series for keyword, series in columns['values'].items() if keyword in keyword_set}
+                saved = data_manager.save_trend_series('google_trends', columns['dates'], values,
+                                                       metadata={'anchor': result['anchor']})
+                trends_saved += saved
+                collected_keywords.update(values)
+                print(f"[Trend Task {task_id}] {result['batches']} 个批次共保存 {saved} 条趋势数据")
+                if result['failed_keywords']:
+                    print(f"[Trend Task {task_id}] 采集失败的关键词: {result['failed_keywords']}")
+            else:
+                print(f"[Trend Task {task_id}] 批量采集失败: {result.get('error', '未知错误')}")
+        
+        for keyword in keywords if keyword_platforms else []:
             # 检查任务是否已停止
             if task_id in trend_tasks and trend_tasks[task_id].get('status') == 'stopped':
                 print(f"[Trend Task {task_id}] 任务已停止")
@@ -51,7 +144,7 @@ def run_trend_task(task_id, keywords, platforms, timeframe):
             
             trend_tasks[task_id]['progress']['current_keyword'] = keyword
             
-            for platform in platforms:
+            for platform in keyword_platforms:
                 # 检查任务是否已停止
                 if task_id in trend_tasks and trend_tasks[task_id].get('status') == 'stopped':
                     print(f"[Trend Task {task_id}] 任务已停止")
@@ -60,47 +153,28 @@ def run_trend_task(task_id, keywords, platforms, timeframe):
                 trend_tasks[task_id]['progress']['current_platform'] = platform
                 
                 if platform == 'google_trends':
-                    result = scraper.get_google_trends([keyword], timeframe=timeframe)
+                    result = scraper.get_google_trends([keyword], timeframe=timeframe, columnar=True)
                     
                     print(f"[Trend Task {task_id}] 采集关键词 '{keyword}' 结果: success={result.get('success')}, error={result.get('error', 'None')}")
                     
                     if result['success'] and 'data' in result:
-                        data = result['data']
-                        interest_data = data.get('interest_over_time', [])
+                        # 列式数据（日期数组 + 每个关键词的数值数组）直接批量写入
+                        columns = result['data']['interest_columns']
                         
-                        print(f"[Trend Task {task_id}] interest_over_time 数据量: {len(interest_data) if isinstance(interest_data, list) else 0}")
+                        print(f"[Trend Task {task_id}] interest_over_time 数据量: {len(columns['dates'])}")
                         
-                        # 保存趋势数据
-                        trends_to_save = []
-                        if interest_data and isinstance(interest_data, list):
-                            # interest_over_time现在是记录列表格式
-                            for record in interest_data:
-                                date_str = record.get('date', '')
-                                # 获取该关键词的值
-                                if keyword in record:
-                                    value = record[keyword]
-                                    if isinstance(value, (int, float)) and value > 0:
-                                        trends_to_save.append({
-                                            'keyword': keyword,
-                                            'platform': 'google_trends',
-                                            'date': str(date_str),
-                                            'value': float(value),
-                                            'metadata': {}
-                                        })
-                        
-                        print(f"[Trend Task {task_id}] 准备保存 {len(trends_to_save)} 条趋势数据")
-                        
-                        if trends_to_save:
-                            try:
-                                data_manager.save_trend_batch(trends_to_save)
-                                all_trends.extend(trends_to_save)
-                                print(f"[Trend Task {task_id}] 成功保存 {len(trends_to_save)} 条趋势数据到数据库")
-                            except Exception as e:
-                                print(f"[Trend Task {task_id}] 保存趋势数据失败: {e}")
-                                import traceback
-                                traceback.print_exc()
-                        else:
-                            print(f"[Trend Task {task_id}] 警告: 没有可保存的趋势数据")
+                        try:
+                            saved = data_manager.save_trend_series('google_trends', columns['dates'], columns['values'])
+                            if saved:
+                                trends_saved += saved
+                                collected_keywords.add(keyword)
+                                print(f"[Trend Task {task_id}] 成功保存 {saved} 条趋势数据到数据库")
+                            else:
+                                print(f"[Trend Task {task_id}] 警告: 没有可保存的趋势数据")
+                        except Exception as e:
+                            print(f"[Trend Task {task_id}] 保存趋势数据失败: {e}")
+                            import traceback
+                            traceback.print_exc()
                     else:
                         print(f"[Trend Task {task_id}] 采集失败: {result.get('error', '未知错误')}")
                 
@@ -112,14 +186,14 @@ def run_trend_task(task_id, keywords, platforms, timeframe):
             trend_tasks[task_id]['status'] = 'completed'
             trend_tasks[task_id]['results'] = {
                 'keywords_collected': len(keywords),
-                'trends_saved': len(all_trends),
+                'trends_saved': trends_saved,
                 'platforms': platforms
             }
         else:
             # 如果被停止，更新结果但不改变状态
             trend_tasks[task_id]['results'] = {
-                'keywords_collected': len([k for k in keywords if any(t.get('keyword') == k for t in all_trends)]),
-                'trends_saved': len(all_trends),
+                'keywords_collected': len(collected_keywords),
+                'trends_saved': trends_saved,
                 'platforms': platforms
             }
         
@@ -159,6 +233,11 @@ def start_trend_collection():
     keywords = data.get('keywords', [])
     platforms = data.get('platforms', ['google_trends'])
     timeframe = data.get('timeframe', 'today 12-m')
+    # 批量模式：Google Trends每个请求5个关键词，用锚点关键词统一尺度
+    batch_keywords = bool(data.get('batch_keywords', False))
+    anchor = data.get('anchor')
+    # 增量模式：只获取已保存数据之后的新数据
+    incremental = bool(data.get('incremental', False))
     
     if not keywords:
         return jsonify({
@@ -175,7 +254,10 @@ def start_trend_collection():
         'status': 'pending',
         'keywords': keywords,
         'platforms': platforms,
-        'timeframe': timeframe
+        'timeframe': timeframe,
+        'batch_keywords': batch_keywords,
+        'anchor': anchor,
+        'incremental': incremental
     }
     
     # 保存任务到数据库
@@ -191,7 +273,7 @@ def start_trend_collection():
     # 在后台线程启动任务
     thread = threading.Thread(
         target=run_trend_task,
-        args=(task_id, keywords, platforms, timeframe)
+        args=(task_id, keywords, platforms, timeframe, batch_keywords, anchor, incremental)
     )
     thread.daemon = True
     thread.start()
@@ -786,6 +868,48 @@ def compare_keywords():
     })
 
 
+@trends_bp.route('/geo_compare', methods=['POST'])
+def compare_geos():
+    """
+    对比一组关键词在多个地区、多个平台的实时趋势
+    
+    所有 (平台, 地区) 的请求并发进行，结果不写入数据库
+    
+    请求体: {'keywords': [...], 'geos': ['US', 'GB'], 'platforms': ['google_trends'], 'timeframe': 'today 12-m'}
+    """
+    data = request.json or {}
+    keywords = data.get('keywords', [])
+    geos = data.get('geos') or ['']
+    platforms = data.get('platforms') or ['google_trends']
+    timeframe = data.get('timeframe', 'today 12-m')
+    
+    if not keywords:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': '关键词不能为空'
+        }), 400
+    
+    result = _get_suggestion_scraper().collect_trends(keywords, platforms=platforms, geos=geos,
+                                                      timeframe=timeframe)
+    
+    # 各地区每个关键词的平均热度，便于直接对比
+    summary = []
+    for geo, geo_result in result['platforms'].get('google_trends', {}).items():
+        records = geo_result.get('data', {}).get('interest_over_time', []) if geo_result.get('success') else []
+        if not records:
+            continue
+        means = pd.DataFrame(records).drop(columns=['date']).mean()
+        for keyword, value in means.items():
+            summary.append({'geo': geo, 'keyword': keyword, 'mean_interest': round(float(value), 2)})
+    result['summary'] = summary
+    
+    return jsonify({
+        'status': 'success',
+        'data': result
+    })
+
+
 @trends_bp.route('/hot', methods=['GET'])
 def get_hot_keywords():
     """获取热门关键词（增长趋势明显的）"""
@@ -863,8 +987,7 @@ def get_suggestions():
             'message': '关键词不能为空'
         }), 400
     
-    scraper = TrendScraper()
-    suggestions = scraper.get_google_trends_suggestions(keyword)
+    suggestions = _get_suggestion_scraper().get_google_trends_suggestions(keyword)
     
     return jsonify({
         'status': 'success',
@@ -872,3 +995,41 @@ def get_suggestions():
             'suggestions': suggestions
         }
     })
+
+
+@trends_bp.route('/related', methods=['GET'])
+def get_related():
+    """
+    获取相关查询和相关主题（Google Trends）
+    
+    采集任务只获取时间序列，相关数据在页面需要时通过这个接口单独获取（结果单独缓存）
+    
+    参数: keywords（逗号分隔，最多5个）, timeframe, geo
+    """
+    keywords = [keyword.strip() for keyword in request.args.get('keywords', '').split(',') if keyword.strip()]
+    timeframe = request.args.get('timeframe', 'today 12-m')
+    geo = request.args.get('geo', '')
+    
+    if not keywords:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INVALID_PARAMETER',
+            'message': '关键词不能为空'
+        }), 400
+    
+    result = _get_suggestion_scraper().get_google_trends_related(keywords[:5], timeframe=timeframe, geo=geo)
+    if not result['success']:
+        return jsonify({
+            'status': 'error',
+            'error_code': 'INTERNAL_ERROR',
+            'message': result.get('error', '获取相关数据失败')
+        }), 500
+    
+    return jsonify({
+        'status': 'success',
+        'data': {
+            'keywords': result['keywords'],
+            'related_queries': result['data']['related_queries'],
+            'related_topics': result['data']['related_topics']
+        }
+    })
@@ -44,6 +44,7 @@ try:
     from api.stats import stats_bp
     from api.translate import translate_bp
     from api.trends import trends_bp
+    from api.collect import collect_bp
     
     app.register_blueprint(scrape_bp, url_prefix='/api/v1/scrape')
     app.register_blueprint(opportunities_bp, url_prefix='/api/v1/opportunities')
@@ -51,6 +52,7 @@ try:
     app.register_blueprint(stats_bp, url_prefix='/api/v1/stats')
     app.register_blueprint(translate_bp, url_prefix='/api/v1/translate')
     app.register_blueprint(trends_bp, url_prefix='/api/v1/trends')
+    app.register_blueprint(collect_bp, url_prefix='/api/v1/collect')
     print("✓ 所有API蓝图已注册")
 except Exception as e:
     print(f"⚠️  警告: 蓝图注册失败: {e}")